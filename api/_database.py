@@ -4,9 +4,475 @@ Vercel兼容的数据库管理
 """
 import os
 import json
+import time
+import base64
 import sqlite3
+import threading
 from datetime import datetime
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
+from _migrations import MIGRATIONS, MIGRATION_LOCK_ID, migrate as migrate_schema
+from _utils import RawJSON
+
+# 当前代码期望的结构版本，schema_version 中已记录到该版本说明建表和迁移都已完成
+LATEST_SCHEMA_VERSION = max(m.version for m in MIGRATIONS)
+
+# SQLite连接配置档案，通过 XHS_SQLITE_PROFILE 选择
+SQLITE_PROFILES = {
+    'default': {},
+    # 生产配置：WAL模式下读写互不阻塞，写入只在检查点时同步
+    'production': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,
+        'cache_size': -65536,  # 负数单位为KiB，即64MB
+        'mmap_size': 268435456,  # 256MB
+        'temp_store': 'MEMORY',
+    },
+}
+
+def encode_cursor(created_at, row_id: int) -> str:
+    """将 (created_at, id) 编码为不透明的分页游标"""
+    if isinstance(created_at, datetime):
+        created_at = created_at.isoformat(sep=' ')
+    payload = json.dumps([created_at, row_id], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    """解析分页游标，返回 (created_at, id)；游标无效时抛出 ValueError"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return str(created_at), int(row_id)
+    except Exception:
+        raise ValueError('无效的分页游标')
+
+def build_offset_page(items: List[Dict], limit: int, offset: int, total: int = None) -> Dict:
+    """根据查询结果构建偏移分页数据
+    
+    total 为精确总数时直接计算 has_more；为 None（估算模式）时 items 应为 limit+1 条，
+    用多出的一条判断 has_more，total 为已知的下限，total_exact=False。
+    """
+    if total is None:
+        has_more = len(items) > limit
+        items = items[:limit]
+        return {
+            'items': items,
+            # 偏移超出范围时无法得知前面的行数，下限为0
+            'total': offset + len(items) + (1 if has_more else 0) if items else 0,
+            'total_exact': False,
+            'has_more': has_more
+        }
+    return {
+        'items': items[:limit],
+        'total': total,
+        'total_exact': True,
+        'has_more': offset + limit < total
+    }
+
+# 笔记列表支持的排序方式，likes 使用迁移4提升出的点赞数列
+NOTE_SORTS = {
+    'created': 'created_at DESC, id DESC',
+    'likes': 'likes DESC, id DESC',
+}
+
+def load_json_column(value, default):
+    """JSON列的值转为Python对象：PostgreSQL的JSONB已由驱动解析，SQLite的TEXT需要 json.loads"""
+    if isinstance(value, str):
+        try:
+            return json.loads(value) if value else default
+        except ValueError:
+            return default
+    return value if value is not None else default
+
+# 列表接口直接输出JSON片段时查询的列：JSON列以文本取出，不在Python中解析
+NOTE_LIST_COLUMNS = 'id, user_id, note_id, title, content, type, publish_time, location, original_url, created_at'
+NOTE_JSON_FRAGMENTS = {
+    # JSONB的文本输出（", " 和 ": " 分隔、非ASCII字符原样输出）与 json.dumps(ensure_ascii=False) 格式相同；
+    # 只有 numeric 的写法可能不同（保留末尾的0、不用科学计数法），这时与解析后的输出只是语义相同
+    'postgres': '''
+        author_data::text AS author_data, stats_data::text AS stats_data,
+        CASE jsonb_typeof(images_data)
+            WHEN 'object' THEN COALESCE((images_data->'images')::text, '[]')
+            WHEN 'array' THEN images_data::text
+            ELSE '[]' END AS images_json,
+        CASE jsonb_typeof(images_data)
+            WHEN 'object' THEN COALESCE((images_data->'videos')::text, '[]')
+            ELSE '[]' END AS videos_json
+    ''',
+    # SQLite中存的就是 json.dumps(ensure_ascii=False) 的输出，只需用 json_valid 过滤无效数据
+    'sqlite': '''
+        CASE WHEN json_valid(author_data) THEN author_data END AS author_data,
+        CASE WHEN json_valid(stats_data) THEN stats_data END AS stats_data,
+        CASE WHEN json_valid(images_data) THEN images_data END AS images_data
+    ''',
+}
+
+def split_media_json(text: str) -> Optional[Tuple[str, str]]:
+    """不解析JSON，从 save_note 写入的 {"images": [...], "videos": [...]}（或旧格式的数组）中切出图片和视频数组片段
+    
+    text 必须是有效JSON；含嵌套对象、其他键或非默认格式时返回 None，由调用方解析处理。
+    """
+    if text.startswith('['):
+        return text, '[]'
+    prefix = '{"images": '
+    separator = '], "videos": ['
+    # 字符串中的双引号都会转义，只有一个对象且恰好两个键时，找到的分隔位置一定是顶层的 "videos" 键
+    if not text.startswith(prefix + '[') or not text.endswith(']}') or text.count('{') != 1 or text.count('": ') != 2:
+        return None
+    split = text.rfind(separator)
+    if split < 0:
+        return None
+    return text[len(prefix):split + 1], text[split + len(separator) - 1:-1]
+
+class TimedCursor:
+    """psycopg2 游标代理，统计 execute / executemany 的耗时"""
+
+    def __init__(self, cursor, pool):
+        self._cursor = cursor
+        self._pool = pool
+
+    def execute(self, query, params=None):
+        start = time.perf_counter()
+        try:
+            return self._cursor.execute(query, params)
+        finally:
+            self._pool.record_query(time.perf_counter() - start)
+
+    def executemany(self, query, params_seq):
+        start = time.perf_counter()
+        try:
+            return self._cursor.executemany(query, params_seq)
+        finally:
+            self._pool.record_query(time.perf_counter() - start)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self._cursor.close()
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+class PooledConnection:
+    """连接池中的 psycopg2 连接代理：close() 归还连接而不是断开，其余属性和方法直接转发"""
+
+    def __init__(self, conn, pool):
+        self._conn = conn
+        self._pool = pool
+
+    def cursor(self, *args, **kwargs):
+        return TimedCursor(self._conn.cursor(*args, **kwargs), self._pool)
+
+    def close(self):
+        """归还到连接池，重复调用无副作用"""
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            self._pool.checkin(conn)
+
+    @property
+    def raw_connection(self):
+        """底层的 psycopg2 连接（例如需要传给只接受原生连接的函数时）"""
+        return self._conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # 与 psycopg2 一致：正常退出提交，异常回滚；随后归还连接
+        try:
+            if exc_type is None:
+                self._conn.commit()
+            else:
+                self._conn.rollback()
+        finally:
+            self.close()
+
+    def __getattr__(self, name):
+        if self._conn is None:
+            raise AttributeError(f'连接已归还到连接池，无法访问 {name}')
+        return getattr(self._conn, name)
+
+class PostgresConnectionPool:
+    """进程级PostgreSQL连接池，Serverless热启动时跨调用复用连接，避免每次查询都重新做TLS握手
+
+    创建时在后台线程预先建立 min_size 个连接，冷启动时建连与模块导入等初始化工作并行；
+    空闲超过 validate_after 秒的连接在取出时先用 SELECT 1 验证，失效（例如被服务端空闲断开）则丢弃并重连；
+    空闲超过 max_idle 秒且超出 min_size 的连接直接关闭。pooler 模式用于PgBouncer / Neon pooled 地址：
+    不发送启动参数 options，归还时结束事务，不依赖任何会话级状态。
+    """
+
+    def __init__(self, pg_config: Dict, min_size: int = None, max_size: int = None, timeout: float = None,
+                 validate_after: float = None, max_idle: float = None, pooler: bool = None):
+        self.pg_config = dict(pg_config)
+        self.min_size = min_size if min_size is not None else int(os.getenv('XHS_PG_POOL_MIN', '1'))
+        self.max_size = max_size or int(os.getenv('XHS_PG_POOL_MAX', '5'))
+        self.timeout = timeout or float(os.getenv('XHS_PG_POOL_TIMEOUT', '10'))
+        self.validate_after = validate_after if validate_after is not None else float(os.getenv('XHS_PG_VALIDATE_AFTER', '30'))
+        self.max_idle = max_idle or float(os.getenv('XHS_PG_MAX_IDLE', '240'))
+        if pooler is None:
+            setting = os.getenv('XHS_PG_POOLER', 'auto').lower()
+            # Neon 的连接池地址形如 ep-xxx-pooler.region.aws.neon.tech
+            pooler = '-pooler' in (self.pg_config.get('host') or '') if setting == 'auto' else setting in ('1', 'true', 'yes')
+        self.pooler = pooler
+
+        self.connect_kwargs = dict(self.pg_config)
+        self.connect_kwargs.setdefault('connect_timeout', int(os.getenv('XHS_PG_CONNECT_TIMEOUT', '5')))
+        # TCP keepalive 让空闲时被中间设备断开的连接尽早暴露
+        self.connect_kwargs.update(keepalives=1, keepalives_idle=30, keepalives_interval=10, keepalives_count=3)
+        statement_timeout = int(os.getenv('XHS_PG_STATEMENT_TIMEOUT', '0'))
+        if statement_timeout and not self.pooler:
+            self.connect_kwargs['options'] = f'-c statement_timeout={statement_timeout}'
+
+        self._cond = threading.Condition()
+        self._idle = []  # [(conn, last_used)]
+        self._size = 0
+        self._closed = False
+        self._stats = {
+            'checkouts': 0,
+            'reused': 0,
+            'connects': 0,
+            'connect_time_ms': 0.0,
+            'max_connect_ms': 0.0,
+            'queries': 0,
+            'query_time_ms': 0.0,
+            'waits': 0,
+            'wait_time_ms': 0.0,
+            'validations': 0,
+            'validation_failures': 0,
+            'discarded': 0
+        }
+
+    def _connect(self):
+        """新建连接并记录建连耗时（不持有锁，避免建连期间阻塞其他线程归还连接）"""
+        import psycopg2
+        start = time.perf_counter()
+        conn = psycopg2.connect(**self.connect_kwargs)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with self._cond:
+            self._stats['connects'] += 1
+            self._stats['connect_time_ms'] += elapsed_ms
+            self._stats['max_connect_ms'] = max(self._stats['max_connect_ms'], elapsed_ms)
+        return conn
+
+    def prewarm(self) -> int:
+        """建立连接直到打开的连接数达到 min_size，返回新建的连接数；建连失败时打印错误并停止"""
+        opened = 0
+        while True:
+            with self._cond:
+                if self._closed or self._size >= self.min_size:
+                    return opened
+                self._size += 1
+            try:
+                conn = self._connect()
+            except Exception as e:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                print(f"PostgreSQL连接池预热失败: {e}")
+                return opened
+            with self._cond:
+                if self._closed:
+                    self._discard(conn)
+                else:
+                    self._idle.append((conn, time.monotonic()))
+                self._cond.notify()
+            opened += 1
+
+    def _is_usable(self, conn, last_used: float) -> bool:
+        """连接是否可以直接交给调用方，空闲较久的连接做一次往返验证"""
+        if conn.closed:
+            return False
+        if time.monotonic() - last_used <= self.validate_after:
+            return True
+        with self._cond:
+            self._stats['validations'] += 1
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute('SELECT 1')
+                cursor.fetchone()
+            conn.rollback()
+            return True
+        except Exception:
+            with self._cond:
+                self._stats['validation_failures'] += 1
+            return False
+
+    def _prune_idle(self) -> None:
+        """关闭空闲过久且超出 min_size 的连接（调用方需持有锁）"""
+        now = time.monotonic()
+        keep = []
+        for conn, last_used in sorted(self._idle, key=lambda item: item[1], reverse=True):
+            if len(keep) >= self.min_size and now - last_used > self.max_idle:
+                self._discard(conn)
+            else:
+                keep.append((conn, last_used))
+        keep.reverse()
+        self._idle = keep
+
+    def checkout(self) -> PooledConnection:
+        """取出一个连接，优先复用最近归还的空闲连接"""
+        import psycopg2
+        while True:
+            with self._cond:
+                if self._closed:
+                    raise psycopg2.InterfaceError('连接池已关闭')
+                self._prune_idle()
+
+                if not self._idle and self._size >= self.max_size:
+                    self._stats['waits'] += 1
+                    wait_start = time.perf_counter()
+                    deadline = wait_start + self.timeout
+                    while not self._idle and self._size >= self.max_size:
+                        remaining = deadline - time.perf_counter()
+                        if remaining <= 0:
+                            raise psycopg2.OperationalError(f'等待数据库连接超时 ({self.timeout}s)')
+                        self._cond.wait(remaining)
+                    self._stats['wait_time_ms'] += (time.perf_counter() - wait_start) * 1000
+
+                self._stats['checkouts'] += 1
+                if self._idle:
+                    conn, last_used = self._idle.pop()
+                else:
+                    conn, last_used = None, None
+                    self._size += 1
+
+            if conn is None:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+                return PooledConnection(conn, self)
+
+            if self._is_usable(conn, last_used):
+                with self._cond:
+                    self._stats['reused'] += 1
+                return PooledConnection(conn, self)
+
+            # 连接已失效，丢弃后重新取
+            with self._cond:
+                self._discard(conn)
+                self._cond.notify()
+
+    def checkin(self, conn) -> None:
+        """归还连接，结束未提交的事务；连接已断开或状态异常时丢弃"""
+        healthy = not conn.closed
+        if healthy:
+            try:
+                conn.rollback()
+            except Exception:
+                healthy = False
+
+        with self._cond:
+            if healthy and not self._closed:
+                self._idle.append((conn, time.monotonic()))
+            else:
+                self._discard(conn)
+            self._cond.notify()
+
+    def _discard(self, conn) -> None:
+        """关闭并丢弃连接（调用方需持有锁）"""
+        try:
+            conn.close()
+        except Exception:
+            pass
+        self._size -= 1
+        self._stats['discarded'] += 1
+
+    def record_query(self, seconds: float) -> None:
+        with self._cond:
+            self._stats['queries'] += 1
+            self._stats['query_time_ms'] += seconds * 1000
+
+    def get_stats(self) -> Dict:
+        """获取连接池统计信息，对比建连耗时和查询耗时"""
+        with self._cond:
+            stats = dict(self._stats)
+            open_connections = self._size
+            idle_connections = len(self._idle)
+        for key in ('connect_time_ms', 'max_connect_ms', 'query_time_ms', 'wait_time_ms'):
+            stats[key] = round(stats[key], 3)
+        stats['avg_connect_ms'] = round(stats['connect_time_ms'] / stats['connects'], 3) if stats['connects'] else 0.0
+        stats['avg_query_ms'] = round(stats['query_time_ms'] / stats['queries'], 3) if stats['queries'] else 0.0
+        stats['reuse_ratio'] = round(stats['reused'] / stats['checkouts'], 4) if stats['checkouts'] else 0.0
+        stats.update(min_size=self.min_size, max_size=self.max_size, pooler=self.pooler,
+                     open_connections=open_connections, idle_connections=idle_connections,
+                     in_use_connections=open_connections - idle_connections)
+        return stats
+
+    def close_all(self) -> None:
+        """关闭所有空闲连接，正在使用的连接归还时关闭"""
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                conn, _ = self._idle.pop()
+                self._discard(conn)
+            self._cond.notify_all()
+
+# 按连接配置缓存的进程级连接池，模块在Serverless热启动之间保留，连接池随之复用
+_postgres_pools = {}
+_postgres_pools_lock = threading.Lock()
+
+def get_postgres_pool(pg_config: Dict) -> PostgresConnectionPool:
+    """获取（或创建）给定连接配置的共享连接池"""
+    key = tuple(sorted((k, str(v)) for k, v in pg_config.items()))
+    with _postgres_pools_lock:
+        pool = _postgres_pools.get(key)
+        if pool is None:
+            pool = PostgresConnectionPool(pg_config)
+            _postgres_pools[key] = pool
+            if pool.min_size > 0:
+                threading.Thread(target=pool.prewarm, name='xhs-pg-prewarm', daemon=True).start()
+        return pool
+
+# 已确认结构为最新版本的数据库（按数据库标识），同一进程内只检查一次，热启动的请求直接跳过
+_schema_ready = set()
+
+# 持久保存在数据库文件中的PRAGMA（journal_mode=WAL 设置时需要获取锁），每个文件在进程内只设置一次
+PERSISTENT_SQLITE_PRAGMAS = ('journal_mode',)
+_sqlite_files_ready = set()
+_sqlite_files_lock = threading.Lock()
+# 每个线程按数据库路径复用一个连接：{db_path: [连接, 借出次数]}
+_sqlite_local = threading.local()
+
+class SQLiteThreadConnection:
+    """当前线程复用的 sqlite3 连接代理：close() 归还连接而不是断开，其余属性和方法直接转发"""
+
+    def __init__(self, conn, release):
+        self._conn = conn
+        self._release = release
+
+    def close(self):
+        """归还连接，重复调用无副作用"""
+        if self._release is not None:
+            release, self._release = self._release, None
+            release()
+
+    def __del__(self):
+        # 调用方忘记 close() 时在回收代理时归还，未提交的事务随之回滚（与原来连接被回收时一致）
+        self.close()
+
+    @property
+    def raw_connection(self):
+        """底层的 sqlite3 连接"""
+        return self._conn
+
+    def __enter__(self):
+        self._conn.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # 与 sqlite3 一致：正常退出提交，异常回滚，不关闭连接
+        return self._conn.__exit__(exc_type, exc, tb)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
 
 class DatabaseManager:
     def __init__(self):
@@ -33,6 +499,7 @@ class DatabaseManager:
                     'password': url.password,
                     'sslmode': 'require'
                 }
+                self.pg_pool = get_postgres_pool(self.pg_config)
                 print(f"[DB] Using PostgreSQL/Neon database: {url.hostname}")
             except ImportError as e:
                 print(f"[DB] psycopg2 not available: {e}")
@@ -47,23 +514,127 @@ class DatabaseManager:
                 project_root = r'C:\Users\sr9rfx\.claude\xiaohongshuarticleextrator'
                 self.db_path = os.path.join(project_root, 'xiaohongshu_notes.db')
             print(f"[DB] Using SQLite database path: {self.db_path}")
+            
+            self.sqlite_profile = os.getenv('XHS_SQLITE_PROFILE', 'production')
+            self.sqlite_pragmas = SQLITE_PROFILES.get(self.sqlite_profile, {})
+            self.maintenance_interval = float(os.getenv('XHS_SQLITE_MAINTENANCE_INTERVAL', '300'))
+            self.last_maintenance = time.monotonic()
     
     def get_connection(self):
         """获取数据库连接"""
         if self.use_postgres:
             try:
-                import psycopg2
-                conn = psycopg2.connect(**self.pg_config)
-                return conn
+                # 从进程级连接池取出，conn.close() 会归还连接而不是断开
+                return self.pg_pool.checkout()
             except Exception as e:
                 print(f"PostgreSQL连接失败: {e}")
                 print(f"连接配置: {self.pg_config}")
                 raise
         else:
-            return sqlite3.connect(self.db_path)
+            connections = getattr(_sqlite_local, 'connections', None)
+            if connections is None:
+                connections = _sqlite_local.connections = {}
+            entry = connections.get(self.db_path)
+            if entry is None:
+                entry = connections[self.db_path] = [self._connect_sqlite(), 0]
+            conn = entry[0]
+            if entry[1] == 0 and conn.in_transaction:
+                # 上一个调用方没有 close()，丢弃它未提交的事务（与原来连接被回收时一致）
+                conn.rollback()
+            entry[1] += 1
+            return SQLiteThreadConnection(conn, lambda: self._release_sqlite(entry))
+    
+    def _connect_sqlite(self) -> sqlite3.Connection:
+        """新建当前线程的SQLite连接：持久PRAGMA每个文件只设置一次，其余按连接设置"""
+        conn = sqlite3.connect(self.db_path)
+        path = os.path.abspath(self.db_path)
+        with _sqlite_files_lock:
+            if path not in _sqlite_files_ready:
+                for name in PERSISTENT_SQLITE_PRAGMAS:
+                    if name in self.sqlite_pragmas:
+                        conn.execute(f'PRAGMA {name} = {self.sqlite_pragmas[name]}').fetchall()
+                _sqlite_files_ready.add(path)
+        for name, value in self.sqlite_pragmas.items():
+            if name not in PERSISTENT_SQLITE_PRAGMAS:
+                conn.execute(f'PRAGMA {name} = {value}').fetchall()
+        return conn
+    
+    @staticmethod
+    def _release_sqlite(entry: List) -> None:
+        """归还线程连接；同一线程嵌套借出时只有最外层归还才回滚未提交的事务"""
+        entry[1] -= 1
+        if entry[1] == 0 and entry[0].in_transaction:
+            entry[0].rollback()
+    
+    def get_pool_stats(self) -> Dict:
+        """获取PostgreSQL连接池统计（建连耗时、查询耗时、复用率），SQLite模式返回空字典"""
+        if self.use_postgres:
+            return self.pg_pool.get_stats()
+        return {}
+    
+    def get_sqlite_pragmas(self) -> Dict:
+        """获取SQLite连接上实际生效的PRAGMA设置"""
+        if self.use_postgres:
+            return {}
+        conn = self.get_connection()
+        try:
+            names = ['journal_mode', 'synchronous', 'busy_timeout', 'cache_size', 'mmap_size', 'temp_store']
+            active = {name: conn.execute(f'PRAGMA {name}').fetchone()[0] for name in names}
+            active['profile'] = self.sqlite_profile
+            return active
+        finally:
+            conn.close()
+    
+    def run_sqlite_maintenance(self, force: bool = False) -> bool:
+        """距上次维护超过间隔时执行WAL检查点和PRAGMA optimize（Serverless环境下没有后台线程，按请求顺带执行）"""
+        if self.use_postgres:
+            return False
+        if not force and time.monotonic() - self.last_maintenance < self.maintenance_interval:
+            return False
+        
+        self.last_maintenance = time.monotonic()
+        conn = self.get_connection()
+        try:
+            conn.execute('PRAGMA wal_checkpoint(PASSIVE)').fetchone()
+            conn.execute('PRAGMA optimize')
+            conn.execute('DELETE FROM short_links WHERE expires_at <= ?', (int(time.time()),))
+            conn.commit()
+            return True
+        except Exception as e:
+            print(f"SQLite维护失败: {e}")
+            return False
+        finally:
+            conn.close()
+    
+    def schema_key(self) -> str:
+        """数据库标识，用于记录结构是否已就绪"""
+        if self.use_postgres:
+            return f"postgres://{self.pg_config.get('host')}:{self.pg_config.get('port')}/{self.pg_config.get('database')}"
+        return f"sqlite://{os.path.abspath(self.db_path)}"
+    
+    def schema_is_current(self, conn) -> bool:
+        """单行查询 schema_version，已记录到最新迁移版本时返回True（表不存在视为未初始化）"""
+        try:
+            cursor = conn.cursor()
+            cursor.execute('SELECT MAX(version) FROM schema_version')
+            row = cursor.fetchone()
+            return bool(row) and row[0] is not None and row[0] >= LATEST_SCHEMA_VERSION
+        except Exception:
+            # PostgreSQL查询失败后事务处于中止状态，回滚后才能继续建表
+            conn.rollback()
+            return False
     
     def init_database(self):
-        """初始化数据库表"""
+        """初始化数据库表
+        
+        每个进程对每个数据库只检查一次：冷启动时先单行查询 schema_version，
+        已是最新版本就不再执行建表语句和迁移，之后的请求直接返回
+        """
+        key = self.schema_key()
+        if key in _schema_ready:
+            self.run_sqlite_maintenance()
+            return True
+        
         try:
             conn = self.get_connection()
             cursor = conn.cursor()
@@ -72,14 +643,14 @@ class DatabaseManager:
             return False
         
         try:
-            # Quick check if database is already initialized
-            if not self.use_postgres:
-                cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='users'")
-                if cursor.fetchone():
-                    # Database already initialized, skip expensive table creation
-                    conn.close()
-                    return True
+            if self.schema_is_current(conn):
+                _schema_ready.add(key)
+                self.run_sqlite_maintenance()
+                return True
+            
             if self.use_postgres:
+                # 与迁移共用咨询锁：并发执行 CREATE TABLE IF NOT EXISTS 仍可能因系统表唯一约束冲突而失败
+                cursor.execute('SELECT pg_advisory_xact_lock(%s)', (MIGRATION_LOCK_ID,))
                 # PostgreSQL建表语句
                 cursor.execute('''
                     CREATE TABLE IF NOT EXISTS users (
@@ -255,6 +826,14 @@ class DatabaseManager:
                 ''')
             
             conn.commit()
+            
+            # 执行版本迁移（索引等）；会重写整表的迁移只在 notes 为空（新数据库）时随请求执行，否则留给部署步骤
+            cursor.execute('SELECT NOT EXISTS (SELECT 1 FROM notes)')
+            fresh = bool(cursor.fetchone()[0])
+            conn.commit()
+            migrate_schema(conn, 'postgres' if self.use_postgres else 'sqlite', deploy=fresh)
+            if self.schema_is_current(conn):
+                _schema_ready.add(key)
             return True
             
         except Exception as e:
@@ -413,58 +992,174 @@ class DatabaseManager:
         finally:
             conn.close()
     
-    def get_notes(self, user_id: int, page: int = 1, per_page: int = 10) -> List[Dict]:
-        """获取用户笔记列表"""
+    def _note_filters(self, author_id: str = None, min_likes: int = None) -> Tuple[str, List]:
+        """笔记列表的附加筛选条件，返回 (SQL片段, 参数)"""
+        p = '%s' if self.use_postgres else '?'
+        clauses = []
+        params = []
+        if author_id:
+            clauses.append(f'AND author_user_id = {p}')
+            params.append(author_id)
+        if min_likes is not None:
+            clauses.append(f'AND likes >= {p}')
+            params.append(min_likes)
+        return ' '.join(clauses), params
+    
+    def _fetch_notes(self, user_id: int, limit: int, offset: int = 0, after: Tuple = None, sort: str = 'created',
+                     author_id: str = None, min_likes: int = None, raw_json: bool = False, with_total: bool = False):
+        """查询一页笔记；after 为 (created_at, id) 时按游标向后翻页（仅支持按创建时间排序）
+        
+        筛选和排序都在数据库中完成，sort 无效时抛出 ValueError。
+        raw_json=True 时 author_data / stats_data 以及 images_data 中的 images / videos 为 RawJSON 片段，
+        供列表接口直接拼接到响应中。
+        with_total=True 时在同一条SQL中用标量子查询统计（同样筛选条件下的）总数，返回 (笔记列表, 总数)，
+        没有返回行时总数为 None。
+        """
+        if sort not in NOTE_SORTS:
+            raise ValueError(f'不支持的排序方式: {sort}')
+        
         conn = self.get_connection()
         cursor = conn.cursor()
         
         try:
-            offset = (page - 1) * per_page
+            p = '%s' if self.use_postgres else '?'
+            filter_clause, filter_params = self._note_filters(author_id, min_likes)
+            params = [user_id] + filter_params
+            total_clause = ''
+            if with_total:
+                total_clause = f', (SELECT COUNT(*) FROM notes WHERE user_id = {p} {filter_clause}) AS total_count'
+                params = params * 2
+            keyset_clause = ''
+            if after is not None:
+                keyset_clause = f'AND (created_at < {p} OR (created_at = {p} AND id < {p}))'
+                params.extend([after[0], after[0], after[1]])
+            params.extend([limit, offset])
             
-            if self.use_postgres:
-                cursor.execute('''
-                    SELECT * FROM notes WHERE user_id = %s 
-                    ORDER BY created_at DESC LIMIT %s OFFSET %s
-                ''', (user_id, per_page, offset))
-            else:
-                cursor.execute('''
-                    SELECT * FROM notes WHERE user_id = ? 
-                    ORDER BY created_at DESC LIMIT ? OFFSET ?
-                ''', (user_id, per_page, offset))
+            dialect = 'postgres' if self.use_postgres else 'sqlite'
+            select_columns = f'{NOTE_LIST_COLUMNS}, {NOTE_JSON_FRAGMENTS[dialect]}' if raw_json else '*'
+            cursor.execute(f'''
+                SELECT {select_columns} {total_clause} FROM notes WHERE user_id = {p} {filter_clause} {keyset_clause}
+                ORDER BY {NOTE_SORTS[sort]} LIMIT {p} OFFSET {p}
+            ''', params)
             
             rows = cursor.fetchall()
             columns = [desc[0] for desc in cursor.description]
             
             notes = []
+            total = None
             for row in rows:
                 note = dict(zip(columns, row))
-                # 解析JSON字段
-                try:
-                    note['author_data'] = json.loads(note['author_data']) if note['author_data'] else {}
-                    note['stats_data'] = json.loads(note['stats_data']) if note['stats_data'] else {}
-                    note['images_data'] = json.loads(note['images_data']) if note['images_data'] else []
-                except:
-                    pass
+                if with_total:
+                    total = note.pop('total_count')
+                if raw_json:
+                    self._attach_json_fragments(note)
+                else:
+                    # 解析JSON字段
+                    note['author_data'] = load_json_column(note.get('author_data'), {})
+                    note['stats_data'] = load_json_column(note.get('stats_data'), {})
+                    note['images_data'] = load_json_column(note.get('images_data'), [])
                 notes.append(note)
             
+            if with_total:
+                return notes, total
             return notes
-            
+        finally:
+            conn.close()
+    
+    def _attach_json_fragments(self, note: Dict) -> None:
+        """把 NOTE_JSON_FRAGMENTS 查出的文本包装为 RawJSON，缺失或无效的值与 load_json_column 的默认值一致"""
+        if self.use_postgres:
+            # JSONB的null由驱动解析为None，原流程会替换为默认值
+            for key in ('author_data', 'stats_data'):
+                text = note.get(key)
+                note[key] = RawJSON(text if text not in (None, 'null') else '{}')
+            note['images_data'] = {
+                'images': RawJSON(note.pop('images_json')),
+                'videos': RawJSON(note.pop('videos_json'))
+            }
+            return
+        
+        note['author_data'] = RawJSON(note['author_data'] or '{}')
+        note['stats_data'] = RawJSON(note['stats_data'] or '{}')
+        media = note['images_data']
+        fragments = split_media_json(media) if media else ('[]', '[]')
+        if fragments:
+            note['images_data'] = {'images': RawJSON(fragments[0]), 'videos': RawJSON(fragments[1])}
+        else:
+            note['images_data'] = load_json_column(media, [])
+    
+    def get_notes(self, user_id: int, page: int = 1, per_page: int = 10, sort: str = 'created',
+                  author_id: str = None, min_likes: int = None, raw_json: bool = False) -> List[Dict]:
+        """获取用户笔记列表，可按点赞数排序、按作者或最低点赞数筛选
+        
+        sort 无效时抛出 ValueError；raw_json 见 _fetch_notes。
+        """
+        if sort not in NOTE_SORTS:
+            raise ValueError(f'不支持的排序方式: {sort}')
+        try:
+            return self._fetch_notes(user_id, per_page, (page - 1) * per_page, sort=sort,
+                                     author_id=author_id, min_likes=min_likes, raw_json=raw_json)
         except Exception as e:
             print(f"获取笔记列表失败: {e}")
             return []
-        finally:
-            conn.close()
     
-    def get_notes_count(self, user_id: int) -> int:
-        """获取用户笔记总数"""
+    def get_notes_with_total(self, user_id: int, page: int = 1, per_page: int = 10, sort: str = 'created',
+                             author_id: str = None, min_likes: int = None, raw_json: bool = False,
+                             exact_total: bool = True) -> Dict:
+        """获取一页笔记和总数，一次查询完成（PostgreSQL下只占用一次连接和一次往返）
+        
+        exact_total=False 时不统计总数，多取一条判断 has_more（见 build_offset_page）；sort 无效时抛出 ValueError。
+        """
+        if sort not in NOTE_SORTS:
+            raise ValueError(f'不支持的排序方式: {sort}')
+        offset = (page - 1) * per_page
+        try:
+            if not exact_total:
+                notes = self._fetch_notes(user_id, per_page + 1, offset, sort=sort, author_id=author_id,
+                                          min_likes=min_likes, raw_json=raw_json)
+                return build_offset_page(notes, per_page, offset)
+            notes, total = self._fetch_notes(user_id, per_page, offset, sort=sort, author_id=author_id,
+                                             min_likes=min_likes, raw_json=raw_json, with_total=True)
+            if total is None:
+                # 页面为空（偏移超出范围）时才单独统计
+                total = self.get_notes_count(user_id, author_id, min_likes) if offset > 0 else 0
+            return build_offset_page(notes, per_page, offset, total)
+        except Exception as e:
+            print(f"获取笔记列表失败: {e}")
+            return build_offset_page([], per_page, offset, 0)
+    
+    def get_notes_page(self, user_id: int, per_page: int = 10, cursor: str = None,
+                       author_id: str = None, min_likes: int = None, raw_json: bool = False) -> Dict:
+        """按游标获取用户笔记列表，多取一条判断 has_more，不需要 COUNT(*)
+        
+        cursor 无效时抛出 ValueError。
+        """
+        after = decode_cursor(cursor) if cursor else None
+        try:
+            notes = self._fetch_notes(user_id, per_page + 1, after=after, author_id=author_id, min_likes=min_likes,
+                                      raw_json=raw_json)
+        except Exception as e:
+            print(f"获取笔记列表失败: {e}")
+            notes = []
+        
+        has_more = len(notes) > per_page
+        notes = notes[:per_page]
+        next_cursor = encode_cursor(notes[-1]['created_at'], notes[-1]['id']) if has_more and notes else None
+        return {
+            'items': notes,
+            'has_more': has_more,
+            'next_cursor': next_cursor
+        }
+    
+    def get_notes_count(self, user_id: int, author_id: str = None, min_likes: int = None) -> int:
+        """获取用户笔记总数（与 get_notes 使用相同的筛选条件）"""
         conn = self.get_connection()
         cursor = conn.cursor()
         
         try:
-            if self.use_postgres:
-                cursor.execute('SELECT COUNT(*) FROM notes WHERE user_id = %s', (user_id,))
-            else:
-                cursor.execute('SELECT COUNT(*) FROM notes WHERE user_id = ?', (user_id,))
+            p = '%s' if self.use_postgres else '?'
+            filter_clause, params = self._note_filters(author_id, min_likes)
+            cursor.execute(f'SELECT COUNT(*) FROM notes WHERE user_id = {p} {filter_clause}', [user_id] + params)
             
             count = cursor.fetchone()[0]
             return count
@@ -644,6 +1339,98 @@ class DatabaseManager:
             return False
         finally:
             conn.close()
+    
+    def get_short_link(self, short_url: str) -> Optional[Dict]:
+        """获取未过期的短链接解析结果"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            p = '%s' if self.use_postgres else '?'
+            cursor.execute(f'''
+                SELECT short_url, resolved_url, note_id, xsec_token, expires_at
+                FROM short_links WHERE short_url = {p} AND expires_at > {p}
+            ''', (short_url, int(time.time())))
+            row = cursor.fetchone()
+            if not row:
+                return None
+            return {
+                'short_url': row[0],
+                'resolved_url': row[1],
+                'note_id': row[2],
+                'xsec_token': row[3],
+                'expires_at': row[4]
+            }
+            
+        except Exception as e:
+            print(f"获取短链接缓存失败: {e}")
+            return None
+        finally:
+            conn.close()
+    
+    def save_short_link(self, short_url: str, resolved_url: str, note_id: str, xsec_token: str, expires_at: int) -> bool:
+        """保存短链接解析结果，已存在时覆盖"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            p = '%s' if self.use_postgres else '?'
+            cursor.execute(f'''
+                INSERT INTO short_links (short_url, resolved_url, note_id, xsec_token, expires_at)
+                VALUES ({p}, {p}, {p}, {p}, {p})
+                ON CONFLICT (short_url) DO UPDATE SET
+                    resolved_url = EXCLUDED.resolved_url,
+                    note_id = EXCLUDED.note_id,
+                    xsec_token = EXCLUDED.xsec_token,
+                    expires_at = EXCLUDED.expires_at
+            ''', (short_url, resolved_url, note_id, xsec_token, int(expires_at)))
+            conn.commit()
+            return True
+            
+        except Exception as e:
+            print(f"保存短链接缓存失败: {e}")
+            return False
+        finally:
+            conn.close()
+    
+    def get_cached_note(self, note_id: str) -> Optional[Dict]:
+        """获取笔记缓存，返回 {'data': 笔记数据, 'fetched_at': 采集时间戳}"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            p = '%s' if self.use_postgres else '?'
+            cursor.execute(f'SELECT data, fetched_at FROM note_cache WHERE note_id = {p}', (note_id,))
+            row = cursor.fetchone()
+            if not row:
+                return None
+            return {'data': json.loads(row[0]), 'fetched_at': row[1]}
+            
+        except Exception as e:
+            print(f"获取笔记缓存失败: {e}")
+            return None
+        finally:
+            conn.close()
+    
+    def save_cached_note(self, note_id: str, data: Dict, fetched_at: int) -> bool:
+        """保存笔记缓存，已存在时覆盖"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            p = '%s' if self.use_postgres else '?'
+            cursor.execute(f'''
+                INSERT INTO note_cache (note_id, data, fetched_at) VALUES ({p}, {p}, {p})
+                ON CONFLICT (note_id) DO UPDATE SET data = EXCLUDED.data, fetched_at = EXCLUDED.fetched_at
+            ''', (note_id, json.dumps(data, ensure_ascii=False), int(fetched_at)))
+            conn.commit()
+            return True
+            
+        except Exception as e:
+            print(f"保存笔记缓存失败: {e}")
+            return False
+        finally:
+            conn.close()
 
 # 全局数据库实例
 db = DatabaseManager()
\ No newline at end of file
@@ -0,0 +1,501 @@
+"""
+数据库结构版本迁移 - Vercel兼容版本
+按版本号顺序执行迁移步骤，已执行的版本记录在 schema_version 表中，支持SQLite和PostgreSQL
+
+用法:
+    python api/_migrations.py --dry-run       # 只列出待执行的迁移
+    python api/_migrations.py                 # 对 DATABASE_URL 指向的数据库执行迁移（部署时执行，含重写整表的迁移）
+    python api/_migrations.py --check-plans   # 在临时SQLite数据库上用 EXPLAIN 检查列表和历史查询是否走索引
+"""
+import argparse
+import os
+import sys
+import tempfile
+from typing import Dict, List, Sequence, Tuple
+
+
+class Migration:
+    """单个迁移步骤，分别提供SQLite和PostgreSQL的语句"""
+
+    def __init__(self, version: int, name: str, sqlite: Sequence[str] = (), postgres: Sequence[str] = None,
+                 reports: Dict[str, Sequence[Tuple[str, str]]] = None, deploy_only: bool = False):
+        self.version = version
+        self.name = name
+        self.sqlite = list(sqlite)
+        self.postgres = list(postgres) if postgres is not None else list(sqlite)
+        # 执行后在同一事务中运行的检查 {方言: [(返回单个计数的SQL, 计数大于0时打印的提示，{} 为计数)]}
+        self.reports = reports or {}
+        # PostgreSQL上需要重写整表（ACCESS EXCLUSIVE 锁）的迁移：不在 init_database 的请求路径中执行，
+        # 由部署步骤运行本文件执行；表中还没有数据的新数据库除外
+        self.deploy_only = deploy_only
+
+    def statements(self, dialect: str) -> List[str]:
+        return self.postgres if dialect == 'postgres' else self.sqlite
+
+
+def sqlite_count_expression(key: str) -> str:
+    """SQLite中把 stats_data 的计数（如 "123"、"1.2万"、"10万+"）解析为整数的表达式，与 xhs_parse_count 一致"""
+    value = f"json_extract(stats_data, '$.{key}')"
+    return (f"CASE WHEN json_valid(stats_data) THEN COALESCE(CAST(CAST({value} AS REAL) * "
+            f"(CASE WHEN {value} LIKE '%亿%' THEN 100000000 WHEN {value} LIKE '%万%' THEN 10000 ELSE 1 END)"
+            f" AS INTEGER), 0) ELSE 0 END")
+
+
+# DatabaseManager (_database.py) 的迁移列表，SQLite和PostgreSQL共用，版本号必须递增
+MIGRATIONS = [
+    Migration(1, 'list_and_count_indexes', [
+        # 笔记列表 / 游标分页 / 计数: WHERE user_id = ? ORDER BY created_at DESC, id DESC
+        'CREATE INDEX IF NOT EXISTS idx_notes_user_created ON notes (user_id, created_at DESC, id DESC)',
+        # 二创历史列表，以及删除笔记时按 note_id 清理历史
+        'CREATE INDEX IF NOT EXISTS idx_recreate_history_user_created ON recreate_history (user_id, created_at DESC, id DESC)',
+        'CREATE INDEX IF NOT EXISTS idx_recreate_history_note_id ON recreate_history (note_id)',
+        # 视觉故事历史列表
+        'CREATE INDEX IF NOT EXISTS idx_visual_story_user_created ON visual_story_history (user_id, created_at DESC, id DESC)',
+    ]),
+    Migration(2, 'short_link_cache', [
+        # 短链接解析缓存：xhslink.com 短链接 -> 标准链接 / 笔记ID / xsec_token，expires_at 为Unix时间戳（秒）
+        '''CREATE TABLE IF NOT EXISTS short_links (
+            short_url TEXT PRIMARY KEY,
+            resolved_url TEXT NOT NULL,
+            note_id TEXT,
+            xsec_token TEXT,
+            expires_at BIGINT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )''',
+        'CREATE INDEX IF NOT EXISTS idx_short_links_expires_at ON short_links (expires_at)',
+    ]),
+    Migration(3, 'note_fetch_cache', [
+        # 笔记采集结果缓存（所有用户共享），data 为格式化后的笔记JSON，fetched_at 为Unix时间戳（秒）
+        '''CREATE TABLE IF NOT EXISTS note_cache (
+            note_id TEXT PRIMARY KEY,
+            data TEXT NOT NULL,
+            fetched_at BIGINT NOT NULL
+        )''',
+    ]),
+    Migration(4, 'notes_jsonb_and_promoted_columns', [
+        # SQLite: 从JSON文本派生的虚拟列，按点赞排序、按作者筛选可以走索引
+        f"ALTER TABLE notes ADD COLUMN likes INTEGER GENERATED ALWAYS AS ({sqlite_count_expression('likes')}) VIRTUAL",
+        f"ALTER TABLE notes ADD COLUMN collects INTEGER GENERATED ALWAYS AS ({sqlite_count_expression('collects')}) VIRTUAL",
+        f"ALTER TABLE notes ADD COLUMN comments INTEGER GENERATED ALWAYS AS ({sqlite_count_expression('comments')}) VIRTUAL",
+        '''ALTER TABLE notes ADD COLUMN author_user_id TEXT GENERATED ALWAYS AS (
+            CASE WHEN json_valid(author_data) THEN json_extract(author_data, '$.user_id') END
+        ) VIRTUAL''',
+        'CREATE INDEX IF NOT EXISTS idx_notes_user_likes ON notes (user_id, likes DESC, id DESC)',
+        'CREATE INDEX IF NOT EXISTS idx_notes_user_author_created ON notes (user_id, author_user_id, created_at DESC, id DESC)',
+    ], postgres=[
+        # PostgreSQL: TEXT JSON 转为 JSONB，计数和作者ID提升为存储的生成列；
+        # 无法解析的旧数据转换后为NULL，转换前原文复制到 notes_invalid_json
+        '''CREATE OR REPLACE FUNCTION xhs_try_jsonb(value TEXT) RETURNS JSONB AS $$
+        BEGIN
+            RETURN NULLIF(value, '')::jsonb;
+        EXCEPTION WHEN others THEN
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql IMMUTABLE''',
+        # 小红书的计数可能是 "123"、"1.2万"、"10万+"；超出BIGINT的异常值截断到上限，避免生成列让 save_note 的写入失败
+        '''CREATE OR REPLACE FUNCTION xhs_parse_count(value TEXT) RETURNS BIGINT AS $$
+        DECLARE
+            parsed NUMERIC := substring(value FROM '[0-9]+[.]?[0-9]*')::numeric;
+        BEGIN
+            IF parsed IS NULL THEN
+                RETURN 0;
+            ELSIF value LIKE '%亿%' THEN
+                parsed := parsed * 100000000;
+            ELSIF value LIKE '%万%' THEN
+                parsed := parsed * 10000;
+            END IF;
+            RETURN LEAST(parsed, 9223372036854775807)::bigint;
+        END;
+        $$ LANGUAGE plpgsql IMMUTABLE''',
+        '''CREATE TABLE IF NOT EXISTS notes_invalid_json (
+            note_id INTEGER PRIMARY KEY,
+            author_data TEXT,
+            stats_data TEXT,
+            images_data TEXT,
+            copied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )''',
+        # 只在列仍是TEXT时转换：表结构可能已由其他进程或手工改为JSONB，重复执行 USING xhs_try_jsonb(...) 会失败
+        '''DO $$
+        BEGIN
+            IF EXISTS (
+                SELECT 1 FROM information_schema.columns
+                WHERE table_schema = current_schema() AND table_name = 'notes'
+                  AND column_name IN ('author_data', 'stats_data', 'images_data') AND data_type <> 'jsonb'
+            ) THEN
+                INSERT INTO notes_invalid_json (note_id, author_data, stats_data, images_data)
+                SELECT id, author_data::text, stats_data::text, images_data::text FROM notes
+                WHERE (NULLIF(author_data::text, '') IS NOT NULL AND xhs_try_jsonb(author_data::text) IS NULL)
+                   OR (NULLIF(stats_data::text, '') IS NOT NULL AND xhs_try_jsonb(stats_data::text) IS NULL)
+                   OR (NULLIF(images_data::text, '') IS NOT NULL AND xhs_try_jsonb(images_data::text) IS NULL)
+                ON CONFLICT (note_id) DO NOTHING;
+                ALTER TABLE notes
+                    ALTER COLUMN author_data TYPE JSONB USING xhs_try_jsonb(author_data::text),
+                    ALTER COLUMN stats_data TYPE JSONB USING xhs_try_jsonb(stats_data::text),
+                    ALTER COLUMN images_data TYPE JSONB USING xhs_try_jsonb(images_data::text);
+            END IF;
+        END
+        $$''',
+        '''ALTER TABLE notes
+            ADD COLUMN IF NOT EXISTS likes BIGINT GENERATED ALWAYS AS (xhs_parse_count(stats_data->>'likes')) STORED,
+            ADD COLUMN IF NOT EXISTS collects BIGINT GENERATED ALWAYS AS (xhs_parse_count(stats_data->>'collects')) STORED,
+            ADD COLUMN IF NOT EXISTS comments BIGINT GENERATED ALWAYS AS (xhs_parse_count(stats_data->>'comments')) STORED,
+            ADD COLUMN IF NOT EXISTS author_user_id TEXT GENERATED ALWAYS AS (author_data->>'user_id') STORED''',
+        'CREATE INDEX IF NOT EXISTS idx_notes_user_likes ON notes (user_id, likes DESC, id DESC)',
+        'CREATE INDEX IF NOT EXISTS idx_notes_user_author_created ON notes (user_id, author_user_id, created_at DESC, id DESC)',
+        # 作者信息和媒体的包含查询，如 author_data @> '{"nickname": "..."}'、images_data @> '{"images": ["<url>"]}'；
+        # 统计数据的查询是范围比较和排序，由上面的生成列和B-tree索引覆盖，GIN对此没有帮助，不为 stats_data 建
+        'CREATE INDEX IF NOT EXISTS idx_notes_author_data ON notes USING GIN (author_data jsonb_path_ops)',
+        'CREATE INDEX IF NOT EXISTS idx_notes_images_data ON notes USING GIN (images_data jsonb_path_ops)',
+    ], reports={
+        'postgres': [('SELECT COUNT(*) FROM notes_invalid_json',
+                      '⚠️  {} 条笔记的JSON数据无法解析，已转换为NULL，原文保存在 notes_invalid_json 表')],
+    }, deploy_only=True),
+]
+
+
+# PostgreSQL 事务级咨询锁的ID：多个进程（如同时冷启动的Serverless实例）同时迁移时排队执行
+MIGRATION_LOCK_ID = 7402113001
+
+
+class MigrationRunner:
+    """迁移执行器，兼容 sqlite3 和 psycopg2 连接"""
+
+    def __init__(self, conn, dialect: str = 'sqlite', migrations: Sequence[Migration] = None):
+        self.conn = conn
+        self.dialect = dialect
+        self.migrations = sorted(migrations if migrations is not None else MIGRATIONS, key=lambda m: m.version)
+        self.placeholder = '%s' if dialect == 'postgres' else '?'
+
+    def lock(self, cursor) -> None:
+        """开启事务并获取迁移锁，提交或回滚时释放：PostgreSQL用咨询锁，SQLite用 BEGIN IMMEDIATE 获取写锁"""
+        if self.dialect == 'postgres':
+            cursor.execute('SELECT pg_advisory_xact_lock(%s)', (MIGRATION_LOCK_ID,))
+        elif not self.conn.in_transaction:
+            # sqlite3 不会为DDL自动开启事务，显式开启以保证迁移原子性
+            cursor.execute('BEGIN IMMEDIATE')
+
+    def ensure_version_table(self) -> None:
+        """创建 schema_version 表"""
+        cursor = self.conn.cursor()
+        self.lock(cursor)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        self.conn.commit()
+
+    def current_version(self) -> int:
+        """获取当前已执行到的版本号"""
+        cursor = self.conn.cursor()
+        cursor.execute('SELECT COALESCE(MAX(version), 0) FROM schema_version')
+        return cursor.fetchone()[0]
+
+    def pending(self) -> List[Migration]:
+        """获取待执行的迁移"""
+        current = self.current_version()
+        return [m for m in self.migrations if m.version > current]
+
+    def is_applied(self, version: int) -> bool:
+        """该版本是否已记录在 schema_version 中"""
+        cursor = self.conn.cursor()
+        cursor.execute(f'SELECT 1 FROM schema_version WHERE version = {self.placeholder}', (version,))
+        return cursor.fetchone() is not None
+
+    def migrate(self, dry_run: bool = False, deploy: bool = True) -> List[Dict]:
+        """执行所有待执行的迁移，dry_run=True 时只返回计划不执行
+        
+        deploy=False 时（请求路径）遇到 PostgreSQL 的 deploy_only 迁移即停止，它和之后的迁移留给部署步骤。
+        """
+        self.ensure_version_table()
+        plan = []
+
+        for migration in self.pending():
+            if migration.deploy_only and self.dialect == 'postgres' and not deploy:
+                print(f"⚠️  数据库迁移 {migration.version} ({migration.name}) 会重写整表，"
+                      f"请在部署时执行: python api/_migrations.py")
+                break
+            statements = migration.statements(self.dialect)
+            plan.append({
+                'version': migration.version,
+                'name': migration.name,
+                'statements': statements
+            })
+            if dry_run:
+                continue
+
+            cursor = self.conn.cursor()
+            try:
+                self.lock(cursor)
+                # 等锁期间其他进程可能已执行完这个迁移，在锁内重新确认
+                if self.is_applied(migration.version):
+                    self.conn.commit()
+                    plan.pop()
+                    continue
+                for statement in statements:
+                    cursor.execute(statement)
+                for query, message in migration.reports.get(self.dialect, []):
+                    cursor.execute(query)
+                    count = cursor.fetchone()[0]
+                    if count:
+                        print(message.format(count))
+
+                p = self.placeholder
+                conflict = 'ON CONFLICT (version) DO NOTHING'
+                cursor.execute(
+                    f'INSERT INTO schema_version (version, name) VALUES ({p}, {p}) {conflict}',
+                    (migration.version, migration.name)
+                )
+                self.conn.commit()
+                print(f"✅ 数据库迁移 {migration.version} ({migration.name}) 执行完成")
+            except Exception as e:
+                self.conn.rollback()
+                print(f"❌ 数据库迁移 {migration.version} ({migration.name}) 失败: {str(e)}")
+                raise
+
+        return plan
+
+
+def migrate(conn, dialect: str = 'sqlite', dry_run: bool = False, deploy: bool = True) -> List[Dict]:
+    """对给定连接执行迁移，deploy 见 MigrationRunner.migrate"""
+    return MigrationRunner(conn, dialect).migrate(dry_run=dry_run, deploy=deploy)
+
+
+class _RecordingCursor:
+    """记录 PostgreSQL 游标实际执行的SQL（参数已代入），其余属性直接转发"""
+
+    def __init__(self, cursor, captured: List[str]):
+        self._cursor = cursor
+        self._captured = captured
+
+    def execute(self, query, params=None):
+        self._captured.append(self._cursor.mogrify(query, params).decode('utf-8'))
+        return self._cursor.execute(query, params)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class _RecordingConnection:
+    """PostgreSQL 连接代理，cursor() 返回 _RecordingCursor"""
+
+    def __init__(self, conn, captured: List[str]):
+        self._conn = conn
+        self._captured = captured
+
+    def cursor(self, *args, **kwargs):
+        return _RecordingCursor(self._conn.cursor(*args, **kwargs), self._captured)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+def _history_request(module, path: str):
+    """不经过socket调用历史列表接口的 do_GET，响应写入内存"""
+    import io
+
+    class PlanRequest(module.handler):
+        def __init__(self):
+            self.path = path
+            self.command = 'GET'
+            self.headers = {}
+            self.wfile = io.BytesIO()
+            self.status = None
+
+        def send_response(self, code, message=None):
+            self.status = code
+
+        def send_header(self, keyword, value):
+            pass
+
+        def end_headers(self):
+            pass
+
+    request = PlanRequest()
+    request.do_GET()
+    if request.status != 200:
+        raise RuntimeError(f'{path} 返回 {request.status}: {request.wfile.getvalue()[:200]!r}')
+
+
+def capture_api_queries(manager, user_id: int) -> Dict[str, List[str]]:
+    """执行 DatabaseManager 的列表/计数方法和历史列表接口，按调用分组返回实际执行的SQL（参数已代入）
+
+    manager 中需要已有该用户的笔记 plan_note_1、二创历史和视觉故事历史，plan_note_1 会被 delete_note 删除。
+    """
+    import xiaohongshu_recreate_history as history_api
+
+    captured = []
+    sqlite_connections = []
+    original_get_connection = manager.get_connection
+
+    def recording_connection():
+        conn = original_get_connection()
+        if manager.use_postgres:
+            return _RecordingConnection(conn, captured)
+        conn.set_trace_callback(captured.append)
+        sqlite_connections.append(conn)
+        return conn
+
+    calls = [
+        ('notes_list', lambda: manager.get_notes(user_id, page=1, per_page=20)),
+        ('notes_page', lambda: manager.get_notes_page(user_id, per_page=20)),
+        ('notes_after', lambda: manager._fetch_notes(user_id, 20, after=('2099-01-01 00:00:00', 1))),
+        ('notes_count', lambda: manager.get_notes_count(user_id)),
+        ('notes_with_total', lambda: manager.get_notes_with_total(user_id, page=1, per_page=20)),
+        ('notes_by_likes', lambda: manager.get_notes(user_id, page=1, per_page=20, sort='likes')),
+        ('notes_by_author', lambda: manager.get_notes(user_id, page=1, per_page=20,
+                                                      author_id='5f1a2b3c000000000100a1b2')),
+        ('notes_count_by_author', lambda: manager.get_notes_count(user_id, author_id='5f1a2b3c000000000100a1b2')),
+        ('notes_min_likes', lambda: manager.get_notes_with_total(user_id, page=1, per_page=20, min_likes=10)),
+        ('recreate_history_list', lambda: _history_request(history_api, '/api/xiaohongshu_recreate_history?limit=20')),
+        ('visual_story_list', lambda: _history_request(
+            history_api, '/api/xiaohongshu_recreate_history?type=visual-story&limit=20')),
+        ('delete_note', lambda: manager.delete_note(user_id, 'plan_note_1')),
+    ]
+
+    groups = {}
+    saved = (history_api.db, history_api.require_auth)
+    manager.get_connection = recording_connection
+    history_api.db, history_api.require_auth = manager, lambda req_data: user_id
+    try:
+        for label, call in calls:
+            del captured[:]
+            call()
+            groups[label] = [statement for statement in captured
+                             if statement.lstrip().upper().startswith(('SELECT', 'WITH', 'DELETE'))]
+    finally:
+        manager.get_connection = original_get_connection
+        history_api.db, history_api.require_auth = saved
+        for conn in sqlite_connections:
+            try:
+                conn.set_trace_callback(None)
+            except Exception:
+                pass  # 已关闭的连接
+    return groups
+
+
+def explain_queries(manager, statements: List[str]) -> List[List[str]]:
+    """返回每条SQL的执行计划（每行一个节点）。PostgreSQL 下关闭 enable_seqscan，
+    此时仍出现 Seq Scan 说明没有可用的索引，与表大小无关"""
+    plans = []
+    conn = manager.get_connection()
+    try:
+        cursor = conn.cursor()
+        if manager.use_postgres:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        for statement in statements:
+            if manager.use_postgres:
+                cursor.execute(f'EXPLAIN {statement}')
+                plans.append([row[0].strip() for row in cursor.fetchall()])
+            else:
+                cursor.execute(f'EXPLAIN QUERY PLAN {statement}')
+                plans.append([row[3] for row in cursor.fetchall()])
+    finally:
+        conn.rollback()
+        conn.close()
+    return plans
+
+
+def full_scans(plan: List[str]) -> List[str]:
+    """执行计划中的全表扫描节点"""
+    return [detail for detail in plan
+            if 'Seq Scan on ' in detail or (detail.startswith('SCAN ') and 'INDEX' not in detail)]
+
+
+def seed_plan_data(manager) -> int:
+    """为执行计划检查写入一个用户、一条笔记、一条二创历史和一条视觉故事历史，返回用户ID"""
+    user_id = manager.create_user(f'plan_user_{os.getpid()}', 'x')
+    manager.save_note({'note_id': 'plan_note_1', 'title': 'plan', 'author': {'user_id': '5f1a2b3c000000000100a1b2'},
+                       'stats': {'likes': 12}}, user_id)
+    placeholder = '%s' if manager.use_postgres else '?'
+    conn = manager.get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT id FROM notes WHERE user_id = {placeholder} AND note_id = 'plan_note_1'", (user_id,))
+        note_id = cursor.fetchone()[0]
+        cursor.execute(f'''
+            INSERT INTO recreate_history (user_id, note_id, original_title, original_content,
+                                          recreated_title, recreated_content)
+            VALUES ({placeholder}, {placeholder}, '', '', '', '')
+        ''', (user_id, note_id))
+        cursor.execute(f"SELECT MAX(id) FROM recreate_history WHERE user_id = {placeholder}", (user_id,))
+        history_id = cursor.fetchone()[0]
+        cursor.execute(f'''
+            INSERT INTO visual_story_history (user_id, history_id, title, content)
+            VALUES ({placeholder}, {placeholder}, '', '')
+        ''', (user_id, history_id))
+        conn.commit()
+    finally:
+        conn.close()
+    return user_id
+
+
+def check_query_plans(manager=None) -> List[str]:
+    """捕获列表、计数和历史列表接口实际执行的SQL，用 EXPLAIN 检查是否存在全表扫描
+
+    不传 manager 时使用临时SQLite数据库；返回发现的问题列表，为空表示所有查询都走了索引。
+    """
+    from _database import DatabaseManager
+
+    temporary = manager is None
+    if temporary:
+        database_url = os.environ.pop('DATABASE_URL', None)
+        try:
+            manager = DatabaseManager()
+        finally:
+            if database_url is not None:
+                os.environ['DATABASE_URL'] = database_url
+        manager.db_path = os.path.join(tempfile.mkdtemp(prefix='xhs_plan_'), 'plan.db')
+    manager.init_database()
+
+    problems = []
+    groups = capture_api_queries(manager, seed_plan_data(manager))
+    for label, statements in groups.items():
+        for statement, plan in zip(statements, explain_queries(manager, statements)):
+            print(f"[{label}] {' '.join(statement.split())[:120]}")
+            for detail in plan:
+                print(f'    {detail}')
+            for detail in full_scans(plan):
+                problems.append(f'全表扫描: {detail} <- [{label}] {" ".join(statement.split())[:80]}')
+
+    if temporary:
+        os.remove(manager.db_path)
+    return problems
+
+
+if __name__ == "__main__":
+    sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+    parser = argparse.ArgumentParser(description='数据库结构版本迁移')
+    parser.add_argument('--dry-run', action='store_true', help='只列出待执行的迁移，不执行')
+    parser.add_argument('--check-plans', action='store_true', help='检查列表查询的执行计划是否走索引')
+    args = parser.parse_args()
+
+    if args.check_plans:
+        issues = check_query_plans()
+        if issues:
+            print("❌ 执行计划检查未通过:")
+            for issue in issues:
+                print(f"   {issue}")
+            sys.exit(1)
+        print("✅ 所有列表和计数查询均使用索引")
+        sys.exit(0)
+
+    from _database import db
+    connection = db.get_connection()
+    try:
+        steps = migrate(connection, 'postgres' if db.use_postgres else 'sqlite', dry_run=args.dry_run)
+    finally:
+        connection.close()
+
+    if not steps:
+        print("✅ 数据库结构已是最新版本")
+    for step in steps:
+        print(f"{'[dry-run] ' if args.dry_run else ''}版本 {step['version']}: {step['name']}")
+        for statement in step['statements']:
+            print(f"    {statement}")
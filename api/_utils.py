@@ -20,6 +20,56 @@ class CustomEncoder(json.JSONEncoder):
         # 让基类处理其他所有类型
         return super().default(obj)
 
+class RawJSON:
+    """已经序列化好的JSON片段（如数据库中存储的JSON文本），由 dumps_json 原样拼接，不再解析和重新编码"""
+    __slots__ = ('text',)
+
+    def __init__(self, text: str):
+        self.text = text
+
+def dumps_json(obj) -> str:
+    """序列化包含 RawJSON 片段的响应，片段按原文输出，不重新格式化
+
+    片段本身是 json.dumps(ensure_ascii=False) 格式（save_note 写入的数据、JSONB的文本输出）时，
+    结果与把片段解析后再 json.dumps(obj, ensure_ascii=False) 逐字节一致；其他格式的片段（紧凑分隔符、
+    JSONB numeric 保留的 2.50 / 0.0000001 等写法）只保证语义相同，见 tests/test_json_passthrough.py。
+    仍由C实现的编码器完成序列化：RawJSON 先编码为带随机标记的占位字符串，再按出现顺序替换为原始片段。
+    """
+    fragments = []
+    marker = f'\x00{os.urandom(6).hex()}\x00'
+
+    def placeholder(value):
+        if isinstance(value, RawJSON):
+            fragments.append(value.text)
+            return marker
+        raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+    text = json.dumps(obj, ensure_ascii=False, default=placeholder)
+    if not fragments:
+        return text
+    # 占位字符串编码为 "\u0000<随机标记>\u0000"，用户数据中的双引号都会转义，不会与之混淆；
+    # 编码器按输出顺序调用 default，切分后的第 i 个间隔对应第 i 个片段
+    parts = text.split(json.dumps(marker))
+    output = [parts[0]]
+    for fragment, part in zip(fragments, parts[1:]):
+        output.append(fragment)
+        output.append(part)
+    return ''.join(output)
+
+def write_json(wfile, obj, chunk_size: int = 64 * 1024) -> None:
+    """分块把响应写入输出流，不在内存中拼出完整响应（适合包含大段HTML的历史记录列表），输出与 json.dumps(obj, ensure_ascii=False) 一致"""
+    buffer = []
+    buffered = 0
+    for chunk in json.JSONEncoder(ensure_ascii=False).iterencode(obj):
+        buffer.append(chunk)
+        buffered += len(chunk)
+        if buffered >= chunk_size:
+            wfile.write(''.join(buffer).encode('utf-8'))
+            buffer = []
+            buffered = 0
+    if buffer:
+        wfile.write(''.join(buffer).encode('utf-8'))
+
 try:
     import jwt
 except ImportError:
@@ -3,18 +3,697 @@
 """
 import requests
 import re
+import copy
 import json
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from datetime import datetime
+from urllib.parse import urlparse
+from collections import OrderedDict, deque
+import random
+import zlib
+import os
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+class HostRateLimiter:
+    """按主机限速：同一主机相邻两次请求至少间隔 min_interval 秒，线程安全"""
+    
+    def __init__(self, min_interval=0.5):
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._next_allowed = {}
+    
+    def wait(self, url):
+        """阻塞直到允许向该URL所在主机发起请求"""
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            now = time.monotonic()
+            scheduled = max(now, self._next_allowed.get(host, 0.0))
+            self._next_allowed[host] = scheduled + self.min_interval
+        delay = scheduled - now
+        if delay > 0:
+            time.sleep(delay)
+
+class CrawlerHTTPPool:
+    """进程内共享的HTTP连接池：按cookie字符串复用 requests.Session，保持keep-alive，统计连接复用情况"""
+    
+    def __init__(self, pool_size=None, timeout=None, max_sessions=None):
+        """
+        Args:
+            pool_size: 每个主机保持的最大连接数，默认读取 XHS_HTTP_POOL_SIZE（16）
+            timeout: (连接超时, 读取超时) 秒，默认读取 XHS_HTTP_CONNECT_TIMEOUT（5）/ XHS_HTTP_READ_TIMEOUT（15）
+            max_sessions: 最多缓存的cookie会话数，默认读取 XHS_HTTP_MAX_SESSIONS（32）
+        """
+        self.pool_size = pool_size or int(os.getenv('XHS_HTTP_POOL_SIZE', '16'))
+        self.timeout = timeout or (
+            float(os.getenv('XHS_HTTP_CONNECT_TIMEOUT', '5')),
+            float(os.getenv('XHS_HTTP_READ_TIMEOUT', '15'))
+        )
+        self.max_sessions = max_sessions or int(os.getenv('XHS_HTTP_MAX_SESSIONS', '32'))
+        self._lock = threading.Lock()
+        self._sessions = OrderedDict()
+        self._stats = {
+            'requests': 0,
+            'new_connections': 0,
+            'sessions_created': 0,
+            'sessions_evicted': 0
+        }
+    
+    def _record(self, key, amount=1):
+        with self._lock:
+            self._stats[key] += amount
+    
+    def _create_session(self, cookies_str):
+        """创建带连接计数的会话，并把cookie字符串写入会话的cookie jar"""
+        pool = self
+      
+        class CountingHTTPConnectionPool(HTTPConnectionPool):
+            def _new_conn(self):
+                pool._record('new_connections')
+                return super()._new_conn()
+      
+        class CountingHTTPSConnectionPool(HTTPSConnectionPool):
+            def _new_conn(self):
+                pool._record('new_connections')
+                return super()._new_conn()
+      
+        class CountingAdapter(HTTPAdapter):
+            def init_poolmanager(self, *args, **kwargs):
+                super().init_poolmanager(*args, **kwargs)
+                self.poolmanager.pool_classes_by_scheme = {
+                    'http': CountingHTTPConnectionPool,
+                    'https': CountingHTTPSConnectionPool
+                }
+          
+            def send(self, request, **kwargs):
+                # 每一跳重定向都会单独调用 send，逐跳计数
+                pool._record('requests')
+                return super().send(request, **kwargs)
+      
+        session = requests.Session()
+        adapter = CountingAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+      
+        for item in (cookies_str or '').split(';'):
+            name, sep, value = item.strip().partition('=')
+            if sep and name:
+                session.cookies.set(name.strip(), value.strip())
+        return session
+    
+    def get_session(self, cookies_str=''):
+        """获取cookie字符串对应的会话，不存在则创建（LRU淘汰最久未用的会话）"""
+        key = cookies_str or ''
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is not None:
+                self._sessions.move_to_end(key)
+                return session
+      
+        session = self._create_session(key)
+        with self._lock:
+            existing = self._sessions.get(key)
+            if existing is not None:
+                # 其他线程已抢先创建
+                session.close()
+                return existing
+            self._sessions[key] = session
+            self._stats['sessions_created'] += 1
+            while len(self._sessions) > self.max_sessions:
+                # 被淘汰的会话可能仍有请求在途，不主动关闭，交给垃圾回收
+                self._sessions.popitem(last=False)
+                self._stats['sessions_evicted'] += 1
+        return session
+    
+    def request(self, method, url, cookies_str='', **kwargs):
+        """通过共享会话发起请求，未指定时使用默认超时"""
+        kwargs.setdefault('timeout', self.timeout)
+        return self.get_session(cookies_str).request(method, url, **kwargs)
+    
+    def get_stats(self):
+        """获取连接池统计：新建连接数与复用连接数"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['sessions'] = len(self._sessions)
+        stats['reused_connections'] = max(0, stats['requests'] - stats['new_connections'])
+        stats['reuse_ratio'] = round(stats['reused_connections'] / stats['requests'], 3) if stats['requests'] else 0.0
+        stats['pool_size'] = self.pool_size
+        return stats
+    
+    def close_all(self):
+        """关闭所有会话及其连接"""
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for session in sessions:
+            session.close()
+
+# 进程级共享连接池，所有 XHSCrawler 实例默认使用
+http_pool = CrawlerHTTPPool()
+
+def get_http_pool_stats():
+    """获取爬虫HTTP连接池统计"""
+    return http_pool.get_stats()
+
+# 上游地址，可指向本地替身服务器（benchmarks/xhs_standin_server.py）在无网络的机器上压测
+XHS_BASE_URL = os.getenv('XHS_BASE_URL', 'https://www.xiaohongshu.com').rstrip('/')
+# 为空时按短链接原地址解析
+XHS_SHORT_LINK_BASE_URL = os.getenv('XHS_SHORT_LINK_BASE_URL', '').rstrip('/')
+
+# 上游返回这些状态码时按抖动指数退避重试
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+MAX_RETRIES = int(os.getenv('XHS_HTTP_MAX_RETRIES', '2'))
+BACKOFF_BASE = float(os.getenv('XHS_HTTP_BACKOFF_BASE', '0.5'))
+BACKOFF_MAX = float(os.getenv('XHS_HTTP_BACKOFF_MAX', '8'))
+
+class CircuitOpenError(Exception):
+    """熔断器打开时快速失败，不再请求上游"""
+
+class CircuitBreaker:
+    """
+    按上游错误率熔断：最近 window 次请求中错误率达到阈值后打开，冷却期内直接失败；
+    冷却期结束进入半开状态，只放行一个试探请求，成功则关闭，失败则重新打开
+    """
+    
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+    
+    def __init__(self, window=None, min_requests=None, error_rate=None, cooldown=None):
+        """
+        Args:
+            window: 统计错误率的最近请求数，默认读取 XHS_BREAKER_WINDOW（20）
+            min_requests: 窗口内至少有这么多请求才会判断是否熔断，默认读取 XHS_BREAKER_MIN_REQUESTS（10）
+            error_rate: 触发熔断的错误率，默认读取 XHS_BREAKER_ERROR_RATE（0.5）
+            cooldown: 熔断打开后的冷却时间（秒），默认读取 XHS_BREAKER_COOLDOWN（30）
+        """
+        self.window = window or int(os.getenv('XHS_BREAKER_WINDOW', '20'))
+        self.min_requests = min_requests or int(os.getenv('XHS_BREAKER_MIN_REQUESTS', '10'))
+        self.error_rate = error_rate or float(os.getenv('XHS_BREAKER_ERROR_RATE', '0.5'))
+        self.cooldown = cooldown or float(os.getenv('XHS_BREAKER_COOLDOWN', '30'))
+        self._lock = threading.Lock()
+        self._outcomes = deque(maxlen=self.window)
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._stats = {'rejected': 0, 'opened': 0, 'retries': 0}
+    
+    def allow(self):
+        """是否允许发起请求"""
+        with self._lock:
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.cooldown:
+                    self._stats['rejected'] += 1
+                    return False
+                self._state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self._state == self.HALF_OPEN:
+                if self._trial_in_flight:
+                    self._stats['rejected'] += 1
+                    return False
+                self._trial_in_flight = True
+            return True
+    
+    def record(self, success):
+        """记录一次上游请求的结果"""
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._trial_in_flight = False
+                if success:
+                    self._state = self.CLOSED
+                    self._outcomes.clear()
+                else:
+                    self._open()
+                return
+          
+            self._outcomes.append(success)
+            if self._state == self.CLOSED and len(self._outcomes) >= self.min_requests:
+                failures = self._outcomes.count(False)
+                if failures / len(self._outcomes) >= self.error_rate:
+                    self._open()
+    
+    def record_retry(self):
+        with self._lock:
+            self._stats['retries'] += 1
+    
+    def _open(self):
+        self._state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._stats['opened'] += 1
+    
+    def get_state(self):
+        """获取熔断器状态和最近窗口内的错误率"""
+        with self._lock:
+            state = self._state
+            if state == self.OPEN and time.monotonic() - self._opened_at >= self.cooldown:
+                state = self.HALF_OPEN
+            total = len(self._outcomes)
+            stats = dict(self._stats)
+            stats.update({
+                'state': state,
+                'window_requests': total,
+                'window_error_rate': round(self._outcomes.count(False) / total, 3) if total else 0.0,
+                'error_rate_threshold': self.error_rate,
+                'cooldown_seconds': self.cooldown
+            })
+            if self._state == self.OPEN:
+                stats['retry_after_seconds'] = round(max(0.0, self.cooldown - (time.monotonic() - self._opened_at)), 1)
+        return stats
+
+# 进程级共享的上游熔断器
+upstream_breaker = CircuitBreaker()
+
+def get_circuit_breaker_state():
+    """获取上游熔断器状态"""
+    return upstream_breaker.get_state()
+
+def backoff_delay(attempt, retry_after=None):
+    """第 attempt 次重试前的等待时间：全抖动指数退避，上游给出 Retry-After（秒）时不少于该值"""
+    delay = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+    try:
+        if retry_after is not None:
+            delay = max(delay, float(retry_after))
+    except ValueError:
+        pass
+    return min(delay, BACKOFF_MAX)
+
+class PersistentLRUCache:
+    """进程内 TTL + LRU 缓存，可选持久化到数据库（跨重启和Serverless冷启动复用），子类实现存储读写"""
+    
+    def __init__(self, max_size, ttl, store=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.store = store
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._stats = {'hits': 0, 'store_hits': 0, 'misses': 0, 'evictions': 0, 'expired': 0}
+    
+    def normalize(self, key):
+        return key
+    
+    def _load(self, key):
+        """从持久化存储读取条目（含 expires_at），子类实现"""
+        return None
+    
+    def _save(self, key, entry):
+        """把条目写入持久化存储，子类实现"""
+    
+    def _remember(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+    
+    def get(self, key):
+        """查询缓存，依次查找进程内缓存和持久化存储，未命中或已过期返回 None"""
+        key = self.normalize(key)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry['expires_at'] > now:
+                    self._entries.move_to_end(key)
+                    self._stats['hits'] += 1
+                    return entry
+                del self._entries[key]
+                self._stats['expired'] += 1
+      
+        if self.store is not None:
+            entry = self._load(key)
+            if entry and entry['expires_at'] > now:
+                self._remember(key, entry)
+                with self._lock:
+                    self._stats['store_hits'] += 1
+                return entry
+      
+        with self._lock:
+            self._stats['misses'] += 1
+        return None
+    
+    def put(self, key, **values):
+        """写入缓存，有效期从当前时间起算"""
+        key = self.normalize(key)
+        entry = dict(values, expires_at=int(time.time() + self.ttl))
+        self._remember(key, entry)
+        if self.store is not None:
+            self._save(key, entry)
+        return entry
+    
+    def get_stats(self):
+        """获取命中统计"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = len(self._entries)
+        lookups = stats['hits'] + stats['store_hits'] + stats['misses']
+        stats['hit_ratio'] = round((stats['hits'] + stats['store_hits']) / lookups, 3) if lookups else 0.0
+        stats['persistent'] = self.store is not None
+        return stats
+    
+    def clear(self):
+        """清空进程内缓存（不影响持久化存储）"""
+        with self._lock:
+            self._entries.clear()
+
+class ShortLinkCache(PersistentLRUCache):
+    """短链接解析缓存：短链接 -> resolved_url / note_id / xsec_token"""
+    
+    def __init__(self, max_size=None, ttl=None, store=None):
+        """
+        Args:
+            max_size: 内存中最多缓存的短链接数，默认读取 XHS_SHORT_LINK_CACHE_SIZE（2048）
+            ttl: 缓存有效期（秒），默认读取 XHS_SHORT_LINK_TTL（86400）
+            store: 可选的持久化存储，需提供 get_short_link / save_short_link 方法
+        """
+        super().__init__(
+            max_size or int(os.getenv('XHS_SHORT_LINK_CACHE_SIZE', '2048')),
+            ttl or float(os.getenv('XHS_SHORT_LINK_TTL', '86400')),
+            store
+        )
+    
+    def normalize(self, short_url):
+        """http/https 和结尾斜杠不影响缓存命中"""
+        return short_url.split('://', 1)[-1].rstrip('/')
+    
+    def _load(self, key):
+        row = self.store.get_short_link(key)
+        if not row:
+            return None
+        return {
+            'resolved_url': row['resolved_url'],
+            'note_id': row['note_id'],
+            'xsec_token': row['xsec_token'],
+            'expires_at': row['expires_at']
+        }
+    
+    def _save(self, key, entry):
+        self.store.save_short_link(key, entry['resolved_url'], entry['note_id'], entry['xsec_token'], entry['expires_at'])
+
+class NoteFetchCache(PersistentLRUCache):
+    """笔记采集结果缓存：note_id -> 格式化后的笔记数据，所有用户共享"""
+    
+    def __init__(self, max_size=None, ttl=None, store=None):
+        """
+        Args:
+            max_size: 内存中最多缓存的笔记数，默认读取 XHS_NOTE_CACHE_SIZE（512）
+            ttl: 新鲜度窗口（秒），超过后重新采集，默认读取 XHS_NOTE_CACHE_TTL（3600）
+            store: 可选的持久化存储，需提供 get_cached_note / save_cached_note 方法
+        """
+        super().__init__(
+            max_size or int(os.getenv('XHS_NOTE_CACHE_SIZE', '512')),
+            ttl or float(os.getenv('XHS_NOTE_CACHE_TTL', '3600')),
+            store
+        )
+    
+    def _load(self, key):
+        row = self.store.get_cached_note(key)
+        if not row:
+            return None
+        # 以当前的新鲜度窗口判断，调整 XHS_NOTE_CACHE_TTL 后对已持久化的数据同样生效
+        return {
+            'data': row['data'],
+            'fetched_at': row['fetched_at'],
+            'expires_at': row['fetched_at'] + self.ttl
+        }
+    
+    def _save(self, key, entry):
+        self.store.save_cached_note(key, entry['data'], entry['fetched_at'])
+
+class SingleFlight:
+    """合并同一key的并发调用：进行中的调用完成前，后到的调用方等待并共享它的结果"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._stats = {'calls': 0, 'executions': 0, 'coalesced': 0}
+    
+    def do(self, key, fn):
+        """
+        执行 fn 或等待同一key上进行中的执行
+        Returns:
+            tuple: (结果, 是否共享了其他调用方的执行)
+        """
+        with self._lock:
+            self._stats['calls'] += 1
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+                self._stats['executions'] += 1
+            else:
+                self._stats['coalesced'] += 1
+      
+        if not leader:
+            return future.result(), True
+      
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+    
+    def get_stats(self):
+        """获取合并统计：coalesced 为等待他人结果、未发起采集的请求数"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['in_flight'] = len(self._calls)
+        return stats
+
+# 进程级共享的短链接缓存、笔记缓存和同一笔记并发采集的合并器
+short_link_cache = ShortLinkCache()
+note_cache = NoteFetchCache()
+note_flight = SingleFlight()
+
+def configure_cache_store(store):
+    """为短链接缓存和笔记缓存设置持久化存储（数据库实例）"""
+    short_link_cache.store = store
+    note_cache.store = store
+
+def get_cache_stats():
+    """获取短链接缓存、笔记缓存和并发采集合并的统计"""
+    return {
+        'short_links': short_link_cache.get_stats(),
+        'notes': note_cache.get_stats(),
+        'single_flight': note_flight.get_stats()
+    }
+
+INITIAL_STATE_MARKER = 'window.__INITIAL_STATE__='
+# NaN / Infinity / -Infinity 由json解析器在字符串之外直接识别，统一转换为 None
+_STATE_DECODER = json.JSONDecoder(parse_constant=lambda _: None)
+_BACKSLASH_QUOTE_PATTERN = re.compile(r'(\\+)"')
+# 子树解码时每次改写的初始窗口大小，解码越界时按4倍扩大
+NOTE_DETAIL_WINDOW = 64 * 1024
+
+def _count_unescaped_quotes(text, start, end):
+    """统计区间内未被反斜杠转义的双引号个数"""
+    quotes = text.count('"', start, end)
+    for match in _BACKSLASH_QUOTE_PATTERN.finditer(text, start, end):
+        if len(match.group(1)) % 2:
+            quotes -= 1
+    return quotes
+
+def _initial_state_bounds(html_content):
+    """返回状态对象所在区间 (start, end)，未找到时返回 None"""
+    marker = html_content.find(INITIAL_STATE_MARKER)
+    if marker == -1:
+        return None
+    
+    start = marker + len(INITIAL_STATE_MARKER)
+    while html_content[start:start + 1].isspace():
+        start += 1
+    # 脚本内容中不可能出现未转义的 </script>，以此作为扫描上界
+    end = html_content.find('</script>', start)
+    if end == -1:
+        end = len(html_content)
+    return start, end
+
+def _rewrite_undefined(text, start, end):
+    """
+    把 text[start:end] 中字符串之外的 undefined 改写为 null，字符串里的同名文本原样保留
+    start 必须位于字符串之外；区间内没有 undefined 时返回 None，调用方可直接使用原文本
+    """
+    pos = text.find('undefined', start, end)
+    if pos == -1:
+        return None
+    
+    pieces = []
+    last = start
+    scanned = start
+    inside_string = False
+    while pos != -1:
+        # 上一个位置到当前位置之间未转义引号的奇偶性决定是否处于字符串内
+        if _count_unescaped_quotes(text, scanned, pos) % 2:
+            inside_string = not inside_string
+        scanned = pos
+        if not inside_string:
+            pieces.append(text[last:pos])
+            pieces.append('null')
+            last = pos + len('undefined')
+        pos = text.find('undefined', pos + len('undefined'), end)
+    pieces.append(text[last:end])
+    return ''.join(pieces)
+
+def locate_initial_state(html_content):
+    """
+    定位 window.__INITIAL_STATE__ 对象，只对字符串之外的 undefined 做改写；
+    页面中没有 undefined 时直接返回原HTML，不做任何复制
+    Returns:
+        tuple: (source, start)，从 source[start] 开始是合法的JSON对象；未找到时返回 (None, 0)
+    """
+    bounds = _initial_state_bounds(html_content)
+    if bounds is None:
+        return None, 0
+    
+    start, end = bounds
+    rewritten = _rewrite_undefined(html_content, start, end)
+    if rewritten is None:
+        return html_content, start
+    return rewritten, 0
+
+def parse_initial_state(html_content):
+    """
+    解析 window.__INITIAL_STATE__ 为字典
+    raw_decode 在C层一次扫描完成括号匹配和解析，读到对象结尾即停止
+    """
+    source, start = locate_initial_state(html_content)
+    if source is None or not source.startswith('{', start):
+        return None
+    state, _ = _STATE_DECODER.raw_decode(source, start)
+    return state
+
+def _find_object_key(source, start, end, key):
+    """在 [start, end) 中查找字符串之外、值为对象的键 "key"，返回值对象起始 { 的位置，找不到返回 -1"""
+    needle = json.dumps(key) + ':'
+    scanned = start
+    quotes = 0
+    pos = source.find(needle, start, end)
+    while pos != -1:
+        quotes += _count_unescaped_quotes(source, scanned, pos)
+        scanned = pos
+        value = pos + len(needle)
+        while source[value:value + 1].isspace():
+            value += 1
+        # 引号数为偶数说明不在字符串内；前一个字符是 { 或 , 说明这是一个键
+        if quotes % 2 == 0 and source[pos - 1:pos] in ('{', ',') and source.startswith('{', value):
+            return value
+        pos = source.find(needle, pos + len(needle), end)
+    return -1
+
+# JSON字符串（含转义）或括号，用于在不解码的情况下按层级扫描对象
+_JSON_TOKEN_PATTERN = re.compile(r'"(?:[^"\\]|\\.)*"|[{}\[\]]')
+
+def _find_member_object(source, obj_start, end, key):
+    """查找 source[obj_start] 处对象的直接成员 "key"（值为对象），返回值对象起始 { 的位置
+    
+    只在该对象内部的第一层查找：嵌套对象中、或对象结束之后的同名键都不匹配，找不到返回 -1
+    """
+    needle = json.dumps(key)
+    depth = 0
+    for token in _JSON_TOKEN_PATTERN.finditer(source, obj_start, end):
+        text = token.group()
+        if text in ('{', '['):
+            depth += 1
+        elif text in ('}', ']'):
+            depth -= 1
+            if depth == 0:
+                return -1
+        elif depth == 1 and text == needle:
+            value = token.end()
+            while source[value:value + 1].isspace():
+                value += 1
+            if source.startswith(':', value):
+                value += 1
+                while source[value:value + 1].isspace():
+                    value += 1
+                if source.startswith('{', value):
+                    return value
+    return -1
+
+def parse_note_detail(html_content, note_id):
+    """
+    只解析 noteDetailMap[note_id] 这一棵子树，信息流、用户、配置等其余部分既不改写也不解码
+    Returns:
+        dict: noteDetailMap[note_id] 的内容（含 note 字段），未定位到时返回 None
+    """
+    bounds = _initial_state_bounds(html_content)
+    if bounds is None or not note_id:
+        return None
+    
+    start, end = bounds
+    map_start = _find_object_key(html_content, start, end, 'noteDetailMap')
+    if map_start == -1:
+        return None
+    # 只接受 noteDetailMap 的直接成员，状态中其他位置的同名键交给完整解析处理
+    detail_start = _find_member_object(html_content, map_start, end, note_id)
+    if detail_start == -1:
+        return None
+    
+    # 子树长度未知：先改写一个窗口尝试解码，解码读到窗口末尾时再扩大窗口
+    window = NOTE_DETAIL_WINDOW
+    while True:
+        stop = min(end, detail_start + window)
+        chunk = _rewrite_undefined(html_content, detail_start, stop)
+        try:
+            if chunk is None:
+                detail, _ = _STATE_DECODER.raw_decode(html_content[detail_start:stop])
+            else:
+                detail, _ = _STATE_DECODER.raw_decode(chunk)
+            return detail
+        except json.JSONDecodeError:
+            if stop >= end:
+                raise
+            window *= 4
+
+# extract_note_details 的版本号，提取逻辑新增或修改字段时递增，用于判断归档是否需要重新提取
+EXTRACTOR_VERSION = 1
+
+# 可选的原始状态归档存储，需提供 save_raw_state 方法；为 None 时不归档
+raw_state_store = None
+
+def configure_raw_archive(store):
+    """启用原始状态归档：采集到的 noteDetailMap[note_id] 子树压缩后写入 store"""
+    global raw_state_store
+    raw_state_store = store
+
+def encode_raw_state(note_detail):
+    """把 noteDetailMap[note_id] 子树编码为 zlib 压缩的JSON"""
+    return zlib.compress(json.dumps(note_detail, ensure_ascii=False, separators=(',', ':')).encode('utf-8'), 6)
+
+def decode_raw_state(payload):
+    """解码归档的原始状态"""
+    return json.loads(zlib.decompress(payload).decode('utf-8'))
 
 class XHSCrawler:
     """精简版小红书爬虫类"""
     
-    def __init__(self, cookies_str=None):
+    def __init__(self, cookies_str=None, rate_limiter=None, session_pool=None, link_cache=None, breaker=None,
+                 base_url=None, short_link_base_url=None):
         """
         初始化爬虫
         Args:
             cookies_str: cookie字符串，如果为空则使用默认cookie
+            rate_limiter: 可选的 HostRateLimiter，批量采集时在多个爬虫间共享
+            session_pool: 可选的 CrawlerHTTPPool，默认使用进程级共享连接池
+            link_cache: 可选的 ShortLinkCache，默认使用进程级共享的短链接缓存
+            breaker: 可选的 CircuitBreaker，默认使用进程级共享的上游熔断器
+            base_url: 笔记页面地址，默认读取 XHS_BASE_URL
+            short_link_base_url: 短链接解析地址，默认读取 XHS_SHORT_LINK_BASE_URL
         """
+        self.rate_limiter = rate_limiter
+        self.session_pool = session_pool or http_pool
+        self.short_link_cache = link_cache or short_link_cache
+        self.breaker = breaker or upstream_breaker
+        self.base_url = (base_url or XHS_BASE_URL).rstrip('/')
+        self.short_link_base_url = (short_link_base_url or XHS_SHORT_LINK_BASE_URL).rstrip('/')
         # 使用默认cookie，你可以根据需要更新
         default_cookie = ""
         
@@ -22,8 +701,8 @@ class XHSCrawler:
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/117.0.0.0 Safari/537.36',
             'Cookie': self.cookies_str,
-            'Origin': 'https://www.xiaohongshu.com',
-            'Referer': 'https://www.xiaohongshu.com',
+            'Origin': self.base_url,
+            'Referer': self.base_url,
             'Content-Type': 'application/json;charset=UTF-8'
         }
     
@@ -49,8 +728,22 @@ class XHSCrawler:
             return text
     
     @staticmethod
-    def process_xhs_url(url):
-        """从小红书链接中提取笔记id和xsec_token"""
+    def extract_xhs_urls(text):
+        """从粘贴的文本中提取所有小红书链接（含短链接），按出现顺序去重"""
+        # 链接只包含可见ASCII字符，避免把紧跟其后的中文文案一起匹配进来
+        pattern = r'https://www\.xiaohongshu\.com/[\x21-\x7e]+|https?://xhslink\.com/[\x21-\x7e]+'
+        urls = []
+        seen = set()
+        for match in re.finditer(pattern, text or ''):
+            url = match.group(0).rstrip('，,。.!！?？')
+            if url not in seen:
+                seen.add(url)
+                urls.append(url)
+        return urls
+    
+    @staticmethod
+    def process_xhs_url(url, base_url=None):
+        """从小红书链接中提取笔记id和xsec_token，base_url 为构建标准URL使用的地址（默认 XHS_BASE_URL）"""
         # 提取笔记ID
         note_id_pattern = r'/(?:item|explore)/([a-zA-Z0-9]+)'
         note_id_match = re.search(note_id_pattern, url)
@@ -63,7 +756,7 @@ class XHSCrawler:
         
         # 构建标准URL
         if note_id:
-            new_url = f"https://www.xiaohongshu.com/explore/{note_id}?xsec_token={xsec_token}&xsec_source=pc_user"
+            new_url = f"{base_url or XHS_BASE_URL}/explore/{note_id}?xsec_token={xsec_token}&xsec_source=pc_user"
         else:
             new_url = url
         
@@ -73,25 +766,20 @@ class XHSCrawler:
     def extract_initial_state(html_content):
         """从HTML响应中提取window.__INITIAL_STATE__的数据"""
         try:
-            pattern = r"window\.__INITIAL_STATE__=({.*?})</script>"
-            matches = re.search(pattern, html_content, re.DOTALL)
-            
-            if not matches:
-                return None
-                
-            state = matches.group(1)
-            
-            # 替换JavaScript特有的语法
-            state = state.replace("undefined", "null")
-            state = state.replace("NaN", "null")
-            state = state.replace("Infinity", "null")
-            state = state.replace("-Infinity", "null")
-            
-            return json.loads(state)
+            return parse_initial_state(html_content)
         except Exception as e:
             print(f"提取数据失败: {str(e)}")
             return None
     
+    @staticmethod
+    def extract_note_detail(html_content, note_id):
+        """只解码 noteDetailMap[note_id]，不解析页面状态的其余部分"""
+        try:
+            return parse_note_detail(html_content, note_id)
+        except Exception as e:
+            print(f"提取笔记数据失败: {str(e)}")
+            return None
+    
     @staticmethod
     def extract_note_details(note_info):
         """从笔记信息中提取详细数据"""
@@ -149,15 +837,77 @@ class XHSCrawler:
         
         return note_details
 
+    def _throttle(self, url):
+        """批量采集时按主机限速"""
+        if self.rate_limiter:
+            self.rate_limiter.wait(url)
+
+    def _request(self, method, url, **kwargs):
+        """
+        通过共享连接池发起请求，cookie由会话的cookie jar携带
+        429/5xx和网络错误按抖动指数退避重试；熔断器打开时直接抛出 CircuitOpenError
+        """
+        headers = {k: v for k, v in self.headers.items() if k != 'Cookie'}
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                raise CircuitOpenError("小红书服务暂时不可用（熔断中），请稍后重试")
+            
+            retry_after = None
+            try:
+                response = self.session_pool.request(method, url, cookies_str=self.cookies_str, headers=headers, **kwargs)
+            except Exception as e:
+                self.breaker.record(False)
+                if not isinstance(e, requests.RequestException) or attempt >= MAX_RETRIES:
+                    raise
+            else:
+                # 除429外的4xx是请求本身的问题，不计入上游错误率
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    self.breaker.record(True)
+                    return response
+                self.breaker.record(False)
+                if attempt >= MAX_RETRIES:
+                    return response
+                retry_after = response.headers.get('Retry-After')
+                response.close()
+            
+            self.breaker.record_retry()
+            time.sleep(backoff_delay(attempt, retry_after))
+            attempt += 1
+
+    def _route_short_url(self, url):
+        """配置了短链接解析地址时，把短链接的协议和主机替换为该地址"""
+        if not self.short_link_base_url:
+            return url
+        parsed = urlparse(url)
+        return self.short_link_base_url + parsed.path + (f"?{parsed.query}" if parsed.query else '')
+
     def resolve_short_url(self, url):
-        """解析小红书短链接"""
+        """解析小红书短链接，命中缓存时不发起网络请求"""
+        cached = self.short_link_cache.get(url)
+        if cached:
+            return cached['resolved_url']
+        
         try:
-            response = requests.head(url, headers=self.headers, allow_redirects=True)
+            self._throttle(url)
+            response = self._request('HEAD', self._route_short_url(url), allow_redirects=True)
+            _, note_id, xsec_token = self.process_xhs_url(response.url)
+            if note_id:
+                # 只缓存成功解析到笔记的结果
+                self.short_link_cache.put(url, resolved_url=response.url, note_id=note_id, xsec_token=xsec_token)
             return response.url
         except Exception as e:
             print(f"解析短链接失败: {str(e)}")
             return url
 
+    def resolve_note_id(self, share_text):
+        """在不请求笔记页面的情况下得到笔记ID（短链接解析走短链接缓存）"""
+        xhs_url = self.extract_xhs_url(share_text)
+        if xhs_url and "xhslink.com" in xhs_url:
+            xhs_url = self.resolve_short_url(xhs_url)
+        _, note_id, _ = self.process_xhs_url(xhs_url or '')
+        return note_id
+
     def get_note_info(self, share_text):
         """
         获取笔记信息的主要方法
@@ -177,25 +927,38 @@ class XHSCrawler:
                 xhs_url = self.resolve_short_url(xhs_url)
             
             # 步骤3: 处理URL并构建新的URL
-            new_url, note_id, xsec_token = self.process_xhs_url(xhs_url)
+            new_url, note_id, xsec_token = self.process_xhs_url(xhs_url, self.base_url)
             
             # 步骤4: 请求笔记详情页面
-            response = requests.get(new_url, headers=self.headers)
+            self._throttle(new_url)
+            response = self._request('GET', new_url)
             
             if response.status_code != 200:
                 return {"error": f"请求失败，状态码: {response.status_code}"}
             
-            # 步骤5: 从页面中提取笔记数据
-            initial_state = self.extract_initial_state(response.text)
+            # 步骤5: 从页面中提取笔记数据，只解码目标笔记的子树
+            note_detail = self.extract_note_detail(response.text, note_id)
             
-            if not initial_state or "note" not in initial_state:
-                return {"error": "无法从页面中提取笔记数据"}
+            if note_detail is None:
+                # 定位失败时退回完整解析，以便给出准确的错误信息
+                initial_state = self.extract_initial_state(response.text)
+                
+                if not initial_state or "note" not in initial_state:
+                    return {"error": "无法从页面中提取笔记数据"}
+                
+                note_detail_map = initial_state["note"].get("noteDetailMap", {})
+                if note_id not in note_detail_map:
+                    return {"error": f"未找到笔记ID {note_id} 的详细信息"}
+                note_detail = note_detail_map[note_id]
             
-            note_detail_map = initial_state["note"].get("noteDetailMap", {})
-            if note_id not in note_detail_map:
-                return {"error": f"未找到笔记ID {note_id} 的详细信息"}
+            if raw_state_store is not None:
+                # 归档失败不影响本次采集
+                try:
+                    raw_state_store.save_raw_state(note_id, encode_raw_state(note_detail), EXTRACTOR_VERSION)
+                except Exception as e:
+                    print(f"归档笔记原始数据失败: {str(e)}")
             
-            note_info = note_detail_map[note_id].get("note")
+            note_info = note_detail.get("note")
             note_details = self.extract_note_details(note_info)
             
             if not note_details:
@@ -208,10 +971,13 @@ class XHSCrawler:
                 "original_url": xhs_url
             }
             
+        except CircuitOpenError as e:
+            return {"error": str(e)}
         except Exception as e:
             return {"error": f"处理过程中出现异常: {str(e)}"}
 
-    def format_timestamp(self, timestamp):
+    @staticmethod
+    def format_timestamp(timestamp):
         """格式化时间戳"""
         if not timestamp:
             return ''
@@ -225,51 +991,140 @@ class XHSCrawler:
         except:
             return str(timestamp)
 
-def get_xiaohongshu_note(url, cookies=None):
+def format_note_data(note_details):
+    """把 extract_note_details 的结果格式化为接口和数据库使用的笔记数据"""
+    return {
+        "note_id": note_details["note_id"],
+        "title": note_details["title"],
+        "content": note_details["desc"],
+        "type": "视频" if note_details["type"] == "video" else "图文",
+        "author": {
+            "nickname": note_details["author"]["nickname"],
+            "user_id": note_details["author"]["user_id"],
+            "avatar": note_details["author"]["avatar"]
+        },
+        "stats": {
+            "likes": note_details["interact"]["like_count"],
+            "collects": note_details["interact"]["collect_count"],
+            "comments": note_details["interact"]["comment_count"],
+            "shares": note_details["interact"]["share_count"]
+        },
+        "publish_time": XHSCrawler.format_timestamp(note_details["time"]),
+        "location": note_details["ip_location"],
+        "tags": note_details["tags"],
+        "images": note_details["images"],
+        "videos": note_details["video_urls"]
+    }
+
+def reextract_raw_state(item):
+    """
+    用当前的提取逻辑重新处理一条归档（纯CPU，可在进程池中执行）
+    Args:
+        item: (note_id, payload)
+    Returns:
+        tuple: (note_id, 笔记数据)，提取失败时笔记数据为 None
+    """
+    note_id, payload = item
+    try:
+        note_details = XHSCrawler.extract_note_details(decode_raw_state(payload).get("note"))
+        return note_id, format_note_data(note_details) if note_details else None
+    except Exception as e:
+        print(f"重新提取笔记 {note_id} 失败: {str(e)}")
+        return note_id, None
+
+def get_xiaohongshu_note(url, cookies=None, rate_limiter=None, force_refresh=False):
     """
     简单的接口函数，供API调用
     Args:
         url: 小红书链接
         cookies: 可选的cookie字符串
+        rate_limiter: 可选的按主机限速器
+        force_refresh: 为True时忽略笔记缓存，重新采集
     Returns:
-        dict: 笔记信息
+        dict: 笔记信息，cached 表示是否来自笔记缓存
     """
-    crawler = XHSCrawler(cookies)
+    crawler = XHSCrawler(cookies, rate_limiter=rate_limiter)
+    
+    # 先查所有用户共享的笔记缓存，新鲜度窗口内命中时不再请求笔记页面
+    note_id = crawler.resolve_note_id(url)
+    if note_id and not force_refresh:
+        cached = note_cache.get(note_id)
+        if cached:
+            # 返回深拷贝，调用方修改嵌套的 author/stats 或图片列表也不影响缓存
+            data = copy.deepcopy(cached["data"])
+            data["original_url"] = url
+            return {"success": True, "data": data, "cached": True}
+    
+    if not note_id:
+        result = _crawl_note(crawler, url, note_id)
+    else:
+        # 同一笔记的并发请求合并为一次采集，等待中的调用方共享结果
+        result, _ = note_flight.do(note_id, lambda: _crawl_note(crawler, url, note_id))
+    if result.get("success"):
+        # 每个调用方拿到独立的副本，互相修改数据不受影响；原始链接（含各用户的 xsec_token）不进缓存，取本次请求的链接
+        result = dict(result, data=dict(copy.deepcopy(result["data"]), original_url=url))
+    return result
+
+def _crawl_note(crawler, url, note_id):
+    """请求笔记页面并格式化结果，成功时写入笔记缓存"""
     result = crawler.get_note_info(url)
     
     if result.get("success"):
         note_details = result["note_details"]
         
-        # 格式化返回数据
-        formatted_result = {
-            "success": True,
-            "data": {
-                "note_id": note_details["note_id"],
-                "title": note_details["title"],
-                "content": note_details["desc"],
-                "type": "视频" if note_details["type"] == "video" else "图文",
-                "author": {
-                    "nickname": note_details["author"]["nickname"],
-                    "user_id": note_details["author"]["user_id"],
-                    "avatar": note_details["author"]["avatar"]
-                },
-                "stats": {
-                    "likes": note_details["interact"]["like_count"],
-                    "collects": note_details["interact"]["collect_count"],
-                    "comments": note_details["interact"]["comment_count"],
-                    "shares": note_details["interact"]["share_count"]
-                },
-                "publish_time": crawler.format_timestamp(note_details["time"]),
-                "location": note_details["ip_location"],
-                "tags": note_details["tags"],
-                "images": note_details["images"],
-                "videos": note_details["video_urls"],
-                "original_url": result["original_url"]
-            }
-        }
+        # 格式化返回数据（不含 original_url：缓存在所有用户间共享，链接由 get_xiaohongshu_note 按请求填入）
+        formatted_result = {"success": True, "data": format_note_data(note_details)}
+        cache_key = note_details["note_id"] or note_id
+        if cache_key:
+            note_cache.put(cache_key, data=copy.deepcopy(formatted_result["data"]), fetched_at=int(time.time()))
+        formatted_result["cached"] = False
         return formatted_result
     else:
         return {
             "success": False,
             "error": result.get("error", "未知错误")
-        }
\ No newline at end of file
+        }
+
+def crawl_xiaohongshu_notes(urls_or_text, cookies=None, max_workers=8, per_host_interval=0.5, max_urls=None):
+    """
+    批量并发采集笔记，按完成顺序逐条产出结果
+    Args:
+        urls_or_text: 链接列表，或包含多个分享链接的文本
+        cookies: 可选的cookie字符串
+        max_workers: 最大并发数
+        per_host_interval: 同一主机相邻请求的最小间隔（秒）
+        max_urls: 最多采集的链接数，超出部分在提交任务前截掉
+    Yields:
+        dict: {"url": 原始链接, "success": ..., "data"/"error": ...}
+    """
+    if isinstance(urls_or_text, str):
+        urls = XHSCrawler.extract_xhs_urls(urls_or_text)
+    else:
+        urls = []
+        for item in urls_or_text:
+            urls.extend(XHSCrawler.extract_xhs_urls(item) or [item])
+        urls = list(dict.fromkeys(url.strip() for url in urls if url and url.strip()))
+    
+    if max_urls is not None:
+        urls = urls[:max_urls]
+    
+    if not urls:
+        return
+    
+    rate_limiter = HostRateLimiter(per_host_interval)
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(urls))))
+    try:
+        futures = {
+            executor.submit(get_xiaohongshu_note, url, cookies, rate_limiter): url
+            for url in urls
+        }
+        for future in as_completed(futures):
+            url = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {"success": False, "error": f"处理过程中出现异常: {str(e)}"}
+            yield dict(result, url=url)
+    finally:
+        # 调用方提前停止迭代时取消尚未开始的任务
+        executor.shutdown(wait=False, cancel_futures=True)
\ No newline at end of file
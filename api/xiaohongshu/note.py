@@ -7,9 +7,16 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from _utils import parse_request, create_response, require_auth
 from _database import db
-from _xhs_crawler import get_xiaohongshu_note
+from _xhs_crawler import get_xiaohongshu_note, crawl_xiaohongshu_notes, configure_cache_store
 import json
 
+# 短链接解析结果和笔记缓存持久化到数据库，Serverless冷启动后仍可命中
+configure_cache_store(db)
+
+# 单次批量采集的链接数量上限。同一主机的请求间隔为 0.5 秒（crawl_xiaohongshu_notes 的 per_host_interval），
+# 采集速度约 2 条/秒，与 max_concurrency 无关；Serverless函数全部完成后才返回，上限要在函数超时（默认10秒）内完成
+MAX_BATCH_URLS = int(os.getenv('XHS_SERVERLESS_MAX_BATCH_URLS', '10'))
+
 def handler(request):
     """Vercel serverless function handler"""
     
@@ -70,6 +77,58 @@ def handler(request):
                     'body': json.dumps({'success': False, 'error': '请先登录'})
                 }
             
+            # 批量模式：urls 为链接列表或 text 为包含多个分享链接的文本
+            # Serverless函数无法流式返回，全部完成后一次性返回各链接的结果
+            batch_source = data.get('urls') or data.get('text')
+            if batch_source and isinstance(batch_source, (list, str)):
+                error = None
+                if isinstance(batch_source, list) and len(batch_source) > MAX_BATCH_URLS:
+                    error = f'单次最多采集 {MAX_BATCH_URLS} 个链接，请分批提交'
+                elif isinstance(batch_source, list) and not all(isinstance(item, str) for item in batch_source):
+                    error = 'urls 的每一项都必须是字符串'
+                try:
+                    max_workers = max(1, min(int(data.get('max_concurrency', 8)), 16))
+                except (TypeError, ValueError):
+                    error = 'max_concurrency 必须是整数'
+                if error:
+                    return {
+                        'statusCode': 400,
+                        'headers': {
+                            'Content-Type': 'application/json',
+                            'Access-Control-Allow-Origin': '*'
+                        },
+                        'body': json.dumps({'success': False, 'error': error}, ensure_ascii=False)
+                    }
+                
+                results = []
+                summary = {'total': 0, 'success': 0, 'failed': 0, 'saved': 0}
+                # 分享文本或一项展开为多个链接时，在提交采集任务前截到上限
+                for result in crawl_xiaohongshu_notes(batch_source, max_workers=max_workers, max_urls=MAX_BATCH_URLS):
+                    summary['total'] += 1
+                    if result.get('success'):
+                        summary['success'] += 1
+                        note_data = result['data']
+                        result['saved_to_db'] = db.save_note(note_data, user_id)
+                        summary['saved'] += int(result['saved_to_db'])
+                    else:
+                        summary['failed'] += 1
+                    results.append(result)
+                
+                return {
+                    'statusCode': 200,
+                    'headers': {
+                        'Content-Type': 'application/json',
+                        'Access-Control-Allow-Origin': '*',
+                        'Access-Control-Allow-Methods': 'GET, POST, PUT, DELETE, OPTIONS',
+                        'Access-Control-Allow-Headers': 'Content-Type, Authorization, Cookie'
+                    },
+                    'body': json.dumps({
+                        'success': True,
+                        'data': results,
+                        'summary': summary
+                    }, ensure_ascii=False)
+                }
+            
             url = data.get('url', '').strip()
             if not url:
                 return {
@@ -81,8 +140,8 @@ def handler(request):
                     'body': json.dumps({'success': False, 'error': '请提供小红书链接'})
                 }
             
-            # 调用爬虫获取笔记信息
-            result = get_xiaohongshu_note(url)
+            # 调用爬虫获取笔记信息（新鲜度窗口内的笔记直接使用缓存，force_refresh 为True时重新采集）
+            result = get_xiaohongshu_note(url, force_refresh=bool(data.get('force_refresh', False)))
             
             if result.get('success'):
                 note_data = result['data']
@@ -105,7 +164,8 @@ def handler(request):
                             'success': True,
                             'message': '笔记获取并保存成功',
                             'data': note_data,
-                            'saved_to_db': True
+                            'saved_to_db': True,
+                            'cached': result.get('cached', False)
                         }, ensure_ascii=False)
                     }
                 else:
@@ -121,7 +181,8 @@ def handler(request):
                             'success': True,
                             'message': '笔记获取成功，但保存失败',
                             'data': note_data,
-                            'saved_to_db': False
+                            'saved_to_db': False,
+                            'cached': result.get('cached', False)
                         }, ensure_ascii=False)
                     }
             else:
@@ -14,9 +14,56 @@ from urllib.parse import urlparse, parse_qs
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from _utils import parse_request, create_response, require_auth
+from _utils import parse_request, create_response, require_auth, dumps_json
 from _database import db
-from _xhs_crawler import get_xiaohongshu_note
+from _xhs_crawler import get_xiaohongshu_note, configure_cache_store
+
+# 短链接解析结果和笔记缓存持久化到数据库，Serverless冷启动后仍可命中
+configure_cache_store(db)
+
+def format_note(note):
+    """将数据库中的笔记记录格式化为前端使用的结构"""
+    # 处理images_data结构
+    images_data = note.get('images_data', {})
+    if isinstance(images_data, dict):
+        # 如果是对象，提取images数组
+        images = images_data.get('images', [])
+        videos = images_data.get('videos', [])
+    elif isinstance(images_data, list):
+        # 如果已经是数组，直接使用
+        images = images_data
+        videos = []
+    else:
+        images = []
+        videos = []
+    
+    return {
+        'id': note.get('id'),
+        'note_id': note.get('note_id'),
+        'title': note.get('title', ''),
+        'content': note.get('content', ''),
+        'type': note.get('note_type', ''),
+        'publish_time': note.get('publish_time', ''),
+        'location': note.get('location', ''),
+        'original_url': note.get('original_url', ''),
+        'author': note.get('author_data', {}),
+        'stats': note.get('stats_data', {}),
+        'images': images,
+        'videos': videos,
+        'tags': [],  # 添加空的tags字段，避免前端错误
+        'created_at': str(note.get('created_at', ''))
+    }
+
+def format_notes(notes):
+    """批量格式化笔记，跳过格式化失败的记录"""
+    formatted_notes = []
+    for note in notes:
+        try:
+            formatted_notes.append(format_note(note))
+        except Exception as format_error:
+            print(f"Error formatting note: {format_error}")
+            continue
+    return formatted_notes
 
 class handler(BaseHTTPRequestHandler):
     def do_OPTIONS(self):
@@ -137,11 +184,11 @@ class handler(BaseHTTPRequestHandler):
             # 初始化数据库
             db.init_database()
             
-            # 解析查询参数
+            # 解析查询参数（保留空值，cursor= 表示以游标模式请求第一页）
             query_params = {}
             if self.path and '?' in self.path:
                 query_string = self.path.split('?', 1)[1]
-                query_params = parse_qs(query_string)
+                query_params = parse_qs(query_string, keep_blank_values=True)
             
             # 解析Cookie进行认证
             cookies = {}
@@ -184,48 +231,83 @@ class handler(BaseHTTPRequestHandler):
                 page = 1
                 per_page = 20
             
-            # 获取用户的笔记列表和总数
-            notes = db.get_notes(user_id, page, per_page)
-            total_count = db.get_notes_count(user_id)
+            # 排序和筛选：sort=created|likes，author_id=作者ID，min_likes=最低点赞数，均在数据库中执行
+            cursor = query_params.get('cursor', [None])[0]
+            sort = query_params.get('sort', ['created'])[0] or 'created'
+            author_id = query_params.get('author_id', [None])[0] or None
+            filter_error = None
+            try:
+                min_likes_param = query_params.get('min_likes', [''])[0]
+                min_likes = int(min_likes_param) if min_likes_param else None
+            except ValueError:
+                filter_error = 'min_likes 必须是整数'
+            if cursor is not None and sort != 'created':
+                filter_error = '游标分页仅支持按创建时间排序'
+            if filter_error:
+                self.send_response(400)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Access-Control-Allow-Origin', '*')
+                self.end_headers()
+                self.wfile.write(json.dumps({
+                    'success': False,
+                    'error': filter_error
+                }, ensure_ascii=False).encode('utf-8'))
+                return
             
-            # 格式化笔记数据
-            formatted_notes = []
-            for note in notes:
+            # 游标分页：不统计总数，通过多取一条判断 has_more
+            if cursor is not None:
                 try:
-                    # 处理images_data结构
-                    images_data = note.get('images_data', {})
-                    if isinstance(images_data, dict):
-                        # 如果是对象，提取images数组
-                        images = images_data.get('images', [])
-                        videos = images_data.get('videos', [])
-                    elif isinstance(images_data, list):
-                        # 如果已经是数组，直接使用
-                        images = images_data
-                        videos = []
-                    else:
-                        images = []
-                        videos = []
-                    
-                    formatted_note = {
-                        'id': note.get('id'),
-                        'note_id': note.get('note_id'),
-                        'title': note.get('title', ''),
-                        'content': note.get('content', ''),
-                        'type': note.get('note_type', ''),
-                        'publish_time': note.get('publish_time', ''),
-                        'location': note.get('location', ''),
-                        'original_url': note.get('original_url', ''),
-                        'author': note.get('author_data', {}),
-                        'stats': note.get('stats_data', {}),
-                        'images': images,
-                        'videos': videos,
-                        'tags': [],  # 添加空的tags字段，避免前端错误
-                        'created_at': str(note.get('created_at', ''))
+                    notes_page = db.get_notes_page(user_id, per_page, cursor or None, author_id, min_likes, raw_json=True)
+                except ValueError as cursor_error:
+                    self.send_response(400)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Access-Control-Allow-Origin', '*')
+                    self.end_headers()
+                    self.wfile.write(json.dumps({
+                        'success': False,
+                        'error': str(cursor_error)
+                    }, ensure_ascii=False).encode('utf-8'))
+                    return
+                
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Cache-Control', 'no-cache, no-store, must-revalidate, max-age=0')
+                self.send_header('Access-Control-Allow-Origin', '*')
+                self.send_header('Access-Control-Allow-Methods', 'GET, POST, PUT, DELETE, OPTIONS')
+                self.send_header('Access-Control-Allow-Headers', 'Content-Type, Authorization, Cookie')
+                self.end_headers()
+                
+                response_data = {
+                    'success': True,
+                    'data': format_notes(notes_page['items']),
+                    'pagination': {
+                        'limit': limit,
+                        'per_page': per_page,
+                        'has_more': notes_page['has_more'],
+                        'next_cursor': notes_page['next_cursor']
                     }
-                    formatted_notes.append(formatted_note)
-                except Exception as format_error:
-                    print(f"Error formatting note: {format_error}")
-                    continue
+                }
+                self.wfile.write(dumps_json(response_data).encode('utf-8'))
+                return
+            
+            # 获取用户的笔记列表和总数（一次查询完成）；count=estimate 时不统计总数，只判断 has_more
+            exact_total = query_params.get('count', ['exact'])[0] != 'estimate'
+            try:
+                notes_page = db.get_notes_with_total(user_id, page, per_page, sort, author_id, min_likes,
+                                                     raw_json=True, exact_total=exact_total)
+            except ValueError as sort_error:
+                self.send_response(400)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Access-Control-Allow-Origin', '*')
+                self.end_headers()
+                self.wfile.write(json.dumps({
+                    'success': False,
+                    'error': str(sort_error)
+                }, ensure_ascii=False).encode('utf-8'))
+                return
+            
+            # 格式化笔记数据
+            formatted_notes = format_notes(notes_page['items'])
             
             self.send_response(200)
             self.send_header('Content-Type', 'application/json')
@@ -245,10 +327,12 @@ class handler(BaseHTTPRequestHandler):
                     'offset': offset,
                     'page': page,
                     'per_page': per_page,
-                    'total': total_count
+                    'total': notes_page['total'],
+                    'total_exact': notes_page['total_exact'],
+                    'has_more': notes_page['has_more']
                 }
             }
-            self.wfile.write(json.dumps(response_data, ensure_ascii=False).encode('utf-8'))
+            self.wfile.write(dumps_json(response_data).encode('utf-8'))
             
         except Exception as e:
             print(f"Error in notes list API: {e}")
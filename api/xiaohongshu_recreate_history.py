@@ -15,7 +15,7 @@ from urllib.parse import urlparse, parse_qs
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from _utils import parse_request, create_response, require_auth
+from _utils import parse_request, create_response, require_auth, write_json
 from _database import db
 
 class handler(BaseHTTPRequestHandler):
@@ -424,6 +424,8 @@ class handler(BaseHTTPRequestHandler):
                 for row in rows:
                     try:
                         story = dict(zip(columns, row))
+                        # PostgreSQL 返回 datetime，与二创历史一致转为字符串
+                        story['created_at'] = str(story.get('created_at') or '')
                         story_list.append(story)
                     except Exception as format_error:
                         print(f"Error formatting visual story: {format_error}")
@@ -455,7 +457,7 @@ class handler(BaseHTTPRequestHandler):
                 self.send_header('Access-Control-Allow-Headers', 'Content-Type, Authorization, Cookie')
                 self.end_headers()
                 
-                self.wfile.write(json.dumps(response_data, ensure_ascii=False).encode('utf-8'))
+                write_json(self.wfile, response_data)
                 
             finally:
                 conn.close()
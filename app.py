@@ -1,7 +1,10 @@
-from flask import Flask, request, jsonify, session
+from flask import Flask, request, jsonify, session, Response, stream_with_context
 from flask_cors import CORS
 from functools import wraps
-from xhs_v2 import get_xiaohongshu_note
+from xhs_v2 import (
+    get_xiaohongshu_note, crawl_xiaohongshu_notes, get_http_pool_stats,
+    configure_cache_store, get_cache_stats, get_circuit_breaker_state, configure_raw_archive
+)
 from database import db
 from deepseek_api import deepseek_api
 from config import config
@@ -16,6 +19,16 @@ app = Flask(__name__)
 CORS(app, supports_credentials=True)  # 允许跨域请求并支持凭据
 app.secret_key = 'xiaohongshu_app_secret_key_2024'  # 用于session加密
 
+# 定期执行SQLite的WAL检查点和PRAGMA optimize
+db.start_maintenance()
+
+# 短链接解析结果和笔记缓存持久化到数据库，重启后仍可命中
+configure_cache_store(db)
+
+# 可选：归档采集到的原始笔记状态，提取逻辑更新后用 reextract_notes.py 离线重新提取
+if os.getenv('XHS_RAW_ARCHIVE', '').lower() in ('1', 'true', 'yes'):
+    configure_raw_archive(db)
+
 # 用户认证系统已迁移到数据库
 
 def require_auth(f):
@@ -55,9 +68,10 @@ def get_note():
         
         url = data['url']
         cookies = data.get('cookies', None)  # 可选的cookies参数
+        force_refresh = bool(data.get('force_refresh', False))  # 为True时跳过笔记缓存重新采集
         
-        # 调用爬虫函数获取笔记信息
-        result = get_xiaohongshu_note(url, cookies)
+        # 调用爬虫函数获取笔记信息（新鲜度窗口内的笔记直接使用缓存）
+        result = get_xiaohongshu_note(url, cookies, force_refresh=force_refresh)
         
         if result.get('success'):
             # 保存到数据库
@@ -78,6 +92,104 @@ def get_note():
             'error': f'服务器内部错误: {str(e)}'
         }), 500
 
+# 单次批量采集的链接数量上限
+MAX_BATCH_URLS = 500
+
+@app.route('/api/xiaohongshu/notes/batch', methods=['POST'])
+@require_auth
+def crawl_notes_batch():
+    """批量采集小红书笔记的API接口，以NDJSON格式逐条流式返回结果"""
+    data = request.get_json() or {}
+    source = data.get('urls') or data.get('text')
+    
+    if not source or not isinstance(source, (list, str)):
+        return jsonify({
+            'success': False,
+            'error': '请提供小红书链接列表 urls 或分享文本 text'
+        }), 400
+    
+    if isinstance(source, list) and len(source) > MAX_BATCH_URLS:
+        return jsonify({
+            'success': False,
+            'error': f'单次最多采集 {MAX_BATCH_URLS} 个链接'
+        }), 400
+    
+    # 开始流式返回（已发出200）后再出错无法改为400，链接列表的每一项在这里先检查
+    if isinstance(source, list) and not all(isinstance(item, str) for item in source):
+        return jsonify({
+            'success': False,
+            'error': 'urls 的每一项都必须是字符串'
+        }), 400
+    
+    try:
+        max_workers = max(1, min(int(data.get('max_concurrency', 8)), 16))
+    except (TypeError, ValueError):
+        return jsonify({
+            'success': False,
+            'error': 'max_concurrency 必须是整数'
+        }), 400
+    
+    cookies = data.get('cookies', None)
+    save = data.get('save', True)
+    user_id = get_current_user_id()
+    
+    def generate():
+        summary = {'total': 0, 'success': 0, 'failed': 0, 'saved': 0}
+        # 分享文本或一项展开为多个链接时，在提交采集任务前截到上限
+        for result in crawl_xiaohongshu_notes(source, cookies, max_workers=max_workers, max_urls=MAX_BATCH_URLS):
+            summary['total'] += 1
+            if result.get('success'):
+                summary['success'] += 1
+                if save:
+                    note_data = result['data']
+                    note_data.setdefault('original_url', result['url'])
+                    result['saved_to_db'] = db.save_note(note_data, user_id)
+                    summary['saved'] += int(result['saved_to_db'])
+            else:
+                summary['failed'] += 1
+            yield json.dumps(result, ensure_ascii=False) + '\n'
+        
+        yield json.dumps({'summary': summary}, ensure_ascii=False) + '\n'
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+# 单次批量导入的笔记数量上限
+MAX_BULK_NOTES = 5000
+
+@app.route('/api/xiaohongshu/notes/bulk', methods=['POST'])
+@require_auth
+def save_notes_bulk():
+    """批量导入笔记的API接口"""
+    try:
+        data = request.get_json()
+        
+        if not data or not isinstance(data.get('notes'), list):
+            return jsonify({
+                'success': False,
+                'error': '请提供笔记列表 notes'
+            }), 400
+        
+        notes = data['notes']
+        if len(notes) > MAX_BULK_NOTES:
+            return jsonify({
+                'success': False,
+                'error': f'单次最多导入 {MAX_BULK_NOTES} 条笔记'
+            }), 400
+        
+        user_id = get_current_user_id()
+        result = db.save_notes_bulk(user_id, notes)
+        
+        return jsonify({
+            'success': result['failed'] == 0,
+            'data': result
+        }), 200
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'批量导入笔记失败: {str(e)}'
+        }), 500
+
 @app.route('/api/xiaohongshu/notes', methods=['GET'])
 @require_auth
 def get_notes_list():
@@ -86,20 +198,40 @@ def get_notes_list():
         # 获取查询参数
         limit = int(request.args.get('limit', 20))
         offset = int(request.args.get('offset', 0))
+        cursor = request.args.get('cursor')
         
-        # 从数据库获取笔记列表
         user_id = get_current_user_id()
-        notes = db.get_notes_list(user_id, limit=limit, offset=offset)
-        total_count = db.get_notes_count(user_id)
+        
+        # 游标分页：cursor= 为空时返回第一页，不统计总数
+        if cursor is not None:
+            try:
+                page = db.get_notes_page(user_id, limit=limit, cursor=cursor or None)
+            except ValueError as e:
+                return jsonify({'success': False, 'error': str(e)}), 400
+            
+            return jsonify({
+                'success': True,
+                'data': {
+                    'notes': page['items'],
+                    'limit': limit,
+                    'has_more': page['has_more'],
+                    'next_cursor': page['next_cursor']
+                }
+            }), 200
+        
+        # 从数据库获取笔记列表，列表和总数一次查询完成；count=estimate 时不统计总数，只判断 has_more
+        page = db.get_notes_with_total(user_id, limit=limit, offset=offset,
+                                       exact_total=request.args.get('count') != 'estimate')
         
         return jsonify({
             'success': True,
             'data': {
-                'notes': notes,
-                'total': total_count,
+                'notes': page['items'],
+                'total': page['total'],
+                'total_exact': page['total_exact'],
                 'limit': limit,
                 'offset': offset,
-                'has_more': offset + limit < total_count
+                'has_more': page['has_more']
             }
         }), 200
         
@@ -312,19 +444,38 @@ def get_recreate_history():
     try:
         limit = int(request.args.get('limit', 20))
         offset = int(request.args.get('offset', 0))
+        cursor = request.args.get('cursor')
         
         user_id = get_current_user_id()
-        history_list = db.get_recreate_history(user_id, limit=limit, offset=offset)
-        total_count = db.get_recreate_history_count(user_id)
+        
+        if cursor is not None:
+            try:
+                page = db.get_recreate_history_page(user_id, limit=limit, cursor=cursor or None)
+            except ValueError as e:
+                return jsonify({'success': False, 'error': str(e)}), 400
+            
+            return jsonify({
+                'success': True,
+                'data': {
+                    'history': page['items'],
+                    'limit': limit,
+                    'has_more': page['has_more'],
+                    'next_cursor': page['next_cursor']
+                }
+            }), 200
+        
+        page = db.get_recreate_history_with_total(user_id, limit=limit, offset=offset,
+                                                  exact_total=request.args.get('count') != 'estimate')
         
         return jsonify({
             'success': True,
             'data': {
-                'history': history_list,
-                'total': total_count,
+                'history': page['items'],
+                'total': page['total'],
+                'total_exact': page['total_exact'],
                 'limit': limit,
                 'offset': offset,
-                'has_more': offset + limit < total_count
+                'has_more': page['has_more']
             }
         }), 200
         
@@ -616,19 +767,36 @@ def get_visual_story_history():
         user_id = get_current_user_id()
         limit = int(request.args.get('limit', 20))
         offset = int(request.args.get('offset', 0))
+        cursor = request.args.get('cursor')
+        
+        if cursor is not None:
+            try:
+                page = db.get_visual_story_history_page(user_id, limit=limit, cursor=cursor or None)
+            except ValueError as e:
+                return jsonify({'success': False, 'error': str(e)}), 400
+            
+            return jsonify({
+                'success': True,
+                'data': {
+                    'history': page['items'],
+                    'limit': limit,
+                    'has_more': page['has_more'],
+                    'next_cursor': page['next_cursor']
+                }
+            }), 200
         
-        # Get history from database - add method to db class
-        history_list = db.get_visual_story_history(user_id, limit=limit, offset=offset)
-        total_count = db.get_visual_story_history_count(user_id)
+        page = db.get_visual_story_history_with_total(user_id, limit=limit, offset=offset,
+                                                      exact_total=request.args.get('count') != 'estimate')
         
         return jsonify({
             'success': True,
             'data': {
-                'history': history_list,
-                'total': total_count,
+                'history': page['items'],
+                'total': page['total'],
+                'total_exact': page['total_exact'],
                 'limit': limit,
                 'offset': offset,
-                'has_more': offset + limit < total_count
+                'has_more': page['has_more']
             }
         }), 200
         
@@ -651,6 +819,11 @@ def health_check():
         'total_users': db_state.get('total_users', 0),
         'active_users': db_state.get('active_users', 0),
         'total_notes': db_state.get('total_notes', 0),
+        'database_pool': db.get_pool_stats(),
+        'database_pragmas': db.get_active_pragmas(),
+        'crawler_http_pool': get_http_pool_stats(),
+        'crawler_cache': get_cache_stats(),
+        'crawler_circuit_breaker': get_circuit_breaker_state(),
         'deepseek_configured': config.validate_deepseek_config()
     }), 200
 
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+小红书合成语料生成器
+生成与 get_xiaohongshu_note 返回的 data 结构一致的笔记：带emoji和话题的中文标题正文、Zipf分布的标签、
+1-18张图片、少量视频、幂律分布的互动数和数千个作者；可流式写出NDJSON，也可直接批量导入数据库
+
+用法:
+    python benchmarks/corpus_generator.py --count 100000 --ndjson corpus.ndjson
+    python benchmarks/corpus_generator.py --count 100000 --ndjson - | head -1
+    python benchmarks/corpus_generator.py --count 1000000 --load-sqlite bench.db --users 100
+    python benchmarks/corpus_generator.py --count 100000 --load-serverless --users 100   # api/_database.DatabaseManager（DATABASE_URL）
+"""
+import argparse
+import bisect
+import contextlib
+import io
+import itertools
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+TITLE_SUBJECTS = ['周末城市漫步', '一人食晚餐', '通勤穿搭', '租房改造', '新手化妆', '露营装备', '宝藏咖啡店', '减脂餐',
+                  '考研经验', '猫咪日常', '旅行攻略', '手冲咖啡', '读书笔记', '家居好物', '健身打卡', '烘焙教程',
+                  '平价护肤', '胶片摄影', '徒步路线', '收纳技巧']
+TITLE_HOOKS = ['保姆级教程', '真的绝了', '亲测有效', '建议收藏', '不踩雷', '一周合集', '附清单', '小众但好用',
+               '新手必看', '三分钟学会', '预算500内', '谁懂啊']
+EMOJI = ['✨', '🔥', '💯', '😭', '🥹', '☕️', '🌿', '📷', '🍜', '🐱', '💡', '📌', '🌸', '🏕️', '💪', '🧁']
+SENTENCES = ['今天终于把这件事整理好了', '分享给同样在纠结的姐妹', '这家店藏在老街拐角', '光线最好的是下午三点以后',
+             '价格真的很友好', '步骤其实很简单', '第一次尝试就成功了', '强烈推荐周末去', '记得提前预约',
+             '踩过的坑都写在下面了', '评论区可以交流', '用了一个月的真实感受', '适合上班族', '材料超市都能买到',
+             '拍照超级出片', '收藏起来慢慢看']
+TAG_STEMS = ['穿搭', '美食', '旅行', '咖啡', '家居', '护肤', '彩妆', '健身', '读书', '摄影', '宠物', '露营', '烘焙',
+             '学习', '职场', '租房', '数码', '手工', '徒步', '探店']
+TAG_MODIFIERS = ['', '日常', '分享', '攻略', '推荐', '好物', '教程', '记录', '灵感', '合集', '小众', '平价', '打卡',
+                 '新手', '上海', '北京', '杭州', '成都', '广州', '周末']
+NICKNAME_PARTS = (['小', '阿', '是', '今天也要', '爱吃', '不想上班的', '努力的', '慢慢'],
+                  ['鹿', '橙子', '咖啡', '猫', '鱼', '糖', '云朵', '拾光', '栗子', '桃桃', '豆包', '饼干'],
+                  ['', '呀', '酱', '同学', '日记', '研究所', '本人', '的小屋'])
+LOCATIONS = ['上海', '北京', '广东', '浙江', '江苏', '四川', '湖北', '福建', '山东', '湖南', '重庆', '陕西', '云南',
+             '海外']
+LOCATION_WEIGHTS = [14, 12, 13, 10, 9, 7, 5, 5, 4, 4, 4, 3, 3, 2]
+EPOCH = datetime(1970, 1, 1)
+IMAGE_COUNT_WEIGHTS = [18, 10, 12, 10, 8, 9, 6, 5, 10] + [1] * 9  # 1-18张，9张宫格较常见
+
+
+def zipf_cumulative_weights(size: int, exponent: float):
+    """第 k 个元素的权重为 1/k^exponent 的累计权重"""
+    return list(itertools.accumulate(1 / (rank ** exponent) for rank in range(1, size + 1)))
+
+
+class CorpusGenerator:
+    """按序号确定性地生成笔记，相同 seed 和序号总是得到相同的笔记，可从任意序号开始"""
+
+    def __init__(self, seed: int = 42, authors: int = 3000, tag_exponent: float = 1.1, start_time: datetime = None):
+        self.seed = seed
+        rng = random.Random(seed)
+        self.tags = [stem + modifier for modifier in TAG_MODIFIERS for stem in TAG_STEMS]
+        rng.shuffle(self.tags)
+        self.tag_weights = zipf_cumulative_weights(len(self.tags), tag_exponent)
+        self.authors = [{
+            'nickname': ''.join(rng.choice(part) for part in NICKNAME_PARTS) + str(rng.randint(1, 999)),
+            'user_id': f'{rng.getrandbits(96):024x}',
+            'avatar': f'https://sns-avatar-qc.xhscdn.com/avatar/{rng.getrandbits(64):016x}?imageView2/2/w/120/format/jpg'
+        } for _ in range(authors)]
+        # 少数作者发布大部分笔记
+        self.author_weights = zipf_cumulative_weights(authors, 0.8)
+        self.start_time = start_time or datetime(2023, 1, 1)
+
+    @staticmethod
+    def _choose(rng: random.Random, cumulative_weights) -> int:
+        return bisect.bisect(cumulative_weights, rng.random() * cumulative_weights[-1])
+
+    def note(self, index: int) -> dict:
+        """生成第 index 条笔记，结构与 get_xiaohongshu_note 返回的 data 一致"""
+        rng = random.Random(self.seed * 1000003 + index)
+        published = self.start_time + timedelta(seconds=index * 97 + rng.randint(0, 96))
+        note_id = f'{int((published - EPOCH).total_seconds()):08x}{rng.getrandbits(64):016x}'
+        is_video = rng.random() < 0.12
+
+        tags = []
+        for _ in range(rng.choice([0, 1, 2, 2, 3, 3, 4, 5, 6, 8, 10])):
+            tag = self.tags[self._choose(rng, self.tag_weights)]
+            if tag not in tags:
+                tags.append(tag)
+
+        subject = rng.choice(TITLE_SUBJECTS)
+        title = f'{subject}｜{rng.choice(TITLE_HOOKS)}{rng.choice(EMOJI)}'
+        paragraphs = []
+        for _ in range(rng.randint(1, 6)):
+            paragraph = '，'.join(rng.sample(SENTENCES, rng.randint(1, 4)))
+            paragraphs.append(paragraph + rng.choice(['。', '！', '～', '']) + ''.join(rng.sample(EMOJI, rng.randint(0, 2))))
+        content = '\n'.join(paragraphs)
+        if tags:
+            content += '\n' + ' '.join(f'#{tag}[话题]#' for tag in tags)
+
+        image_count = 1 if is_video else rng.choices(range(1, 19), weights=IMAGE_COUNT_WEIGHTS)[0]
+        month = published.strftime('%Y%m')
+        images = [f'https://sns-webpic-qc.xhscdn.com/{month}/{note_id}/{rng.getrandbits(48):012x}!nd_dft_wlteh_webp_3'
+                  for _ in range(image_count)]
+        videos = [f'http://sns-video-bd.xhscdn.com/pre_post/{rng.getrandbits(80):020x}'] if is_video else []
+
+        # 互动数近似幂律：大部分笔记很少互动，少数笔记爆火
+        likes = min(int(rng.paretovariate(1.15) * 20) - 20, 2000000)
+        collects = int(likes * rng.uniform(0.05, 0.8))
+        comments = int(likes * rng.uniform(0.01, 0.12))
+        shares = int(likes * rng.uniform(0.0, 0.08))
+
+        author = self.authors[self._choose(rng, self.author_weights)]
+        xsec_token = 'AB' + f'{rng.getrandbits(192):048x}'
+        return {
+            'note_id': note_id,
+            'title': title,
+            'content': content,
+            'type': '视频' if is_video else '图文',
+            'author': dict(author),
+            'stats': {'likes': str(likes), 'collects': str(collects), 'comments': str(comments), 'shares': str(shares)},
+            'publish_time': published.strftime('%Y-%m-%d %H:%M:%S'),
+            'location': rng.choices(LOCATIONS, weights=LOCATION_WEIGHTS)[0],
+            'tags': tags,
+            'images': images,
+            'videos': videos,
+            'original_url': f'https://www.xiaohongshu.com/explore/{note_id}?xsec_token={xsec_token}&xsec_source=pc_share'
+        }
+
+    def generate(self, count: int, start: int = 0):
+        """依次生成 [start, start + count) 号笔记"""
+        for index in range(start, start + count):
+            yield self.note(index)
+
+
+def batched(iterable, size: int):
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def write_ndjson(notes, stream) -> int:
+    """逐条写出NDJSON，返回写出的条数"""
+    written = 0
+    for note in notes:
+        stream.write(json.dumps(note, ensure_ascii=False, separators=(',', ':')))
+        stream.write('\n')
+        written += 1
+    return written
+
+
+def ensure_users(create_user, get_user_by_username, users: int):
+    """创建（或复用）corpus_user1..N，返回用户ID列表"""
+    user_ids = []
+    for i in range(1, users + 1):
+        username = f'corpus_user{i}'
+        user = get_user_by_username(username)
+        user_ids.append(user['id'] if user else create_user(username, 'x'))
+    return user_ids
+
+
+def load_local(notes, db_path: str, users: int, batch_size: int) -> int:
+    """通过 save_notes_bulk 导入 database.XiaohongshuDatabase，笔记轮流分配给各用户，返回新增条数"""
+    from database import XiaohongshuDatabase
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        database = XiaohongshuDatabase(db_path)
+        user_ids = ensure_users(database.create_user, database.get_user_by_username, users)
+    inserted = 0
+    for batch in batched(notes, batch_size):
+        by_user = {}
+        for offset, note in enumerate(batch):
+            by_user.setdefault(user_ids[offset % len(user_ids)], []).append(note)
+        with contextlib.redirect_stdout(io.StringIO()):
+            for user_id, user_notes in by_user.items():
+                inserted += database.save_notes_bulk(user_id, user_notes)['inserted']
+    database.pool.close_all()
+    return inserted
+
+
+def load_serverless(notes, db_path: str, users: int, batch_size: int) -> int:
+    """导入 api/_database.DatabaseManager（DATABASE_URL 为PostgreSQL时写入PostgreSQL，否则写入 db_path 的SQLite），
+    列的编码与 DatabaseManager.save_note 相同，每批一次 executemany，返回新增条数
+    """
+    sys.path.insert(1, os.path.join(ROOT_DIR, 'api'))
+    from _database import DatabaseManager
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        manager = DatabaseManager()
+        if not manager.use_postgres:
+            manager.db_path = db_path
+        manager.init_database()
+        user_ids = ensure_users(manager.create_user, manager.get_user_by_username, users)
+
+    p = '%s' if manager.use_postgres else '?'
+    inserted = 0
+    conn = manager.get_connection()
+    try:
+        cursor = conn.cursor()
+        for batch in batched(notes, batch_size):
+            rows = [(
+                user_ids[offset % len(user_ids)], note['note_id'], note['title'], note['content'], note['type'],
+                note['publish_time'], note['location'], note['original_url'],
+                json.dumps(note['author'], ensure_ascii=False), json.dumps(note['stats'], ensure_ascii=False),
+                json.dumps({'images': note['images'], 'videos': note['videos']}, ensure_ascii=False)
+            ) for offset, note in enumerate(batch)]
+            cursor.executemany(f'''
+                INSERT INTO notes (user_id, note_id, title, content, type, publish_time, location, original_url,
+                                   author_data, stats_data, images_data)
+                VALUES ({', '.join([p] * 11)})
+                ON CONFLICT (user_id, note_id) DO NOTHING
+            ''', rows)
+            conn.commit()
+            inserted += len(rows) if cursor.rowcount < 0 else cursor.rowcount
+    finally:
+        conn.close()
+    return inserted
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='小红书合成语料生成器')
+    parser.add_argument('--count', type=int, default=10000, help='生成的笔记数')
+    parser.add_argument('--start', type=int, default=0, help='起始序号，用于分段生成或追加')
+    parser.add_argument('--seed', type=int, default=42, help='随机种子')
+    parser.add_argument('--authors', type=int, default=3000, help='作者数')
+    parser.add_argument('--ndjson', help='NDJSON输出路径，- 表示标准输出')
+    parser.add_argument('--load-sqlite', metavar='DB_PATH', help='导入 database.py 的SQLite数据库')
+    parser.add_argument('--load-serverless', nargs='?', const='xiaohongshu_notes.db', metavar='DB_PATH',
+                        help='导入 api/_database.DatabaseManager（未配置PostgreSQL时使用该SQLite路径）')
+    parser.add_argument('--users', type=int, default=10, help='导入时笔记分配给的用户数')
+    parser.add_argument('--batch-size', type=int, default=1000, help='导入时每批的笔记数')
+    args = parser.parse_args()
+
+    if not (args.ndjson or args.load_sqlite or args.load_serverless):
+        parser.error('至少指定 --ndjson、--load-sqlite 或 --load-serverless 之一')
+
+    generator = CorpusGenerator(args.seed, args.authors)
+    log = sys.stderr if args.ndjson == '-' else sys.stdout
+    started = time.perf_counter()
+
+    if args.ndjson:
+        notes = generator.generate(args.count, args.start)
+        if args.ndjson == '-':
+            written = write_ndjson(notes, sys.stdout)
+        else:
+            with open(args.ndjson, 'w', encoding='utf-8') as f:
+                written = write_ndjson(notes, f)
+        print(f"📝 已写出 {written} 条笔记到 {args.ndjson}", file=log)
+    if args.load_sqlite:
+        inserted = load_local(generator.generate(args.count, args.start), args.load_sqlite, args.users, args.batch_size)
+        print(f"💾 已导入 {inserted} 条笔记到 {args.load_sqlite}", file=log)
+    if args.load_serverless:
+        inserted = load_serverless(generator.generate(args.count, args.start), args.load_serverless, args.users,
+                                   args.batch_size)
+        print(f"💾 已导入 {inserted} 条笔记（DatabaseManager）", file=log)
+
+    elapsed = time.perf_counter() - started
+    print(f"✅ 完成，用时 {elapsed:.1f}s（{args.count / max(elapsed, 1e-9):.0f} 条/秒）", file=log)
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+爬虫CPU路径微基准测试
+覆盖 extract_xhs_url、process_xhs_url、extract_initial_state、extract_note_detail、
+extract_note_details、format_timestamp 和 get_xiaohongshu_note 中的结果格式化（format_note_data），
+报告 ops/s、p50/p99 延迟和峰值内存，可保存基线JSON并与上一次结果对比标记性能回退
+
+用法:
+    python benchmarks/crawler_benchmark.py                                   # 录制页面 + 不同大小的合成页面
+    python benchmarks/crawler_benchmark.py --pages saved/*.html              # 追加其他录制页面
+    python benchmarks/crawler_benchmark.py --save benchmarks/baseline.json   # 保存基线
+    python benchmarks/crawler_benchmark.py --compare benchmarks/baseline.json --threshold 0.15
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from xhs_v2 import XHSCrawler, format_note_data
+from initial_state_benchmark import build_note_page
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+SHARE_TEXTS = [
+    '周末城市漫步路线 http://xhslink.com/a/Zx81kqP2mdA3，复制本条信息，打开【小红书】App查看精彩内容！',
+    '68ad9b60 https://www.xiaohongshu.com/explore/68ad9b60000000001c00d7d4?source=webshare&xhsshare=pc_web'
+    '&xsec_token=ABFXEJZJMcEmGGs6TiE1dRIKcYbMirDmzfWygpKpunF14=&xsec_source=pc_share 好看',
+    '没有链接的纯文本分享内容，' * 20,
+]
+
+NOTE_URLS = [
+    'https://www.xiaohongshu.com/explore/68ad9b60000000001c00d7d4?source=webshare&xhsshare=pc_web'
+    '&xsec_token=ABFXEJZJMcEmGGs6TiE1dRIKcYbMirDmzfWygpKpunF14=&xsec_source=pc_share',
+    'https://www.xiaohongshu.com/discovery/item/6680c3d4000000000d00e4f5?xsec_token=ABdemo',
+    'https://www.xiaohongshu.com/user/profile/5f1a2b3c000000000100a1b2',
+]
+
+TIMESTAMPS = [1718000000000, 1718000000, '1719500000000', None, 'invalid']
+
+
+def load_corpus(patterns, synthetic_sizes):
+    """加载页面语料：fixtures 中的录制页面、--pages 指定的页面和不同信息流大小的合成页面
+
+    返回 [(名称, HTML, 笔记ID)]
+    """
+    paths = sorted(glob.glob(os.path.join(FIXTURES_DIR, '*.html')))
+    for pattern in patterns:
+        paths.extend(sorted(glob.glob(pattern)))
+
+    corpus = []
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            html = f.read()
+        state = XHSCrawler.extract_initial_state(html) or {}
+        note_state = state.get('note') or {}
+        note_id = note_state.get('firstNoteId') or next(iter(note_state.get('noteDetailMap') or {}), None)
+        if note_id:
+            corpus.append((os.path.splitext(os.path.basename(path))[0], html, note_id))
+        else:
+            print(f"⚠️  跳过无法识别笔记ID的页面: {path}")
+
+    for feed_size in synthetic_sizes:
+        note_id = f'68ad9b60000000001c{feed_size:06d}'
+        corpus.append((f'synthetic_feed{feed_size}', build_note_page(note_id, feed_size), note_id))
+    return corpus
+
+
+def build_cases(corpus):
+    """生成基准用例 [(用例名, 无参函数)]，URL和时间戳类用例每次调用处理全部样例输入"""
+    cases = [
+        ('extract_xhs_url', lambda: [XHSCrawler.extract_xhs_url(text) for text in SHARE_TEXTS]),
+        ('extract_xhs_urls', lambda: [XHSCrawler.extract_xhs_urls(text) for text in SHARE_TEXTS]),
+        ('process_xhs_url', lambda: [XHSCrawler.process_xhs_url(url) for url in NOTE_URLS]),
+        ('format_timestamp', lambda: [XHSCrawler.format_timestamp(ts) for ts in TIMESTAMPS]),
+    ]
+
+    for name, html, note_id in corpus:
+        size_kb = len(html) // 1024
+        note_info = XHSCrawler.extract_note_detail(html, note_id)['note']
+        note_details = XHSCrawler.extract_note_details(note_info)
+        cases.extend([
+            (f'extract_initial_state[{name},{size_kb}KB]', lambda html=html: XHSCrawler.extract_initial_state(html)),
+            (f'extract_note_detail[{name},{size_kb}KB]',
+             lambda html=html, note_id=note_id: XHSCrawler.extract_note_detail(html, note_id)),
+            (f'extract_note_details[{name}]', lambda note_info=note_info: XHSCrawler.extract_note_details(note_info)),
+            (f'format_note_data[{name}]', lambda note_details=note_details: format_note_data(note_details)),
+        ])
+    return cases
+
+
+def calibrate(func, min_sample_seconds: float) -> int:
+    """确定每个样本内重复调用的次数，使单个样本耗时不低于 min_sample_seconds，降低计时器误差"""
+    inner = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(inner):
+            func()
+        if time.perf_counter() - start >= min_sample_seconds or inner >= 1 << 20:
+            return inner
+        inner *= 2
+
+
+def run_case(func, samples: int, min_sample_seconds: float):
+    """返回单个用例的结果：ops/s、每次操作的 p50/p99（微秒）和峰值内存（KB）"""
+    inner = calibrate(func, min_sample_seconds)
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        for _ in range(inner):
+            func()
+        timings.append((time.perf_counter() - start) / inner)
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    timings.sort()
+    return {
+        'ops_per_sec': round(len(timings) / sum(timings), 1),
+        'p50_us': round(statistics.median(timings) * 1e6, 2),
+        'p99_us': round(timings[min(len(timings) - 1, int(len(timings) * 0.99))] * 1e6, 2),
+        'peak_kb': round(peak / 1024, 1),
+        'samples': samples,
+        'inner_loops': inner
+    }
+
+
+def compare(results, baseline, threshold: float):
+    """与基线对比，p50 变慢或 ops/s 下降超过 threshold 的用例视为回退，峰值内存增长超过 threshold 也标记"""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        if current['p50_us'] > previous['p50_us'] * (1 + threshold):
+            regressions.append(f"{name}: p50 {previous['p50_us']}us -> {current['p50_us']}us")
+        if current['ops_per_sec'] < previous['ops_per_sec'] * (1 - threshold):
+            regressions.append(f"{name}: ops/s {previous['ops_per_sec']} -> {current['ops_per_sec']}")
+        # 峰值内存很小时波动大，低于 64KB 的不比较
+        if previous['peak_kb'] >= 64 and current['peak_kb'] > previous['peak_kb'] * (1 + threshold):
+            regressions.append(f"{name}: peak {previous['peak_kb']}KB -> {current['peak_kb']}KB")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='爬虫CPU路径微基准测试')
+    parser.add_argument('--pages', nargs='*', default=[], help='额外的录制页面HTML文件（支持通配符）')
+    parser.add_argument('--synthetic-sizes', default='50,400,2000', help='合成页面的信息流笔记数，逗号分隔，留空不生成')
+    parser.add_argument('--samples', type=int, default=50, help='每个用例的样本数')
+    parser.add_argument('--min-sample-ms', type=float, default=2, help='单个样本的最短耗时（毫秒）')
+    parser.add_argument('--filter', default='', help='只运行名称包含该字符串的用例')
+    parser.add_argument('--save', help='把结果保存为基线JSON')
+    parser.add_argument('--compare', help='与基线JSON对比，发现回退时以状态码1退出')
+    parser.add_argument('--threshold', type=float, default=0.10, help='判定回退的相对变化阈值')
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.synthetic_sizes.split(',') if size.strip()]
+    cases = [(name, func) for name, func in build_cases(load_corpus(args.pages, sizes)) if args.filter in name]
+
+    results = {}
+    print(f"{'case':<52} {'ops/s':>11} {'p50_us':>10} {'p99_us':>10} {'peak_kb':>9}")
+    for name, func in cases:
+        results[name] = run_case(func, args.samples, args.min_sample_ms / 1000)
+        r = results[name]
+        print(f"{name[:52]:<52} {r['ops_per_sec']:>11.1f} {r['p50_us']:>10.2f} {r['p99_us']:>10.2f} {r['peak_kb']:>9.1f}")
+
+    if args.save:
+        report = {
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'results': results
+        }
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"💾 基线已保存: {args.save}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline.get('results', {}), args.threshold)
+        if regressions:
+            print(f"❌ 相对基线（{baseline.get('created_at')}）发现 {len(regressions)} 处性能回退:")
+            for regression in regressions:
+                print(f"   {regression}")
+            sys.exit(1)
+        print(f"✅ 相对基线（{baseline.get('created_at')}）没有超过 {args.threshold:.0%} 的性能回退")
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+__INITIAL_STATE__ 提取基准测试
+对比旧实现（整页正则 + 四次全量 replace）、完整解析（parse_initial_state）
+和只解码目标笔记子树（parse_note_detail）三种方式的延迟和峰值内存
+
+用法:
+    python benchmarks/initial_state_benchmark.py                        # 使用合成页面
+    python benchmarks/initial_state_benchmark.py --pages saved/*.html   # 使用录制的笔记页面
+"""
+import argparse
+import glob
+import json
+import os
+import random
+import re
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from xhs_v2 import XHSCrawler, parse_note_detail
+
+
+def legacy_extract_initial_state(html_content):
+    """旧版实现，仅用于对比"""
+    try:
+        pattern = r"window\.__INITIAL_STATE__=({.*?})</script>"
+        matches = re.search(pattern, html_content, re.DOTALL)
+        if not matches:
+            return None
+        state = matches.group(1)
+        state = state.replace("undefined", "null")
+        state = state.replace("NaN", "null")
+        state = state.replace("Infinity", "null")
+        state = state.replace("-Infinity", "null")
+        return json.loads(state)
+    except Exception:
+        return None
+
+
+def build_note_page(note_id: str, feed_size: int = 400, seed: int = 7) -> str:
+    """生成结构接近真实笔记详情页的HTML：大段前置脚本 + 带 undefined 的状态对象"""
+    rng = random.Random(seed)
+
+    def note(nid, index):
+        return {
+            'noteId': nid, 'type': 'normal', 'title': f'标题{index}', 'desc': '正文内容' * rng.randint(20, 80),
+            'time': 1700000000000 + index, 'ipLocation': '上海',
+            'user': {'userId': f'u{index}', 'nickname': f'作者{index}', 'avatar': 'https://sns-avatar.xhscdn.com/a.jpg'},
+            'interactInfo': {'likedCount': str(rng.randint(0, 9999)), 'collectedCount': '12', 'commentCount': '3', 'shareCount': '1'},
+            'tagList': [{'name': f'话题{t}', 'type': 'topic'} for t in range(rng.randint(1, 6))],
+            'imageList': [{'urlDefault': f'https://sns-webpic.xhscdn.com/{nid}/{i}.jpg', 'width': 1080, 'height': 1440}
+                          for i in range(rng.randint(1, 9))],
+            'video': '__UNDEFINED__'
+        }
+
+    state = {
+        'global': {'appSettings': {'notificationInterval': 30, 'prefetch': '__UNDEFINED__'}},
+        'user': {'loggedIn': False, 'userInfo': '__UNDEFINED__'},
+        'note': {
+            'firstNoteId': note_id,
+            'noteDetailMap': {note_id: {'note': note(note_id, 0), 'comments': {'list': [], 'cursor': ''}}},
+            'serverRequestInfo': {'state': 'success', 'errorCode': 0}
+        },
+        'feed': {'feeds': [note(f'feed{i:06d}', i) for i in range(1, feed_size)]}
+    }
+    state_js = json.dumps(state, ensure_ascii=False, separators=(',', ':')).replace('"__UNDEFINED__"', 'undefined')
+    prelude = '<script>' + 'var __chunk=function(){return 0};' * 2000 + '</script>'
+    return (f'<!doctype html><html><head>{prelude}</head><body><div id="app"></div>'
+            f'<script>window.__INITIAL_STATE__={state_js}</script>'
+            f'<script src="https://fe-static.xhscdn.com/main.js"></script></body></html>')
+
+
+def measure(func, html: str, repeat: int):
+    """返回 (p50毫秒, 平均毫秒, 峰值内存KB, 结果)"""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(html)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    tracemalloc.start()
+    func(html)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(timings), statistics.mean(timings), peak / 1024, result
+
+
+def run_benchmark(pages, repeat: int):
+    """逐页对比各实现并打印结果，pages 为 (名称, HTML, 笔记ID) 列表"""
+    print(f"{'page':<24} {'size_kb':>8} {'impl':>8} {'p50_ms':>9} {'mean_ms':>9} {'peak_kb':>9}")
+    for name, html, note_id in pages:
+        results = {}
+        implementations = (
+            ('legacy', legacy_extract_initial_state),
+            ('scan', XHSCrawler.extract_initial_state),
+            ('partial', lambda page: parse_note_detail(page, note_id)),
+        )
+        for impl, func in implementations:
+            p50, mean, peak, results[impl] = measure(func, html, repeat)
+            print(f"{name[:24]:<24} {len(html) / 1024:>8.1f} {impl:>8} {p50:>9.3f} {mean:>9.3f} {peak:>9.1f}")
+
+        if results['scan'] is None:
+            print(f"❌ {name}: 新实现未能提取状态")
+        elif results['legacy'] != results['scan']:
+            # 旧实现会改写正文中的 undefined/NaN/Infinity，结果不一致时提示
+            print(f"⚠️  {name}: 两种实现结果不一致（旧实现可能改写了字符串内容或解析失败）")
+        elif results['partial'] != results['scan']['note']['noteDetailMap'].get(note_id):
+            print(f"❌ {name}: 子树解码结果与完整解析不一致")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='__INITIAL_STATE__ 提取延迟与峰值内存基准测试')
+    parser.add_argument('--pages', nargs='*', default=[], help='录制的笔记页面HTML文件（支持通配符）')
+    parser.add_argument('--feed-size', type=int, default=400, help='合成页面中附带的信息流笔记数')
+    parser.add_argument('--repeat', type=int, default=30, help='每组测量重复次数')
+    args = parser.parse_args()
+
+    pages = []
+    for pattern in args.pages:
+        for path in sorted(glob.glob(pattern)):
+            with open(path, 'r', encoding='utf-8') as f:
+                html = f.read()
+            state = XHSCrawler.extract_initial_state(html) or {}
+            note_id = state.get('note', {}).get('firstNoteId') or next(iter(state.get('note', {}).get('noteDetailMap', {})), None)
+            pages.append((os.path.basename(path), html, note_id))
+    if not pages:
+        note_id = '68ad9b60000000001c00d7d4'
+        pages = [('synthetic', build_note_page(note_id, args.feed_size), note_id)]
+
+    run_benchmark(pages, args.repeat)
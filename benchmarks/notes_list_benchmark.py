@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+笔记列表查询基准测试
+对比 get_notes_list 的逐条加载（N+1）与批量加载两种模式的查询次数和延迟
+
+用法: python benchmarks/notes_list_benchmark.py --notes 2000 --page-sizes 10,20,50,100
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import XiaohongshuDatabase
+
+
+class QueryCounter:
+    """通过 sqlite3 trace callback 统计执行的查询语句数"""
+    
+    def __init__(self):
+        self.count = 0
+    
+    def __call__(self, statement):
+        if statement.lstrip().upper().startswith(('SELECT', 'WITH')):
+            self.count += 1
+
+
+def install_query_counter(database: XiaohongshuDatabase) -> QueryCounter:
+    """为连接池取出的每个连接安装查询计数器"""
+    counter = QueryCounter()
+    original_checkout = database.pool.checkout
+    
+    def counting_checkout():
+        conn = original_checkout()
+        conn.set_trace_callback(counter)
+        return conn
+    
+    database.pool.checkout = counting_checkout
+    return counter
+
+
+def populate(database: XiaohongshuDatabase, note_count: int, seed: int = 42) -> int:
+    """直接批量写入测试数据，返回测试用户ID"""
+    rng = random.Random(seed)
+    with database.pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("INSERT INTO users (username, password_hash) VALUES (?, ?)", ('bench_user', 'x'))
+        user_id = cursor.lastrowid
+        
+        tag_names = [f'标签{i}' for i in range(200)]
+        cursor.executemany("INSERT OR IGNORE INTO tags (name) VALUES (?)", [(name,) for name in tag_names])
+        
+        notes, authors, note_authors, stats, note_tags, images, videos = [], [], [], [], [], [], []
+        for i in range(note_count):
+            note_id = f'bench{i:08d}'
+            created_at = f'2024-01-01 00:00:{i % 60:02d}.{i:06d}'
+            notes.append((user_id, note_id, f'笔记标题{i}', f'笔记内容{i}', '图文', '', '上海', '', created_at))
+            authors.append((f'author{i % 500}', f'作者{i % 500}', ''))
+            note_authors.append((note_id, i % 500 + 1))
+            stats.append((note_id, rng.randint(0, 10000), rng.randint(0, 1000), rng.randint(0, 500), rng.randint(0, 100)))
+            for tag_id in rng.sample(range(1, len(tag_names) + 1), rng.randint(0, 5)):
+                note_tags.append((note_id, tag_id))
+            for order in range(rng.randint(1, 9)):
+                images.append((note_id, f'https://img.example.com/{note_id}/{order}.jpg', order))
+            if rng.random() < 0.1:
+                videos.append((note_id, f'http://sns-video-bd.xhscdn.com/{note_id}', 0))
+        
+        cursor.executemany('''
+            INSERT INTO notes (user_id, note_id, title, content, type, publish_time, location, original_url, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', notes)
+        cursor.executemany("INSERT OR IGNORE INTO authors (user_id, nickname, avatar) VALUES (?, ?, ?)", authors)
+        cursor.executemany("INSERT OR IGNORE INTO note_authors (note_id, author_id) VALUES (?, ?)", note_authors)
+        cursor.executemany("INSERT INTO note_stats (note_id, likes, collects, comments, shares) VALUES (?, ?, ?, ?, ?)", stats)
+        cursor.executemany("INSERT OR IGNORE INTO note_tags (note_id, tag_id) VALUES (?, ?)", note_tags)
+        cursor.executemany("INSERT INTO note_images (note_id, image_url, image_order) VALUES (?, ?, ?)", images)
+        cursor.executemany("INSERT INTO note_videos (note_id, video_url, video_order) VALUES (?, ?, ?)", videos)
+    return user_id
+
+
+def run_benchmark(note_count: int, page_sizes, repeat: int):
+    """运行基准测试并打印结果"""
+    db_path = os.path.join(tempfile.mkdtemp(prefix='xhs_bench_'), 'bench.db')
+    database = XiaohongshuDatabase(db_path)
+    user_id = populate(database, note_count)
+    counter = install_query_counter(database)
+    
+    print(f"📊 笔记数: {note_count}, 每组重复: {repeat} 次")
+    print(f"{'page_size':>10} {'mode':>10} {'queries':>8} {'p50_ms':>9} {'mean_ms':>9}")
+    
+    for page_size in page_sizes:
+        results = {}
+        for batched in (False, True):
+            timings = []
+            queries = 0
+            for _ in range(repeat):
+                counter.count = 0
+                start = time.perf_counter()
+                notes = database.get_notes_list(user_id, limit=page_size, offset=0, batched=batched)
+                timings.append((time.perf_counter() - start) * 1000)
+                queries = counter.count
+            results[batched] = notes
+            mode = 'batched' if batched else 'per-note'
+            print(f"{page_size:>10} {mode:>10} {queries:>8} {statistics.median(timings):>9.3f} {statistics.mean(timings):>9.3f}")
+        
+        if results[False] != results[True]:
+            print(f"❌ page_size={page_size} 两种模式返回结果不一致")
+    
+    database.pool.close_all()
+    os.remove(db_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='get_notes_list 查询次数与延迟基准测试')
+    parser.add_argument('--notes', type=int, default=2000, help='生成的笔记数量')
+    parser.add_argument('--page-sizes', default='10,20,50,100', help='逗号分隔的分页大小')
+    parser.add_argument('--repeat', type=int, default=20, help='每组测量重复次数')
+    args = parser.parse_args()
+    
+    run_benchmark(args.notes, [int(size) for size in args.page_sizes.split(',')], args.repeat)
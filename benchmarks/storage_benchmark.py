@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+存储层基准测试
+按配置的规模生成用户、笔记、标签、图片和二创历史，测量 save_note、不同翻页深度的笔记列表、
+get_notes_count、delete_note、get_recreate_history 和 verify_database_state 的延迟和每次调用的SQL语句数，
+同时覆盖 XiaohongshuDatabase (database.py) 和 api/_database.DatabaseManager 的SQLite模式，输出可对比的JSON报告
+
+用法:
+    python benchmarks/storage_benchmark.py                                   # 10k / 100k 笔记
+    python benchmarks/storage_benchmark.py --scales 10000,100000,1000000 --output storage_report.json
+    python benchmarks/storage_benchmark.py --backends local --scales 10000
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(1, os.path.join(ROOT_DIR, 'api'))
+
+from database import XiaohongshuDatabase
+from _database import DatabaseManager
+from corpus_generator import CorpusGenerator
+
+INSERT_CHUNK = 20000
+BASE_TIME = datetime(2024, 1, 1)
+
+
+class StatementCounter:
+    """通过 sqlite3 trace callback 按类型统计执行的SQL语句"""
+
+    KINDS = ('SELECT', 'INSERT', 'UPDATE', 'DELETE')
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.counts = dict.fromkeys(self.KINDS, 0)
+
+    def __call__(self, statement):
+        kind = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ''
+        if kind == 'WITH':
+            kind = 'SELECT'
+        if kind in self.counts:
+            self.counts[kind] += 1
+
+
+def install_counter(backend) -> StatementCounter:
+    """为后端取出的每个连接安装语句计数器"""
+    counter = StatementCounter()
+    if isinstance(backend, XiaohongshuDatabase):
+        original_checkout = backend.pool.checkout
+
+        def counting_checkout():
+            conn = original_checkout()
+            conn.set_trace_callback(counter)
+            return conn
+
+        backend.pool.checkout = counting_checkout
+    else:
+        original_get_connection = backend.get_connection
+
+        def counting_get_connection():
+            conn = original_get_connection()
+            conn.set_trace_callback(counter)
+            return conn
+
+        backend.get_connection = counting_get_connection
+    return counter
+
+
+def note_owner(index: int, users: int, heavy_share: float) -> int:
+    """笔记所属用户：heavy_share 比例的笔记属于用户1（用于测量深翻页），其余均匀分给其他用户"""
+    if users == 1 or (index * 7919 % 1000) < heavy_share * 1000:
+        return 1
+    return 2 + index % (users - 1)
+
+
+def populate_local(database: XiaohongshuDatabase, notes: int, users: int, heavy_share: float,
+                   history_per_user: int, seed: int) -> None:
+    """直接批量写入 database.py 的规范化表结构"""
+    generator = CorpusGenerator(seed)
+    with database.pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.executemany("INSERT INTO users (username, password_hash) VALUES (?, ?)",
+                           [(f'bench_user{u}', 'x') for u in range(1, users + 1)])
+        cursor.executemany("INSERT OR IGNORE INTO tags (name) VALUES (?)", [(tag,) for tag in generator.tags])
+        cursor.executemany("INSERT OR IGNORE INTO authors (user_id, nickname, avatar) VALUES (?, ?, ?)",
+                           [(a['user_id'], a['nickname'], a['avatar']) for a in generator.authors])
+        cursor.execute("SELECT name, id FROM tags")
+        tag_ids = dict(cursor.fetchall())
+        cursor.execute("SELECT user_id, id FROM authors")
+        author_ids = dict(cursor.fetchall())
+
+        for start in range(0, notes, INSERT_CHUNK):
+            rows = {key: [] for key in ('notes', 'authors', 'stats', 'tags', 'images', 'videos')}
+            for index in range(start, min(start + INSERT_CHUNK, notes)):
+                note = generator.note(index)
+                note_id = note['note_id']
+                created_at = (BASE_TIME + timedelta(seconds=index)).strftime('%Y-%m-%d %H:%M:%S')
+                rows['notes'].append((note_owner(index, users, heavy_share), note_id, note['title'], note['content'],
+                                      note['type'], note['publish_time'], note['location'], note['original_url'],
+                                      created_at))
+                rows['authors'].append((note_id, author_ids[note['author']['user_id']]))
+                rows['stats'].append((note_id, *(int(count) for count in note['stats'].values())))
+                rows['tags'].extend((note_id, tag_ids[tag]) for tag in note['tags'])
+                rows['images'].extend((note_id, url, i) for i, url in enumerate(note['images']))
+                rows['videos'].extend((note_id, url, i) for i, url in enumerate(note['videos']))
+
+            cursor.executemany('''
+                INSERT INTO notes (user_id, note_id, title, content, type, publish_time, location, original_url, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', rows['notes'])
+            cursor.executemany("INSERT INTO note_authors (note_id, author_id) VALUES (?, ?)", rows['authors'])
+            cursor.executemany("INSERT INTO note_stats (note_id, likes, collects, comments, shares) VALUES (?, ?, ?, ?, ?)",
+                               rows['stats'])
+            cursor.executemany("INSERT INTO note_tags (note_id, tag_id) VALUES (?, ?)", rows['tags'])
+            cursor.executemany("INSERT INTO note_images (note_id, image_url, image_order) VALUES (?, ?, ?)", rows['images'])
+            cursor.executemany("INSERT INTO note_videos (note_id, video_url, video_order) VALUES (?, ?, ?)", rows['videos'])
+            conn.commit()
+
+        cursor.executemany('''
+            INSERT INTO recreate_history (user_id, original_note_id, original_title, original_content, new_title, new_content, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', [(u, generator.note(h)['note_id'], f'原标题{h}', '原正文', f'新标题{h}', '二创正文' * 20,
+               (BASE_TIME + timedelta(seconds=h)).strftime('%Y-%m-%d %H:%M:%S'))
+              for u in range(1, users + 1) for h in range(history_per_user)])
+
+
+def populate_serverless(manager: DatabaseManager, notes: int, users: int, heavy_share: float,
+                        history_per_user: int, seed: int) -> None:
+    """直接批量写入 api/_database.py 的表结构（作者、互动、图片以JSON列保存）"""
+    generator = CorpusGenerator(seed)
+    conn = manager.get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.executemany("INSERT INTO users (username, password_hash) VALUES (?, ?)",
+                           [(f'bench_user{u}', 'x') for u in range(1, users + 1)])
+        for start in range(0, notes, INSERT_CHUNK):
+            rows = []
+            for index in range(start, min(start + INSERT_CHUNK, notes)):
+                note = generator.note(index)
+                rows.append((note_owner(index, users, heavy_share), note['note_id'], note['title'], note['content'],
+                             note['type'], note['publish_time'], note['location'], note['original_url'],
+                             json.dumps(note['author'], ensure_ascii=False), json.dumps(note['stats']),
+                             json.dumps({'images': note['images'], 'videos': note['videos']}),
+                             (BASE_TIME + timedelta(seconds=index)).strftime('%Y-%m-%d %H:%M:%S')))
+            cursor.executemany('''
+                INSERT INTO notes (user_id, note_id, title, content, type, publish_time, location, original_url,
+                                   author_data, stats_data, images_data, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
+            conn.commit()
+
+        cursor.execute("SELECT user_id, MIN(id) FROM notes GROUP BY user_id")
+        first_note = dict(cursor.fetchall())
+        cursor.executemany('''
+            INSERT INTO recreate_history (user_id, note_id, original_title, original_content, recreated_title, recreated_content, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', [(u, first_note[u], f'原标题{h}', '原正文', f'新标题{h}', '二创正文' * 20,
+               (BASE_TIME + timedelta(seconds=h)).strftime('%Y-%m-%d %H:%M:%S'))
+              for u in range(1, users + 1) if u in first_note for h in range(history_per_user)])
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def open_local(directory: str) -> XiaohongshuDatabase:
+    return XiaohongshuDatabase(os.path.join(directory, 'local.db'))
+
+
+def open_serverless(directory: str) -> DatabaseManager:
+    manager = DatabaseManager()
+    manager.db_path = os.path.join(directory, 'serverless.db')
+    manager.init_database()
+    return manager
+
+
+def measure(func, calls, counter: StatementCounter):
+    """依次执行 calls 中的参数并返回延迟分布和每次调用的平均语句数"""
+    timings = []
+    totals = dict.fromkeys(StatementCounter.KINDS, 0)
+    for args in calls:
+        counter.reset()
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            func(*args)
+            timings.append((time.perf_counter() - start) * 1000)
+        for kind, count in counter.counts.items():
+            totals[kind] += count
+
+    timings.sort()
+    return {
+        'calls': len(timings),
+        'p50_ms': round(statistics.median(timings), 3),
+        'p99_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.99))], 3),
+        'mean_ms': round(statistics.mean(timings), 3),
+        'queries_per_call': round(totals['SELECT'] / len(timings), 2),
+        'writes_per_call': round((totals['INSERT'] + totals['UPDATE'] + totals['DELETE']) / len(timings), 2)
+    }
+
+
+def run_backend(kind: str, notes: int, args) -> dict:
+    """在临时数据库上生成数据并测量一个后端，返回 {操作: 结果}"""
+    directory = tempfile.mkdtemp(prefix='xhs_storage_')
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            backend = open_local(directory) if kind == 'local' else open_serverless(directory)
+
+        started = time.perf_counter()
+        populate = populate_local if kind == 'local' else populate_serverless
+        populate(backend, notes, args.users, args.heavy_share, args.history_per_user, args.seed)
+        populate_seconds = round(time.perf_counter() - started, 2)
+
+        counter = install_counter(backend)
+        heavy_user = 1
+        user_notes = backend.get_notes_count(heavy_user)
+        results = {'_populate': {'seconds': populate_seconds, 'heavy_user_notes': user_notes}}
+
+        new_notes = list(CorpusGenerator(args.seed).generate(args.writes, start=notes))
+        results['save_note'] = measure(backend.save_note, [(note, heavy_user) for note in new_notes], counter)
+
+        page_size = args.page_size
+        for page in args.pages:
+            offset = (page - 1) * page_size
+            if offset >= user_notes:
+                continue
+            if kind == 'local':
+                func, call = backend.get_notes_list, (heavy_user, page_size, offset)
+            else:
+                func, call = backend.get_notes, (heavy_user, page, page_size)
+            results[f'get_notes_list[page={page}]'] = measure(func, [call] * args.repeat, counter)
+
+        results['get_notes_count'] = measure(backend.get_notes_count, [(heavy_user,)] * args.repeat, counter)
+        results['delete_note'] = measure(backend.delete_note, [(heavy_user, note['note_id']) for note in new_notes],
+                                         counter)
+
+        # DatabaseManager 没有这两个方法（Serverless接口直接查询），报告中记为不支持
+        if kind == 'local':
+            results['get_recreate_history'] = measure(backend.get_recreate_history,
+                                                      [(heavy_user, page_size, 0)] * args.repeat, counter)
+            results['verify_database_state'] = measure(backend.verify_database_state, [()] * args.repeat, counter)
+        else:
+            results['get_recreate_history'] = None
+            results['verify_database_state'] = None
+
+        if kind == 'local':
+            backend.pool.close_all()
+        return results
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def print_results(scale: int, kind: str, results: dict) -> None:
+    populate = results['_populate']
+    print(f"\n📊 {kind} @ {scale} 笔记（生成 {populate['seconds']}s，用户1 笔记 {populate['heavy_user_notes']} 条）")
+    print(f"{'operation':<32} {'calls':>6} {'p50_ms':>9} {'p99_ms':>9} {'mean_ms':>9} {'queries':>8} {'writes':>7}")
+    for name, r in results.items():
+        if name.startswith('_'):
+            continue
+        if r is None:
+            print(f"{name:<32} {'不支持':>6}")
+            continue
+        print(f"{name:<32} {r['calls']:>6} {r['p50_ms']:>9.3f} {r['p99_ms']:>9.3f} {r['mean_ms']:>9.3f} "
+              f"{r['queries_per_call']:>8.2f} {r['writes_per_call']:>7.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='存储层延迟与查询次数基准测试')
+    parser.add_argument('--scales', default='10000,100000', help='笔记总数，逗号分隔（例如 10000,100000,1000000）')
+    parser.add_argument('--backends', default='local,serverless',
+                        help='local = database.XiaohongshuDatabase，serverless = api/_database.DatabaseManager (SQLite)')
+    parser.add_argument('--users', type=int, default=100, help='用户数')
+    parser.add_argument('--heavy-share', type=float, default=0.1, help='属于用户1的笔记比例，用于测量深翻页')
+    parser.add_argument('--history-per-user', type=int, default=50, help='每个用户的二创历史数')
+    parser.add_argument('--page-size', type=int, default=20, help='列表分页大小')
+    parser.add_argument('--pages', default='1,10,100,1000,5000', help='测量的页码，超出用户1笔记数的页码跳过')
+    parser.add_argument('--writes', type=int, default=200, help='save_note / delete_note 的调用次数')
+    parser.add_argument('--repeat', type=int, default=30, help='读操作的重复次数')
+    parser.add_argument('--seed', type=int, default=42, help='数据生成随机种子')
+    parser.add_argument('--output', help='JSON报告路径')
+    args = parser.parse_args()
+    args.pages = [int(page) for page in args.pages.split(',') if page.strip()]
+
+    os.environ.pop('DATABASE_URL', None)
+    report = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+        'config': {key: value for key, value in vars(args).items() if key not in ('scales', 'backends', 'output')},
+        'results': {}
+    }
+    for scale in [int(scale) for scale in args.scales.split(',') if scale.strip()]:
+        report['results'][str(scale)] = {}
+        for kind in [kind.strip() for kind in args.backends.split(',') if kind.strip()]:
+            results = run_backend(kind, scale, args)
+            report['results'][str(scale)][kind] = results
+            print_results(scale, kind, results)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 报告已保存: {args.output}")
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+小红书离线替身服务器
+用录制的笔记页面（benchmarks/fixtures/*.html）模拟笔记详情页和 xhslink.com 短链接跳转，
+可配置延迟、错误率和429限流，用于在没有网络的机器上压测和基准测试采集吞吐
+
+用法:
+    python benchmarks/xhs_standin_server.py --port 8765 --latency-ms 80 --jitter-ms 40 --error-rate 0.02 --rate-limit 50
+    XHS_BASE_URL=http://127.0.0.1:8765 XHS_SHORT_LINK_BASE_URL=http://127.0.0.1:8765 python app.py
+
+路由:
+    GET/HEAD /explore/<note_id>, /discovery/item/<note_id>   笔记详情页
+    GET/HEAD /<code>, /a/<code>                               短链接，302 跳转到笔记详情页
+    GET      /__standin/stats                                 请求统计（JSON）
+
+任意笔记ID都能访问：录制页面中没有的ID按哈希选一个录制页面作为模板，把其中的笔记ID替换为请求的ID。
+短链接 /<fixture文件名> 跳转到该录制页面的笔记，其余短链接按哈希映射到固定的笔记ID。
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from xhs_v2 import parse_initial_state
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+NOTE_PATH_PATTERN = re.compile(r'^/(?:explore|discovery/item)/([a-zA-Z0-9]+)$')
+# xhslink.com 短链接形如 /a/<code> 或 /<code>
+SHORT_LINK_PATTERN = re.compile(r'^/(?:[a-zA-Z]/)?([a-zA-Z0-9_-]+)$')
+
+
+class FixtureLibrary:
+    """录制的笔记页面，按笔记ID提供页面HTML"""
+
+    def __init__(self, fixtures_dir: str = FIXTURES_DIR):
+        self.pages = {}
+        self.short_links = {}
+        for path in sorted(glob.glob(os.path.join(fixtures_dir, '*.html'))):
+            with open(path, 'r', encoding='utf-8') as f:
+                html = f.read()
+            state = parse_initial_state(html) or {}
+            note_state = state.get('note') or {}
+            note_id = note_state.get('firstNoteId') or next(iter(note_state.get('noteDetailMap') or {}), None)
+            if not note_id:
+                print(f"⚠️  跳过无法识别笔记ID的录制页面: {path}")
+                continue
+            self.pages[note_id] = html
+            self.short_links[os.path.splitext(os.path.basename(path))[0]] = note_id
+        if not self.pages:
+            raise ValueError(f"目录中没有可用的录制页面: {fixtures_dir}")
+        self.templates = list(self.pages.items())
+
+    def page_for(self, note_id: str) -> bytes:
+        """返回笔记详情页，未录制的笔记用模板页面替换笔记ID生成"""
+        html = self.pages.get(note_id)
+        if html is None:
+            template_id, template = self.templates[zlib.crc32(note_id.encode()) % len(self.templates)]
+            html = template.replace(template_id, note_id)
+        return html.encode('utf-8')
+
+    def resolve_short_link(self, code: str) -> str:
+        """短链接代码 -> 笔记ID"""
+        return self.short_links.get(code) or hashlib.md5(code.encode()).hexdigest()[:24]
+
+
+class StandInServer(ThreadingHTTPServer):
+    """替身服务器：保存录制页面、故障注入配置和请求统计"""
+
+    daemon_threads = True
+
+    def __init__(self, address, library: FixtureLibrary, latency_ms: float = 0, jitter_ms: float = 0,
+                 error_rate: float = 0, throttle_rate: float = 0, rate_limit: float = 0,
+                 public_url: str = None, seed: int = None, verbose: bool = False):
+        """
+        Args:
+            latency_ms / jitter_ms: 每个请求的基础延迟和随机抖动（毫秒）
+            error_rate: 随机返回 500/502/503 的比例
+            throttle_rate: 随机返回 429 的比例
+            rate_limit: 每秒允许的请求数（令牌桶），超出时返回 429，0 表示不限
+            public_url: 跳转地址使用的服务器地址，默认为 http://<监听地址>:<端口>
+        """
+        super().__init__(address, StandInHandler)
+        self.library = library
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.rate_limit = rate_limit
+        self.verbose = verbose
+        host, port = self.server_address[:2]
+        if host in ('0.0.0.0', '::', ''):
+            host = '127.0.0.1'
+        self.base_url = (public_url or f'http://{host}:{port}').rstrip('/')
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._tokens = float(rate_limit)
+        self._refilled_at = time.monotonic()
+        self._stats = {'requests': 0, 'pages': 0, 'redirects': 0, 'not_found': 0, 'throttled': 0, 'errors': 0}
+
+    def record(self, key: str) -> None:
+        with self._lock:
+            self._stats[key] += 1
+
+    def random(self) -> float:
+        with self._lock:
+            return self._rng.random()
+
+    def delay(self) -> float:
+        with self._lock:
+            jitter = self._rng.uniform(0, self.jitter_ms) if self.jitter_ms else 0
+        return (self.latency_ms + jitter) / 1000
+
+    def take_token(self) -> bool:
+        """令牌桶限流，返回是否允许本次请求"""
+        if self.rate_limit <= 0:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.rate_limit, self._tokens + (now - self._refilled_at) * self.rate_limit)
+            self._refilled_at = now
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats)
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    # 保持连接，与真实上游一样允许客户端复用keep-alive连接
+    protocol_version = 'HTTP/1.1'
+    server_version = 'XHSStandIn/1.0'
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            print(f"[standin] {format % args}")
+
+    def do_GET(self):
+        self._handle(send_body=True)
+
+    def do_HEAD(self):
+        self._handle(send_body=False)
+
+    def _send(self, status: int, body: bytes = b'', content_type: str = 'text/html; charset=utf-8',
+              headers: dict = None, send_body: bool = True):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def _handle(self, send_body: bool):
+        server = self.server
+        path = urlparse(self.path).path
+
+        if path == '/__standin/stats':
+            body = json.dumps(server.get_stats()).encode('utf-8')
+            self._send(200, body, 'application/json', send_body=send_body)
+            return
+
+        server.record('requests')
+        delay = server.delay()
+        if delay > 0:
+            time.sleep(delay)
+
+        # 故障注入：先限流，再随机错误
+        if not server.take_token() or server.random() < server.throttle_rate:
+            server.record('throttled')
+            self._send(429, '{"code":300013,"msg":"访问频次异常"}'.encode('utf-8'), 'application/json',
+                       headers={'Retry-After': '1'}, send_body=send_body)
+            return
+        if server.random() < server.error_rate:
+            server.record('errors')
+            self._send((500, 502, 503)[int(server.random() * 3)], b'upstream error', 'text/plain', send_body=send_body)
+            return
+
+        note_match = NOTE_PATH_PATTERN.match(path)
+        if note_match:
+            server.record('pages')
+            self._send(200, server.library.page_for(note_match.group(1)), send_body=send_body)
+            return
+
+        short_match = SHORT_LINK_PATTERN.match(path)
+        if short_match:
+            server.record('redirects')
+            note_id = server.library.resolve_short_link(short_match.group(1))
+            token = 'AB' + hashlib.sha1(note_id.encode()).hexdigest()[:32]
+            location = f"{server.base_url}/explore/{note_id}?xsec_token={token}&xsec_source=pc_share"
+            self._send(302, b'', headers={'Location': location}, send_body=send_body)
+            return
+
+        server.record('not_found')
+        self._send(404, b'not found', 'text/plain', send_body=send_body)
+
+
+def start_standin_server(host: str = '127.0.0.1', port: int = 0, fixtures_dir: str = FIXTURES_DIR,
+                         **options) -> StandInServer:
+    """在后台线程启动替身服务器（port=0 时自动分配端口），通过 server.base_url 获取地址，用完调用 server.shutdown()"""
+    server = StandInServer((host, port), FixtureLibrary(fixtures_dir), **options)
+    threading.Thread(target=server.serve_forever, name='xhs-standin', daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='小红书离线替身服务器')
+    parser.add_argument('--host', default='127.0.0.1', help='监听地址')
+    parser.add_argument('--port', type=int, default=8765, help='监听端口')
+    parser.add_argument('--fixtures', default=FIXTURES_DIR, help='录制页面目录（*.html）')
+    parser.add_argument('--latency-ms', type=float, default=0, help='每个请求的基础延迟（毫秒）')
+    parser.add_argument('--jitter-ms', type=float, default=0, help='延迟的随机抖动上限（毫秒）')
+    parser.add_argument('--error-rate', type=float, default=0, help='随机返回5xx的比例')
+    parser.add_argument('--throttle-rate', type=float, default=0, help='随机返回429的比例')
+    parser.add_argument('--rate-limit', type=float, default=0, help='每秒允许的请求数，超出返回429，0 表示不限')
+    parser.add_argument('--public-url', default=None, help='短链接跳转使用的服务器地址')
+    parser.add_argument('--seed', type=int, default=None, help='故障注入随机种子')
+    parser.add_argument('--verbose', action='store_true', help='打印每个请求')
+    args = parser.parse_args()
+
+    standin = StandInServer(
+        (args.host, args.port), FixtureLibrary(args.fixtures),
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate, rate_limit=args.rate_limit,
+        public_url=args.public_url, seed=args.seed, verbose=args.verbose
+    )
+    print(f"🧪 小红书替身服务器已启动: {standin.base_url}（录制页面 {len(standin.library.pages)} 个）")
+    print(f"   XHS_BASE_URL={standin.base_url} XHS_SHORT_LINK_BASE_URL={standin.base_url}")
+    try:
+        standin.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 替身服务器已停止")
+        standin.server_close()
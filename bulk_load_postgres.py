@@ -0,0 +1,495 @@
+#!/usr/bin/env python3
+"""
+PostgreSQL批量导入
+用 COPY FROM STDIN 把笔记、二创历史和视觉故事历史流式写入临时暂存表，再用 INSERT ... ON CONFLICT DO NOTHING
+合并到 api/_database.DatabaseManager 的正式表，替代逐条 save_note（每条一次存在性查询、插入和提交）。
+数据来源可以是 database.py 生成的SQLite数据库，也可以是NDJSON文件
+
+用法:
+    DATABASE_URL=postgresql://... python bulk_load_postgres.py --sqlite xiaohongshu_notes.db
+    DATABASE_URL=postgresql://... python bulk_load_postgres.py --sqlite xiaohongshu_notes.db --user-id 3
+    DATABASE_URL=postgresql://... python bulk_load_postgres.py --notes-ndjson corpus.ndjson --user-id 3
+    python benchmarks/corpus_generator.py --count 100000 --ndjson - | python bulk_load_postgres.py --notes-ndjson - --user-id 3
+
+NDJSON格式（每行一条记录）:
+    笔记       get_xiaohongshu_note 返回的 data 结构（即 corpus_generator.py 的输出），可带 created_at
+    二创历史   id, original_note_id, original_title, original_content, new_title, new_content, created_at
+    视觉故事   history_id（对应同一次导入中二创历史的 id）, title, content, cover_card_data, content_cards_data,
+               html_content, model_used, created_at
+
+从SQLite导入时按用户名把用户同步到PostgreSQL（已存在的用户名直接复用），--user-id 则把所有数据导入到该用户。
+每批在一个事务中完成（临时表 ON COMMIT DROP），可以直接使用Neon的 -pooler 连接地址。
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+NOTE_COLUMNS = ('user_id', 'note_id', 'title', 'content', 'type', 'publish_time', 'location', 'original_url',
+                'author_data', 'stats_data', 'images_data', 'created_at')
+HISTORY_COLUMNS = ('source_id', 'user_id', 'original_note_id', 'original_title', 'original_content',
+                   'new_title', 'new_content', 'created_at')
+STORY_COLUMNS = ('user_id', 'history_id', 'title', 'content', 'cover_card_data', 'content_cards_data',
+                 'html_content', 'model_used', 'created_at')
+
+STAGING_TABLES = {
+    'bulk_notes': '''
+        CREATE TEMP TABLE bulk_notes (
+            user_id INTEGER, note_id TEXT, title TEXT, content TEXT, type TEXT, publish_time TEXT,
+            location TEXT, original_url TEXT, author_data JSONB, stats_data JSONB, images_data JSONB,
+            created_at TIMESTAMP
+        ) ON COMMIT DROP
+    ''',
+    'bulk_recreate_history': '''
+        CREATE TEMP TABLE bulk_recreate_history (
+            source_id BIGINT, user_id INTEGER, original_note_id TEXT, original_title TEXT,
+            original_content TEXT, new_title TEXT, new_content TEXT, created_at TIMESTAMP
+        ) ON COMMIT DROP
+    ''',
+    'bulk_visual_stories': '''
+        CREATE TEMP TABLE bulk_visual_stories (
+            user_id INTEGER, history_id INTEGER, title TEXT, content TEXT, cover_card_data TEXT,
+            content_cards_data TEXT, html_content TEXT, model_used TEXT, created_at TIMESTAMP
+        ) ON COMMIT DROP
+    ''',
+}
+
+# 长度与 notes 表的 VARCHAR 列一致，超长时截断而不是让整批失败
+NOTES_MERGE = '''
+    INSERT INTO notes (user_id, note_id, title, content, type, publish_time, location, original_url,
+                       author_data, stats_data, images_data, created_at)
+    SELECT user_id, LEFT(note_id, 100), COALESCE(title, ''), content, LEFT(type, 50), LEFT(publish_time, 100),
+           LEFT(location, 200), original_url, author_data, stats_data, images_data,
+           COALESCE(created_at, CURRENT_TIMESTAMP)
+    FROM bulk_notes
+    ON CONFLICT (user_id, note_id) DO NOTHING
+'''
+
+# recreate_history 没有唯一约束：(用户, 笔记, 创建时间, 新标题, 新正文) 都相同才算重复，同一批中重复的记录只插入第一条；
+# 没有 created_at 的记录按导入时间写入，重复导入时按 (用户, 笔记, 新标题, 新正文) 匹配已有记录。
+# 先分配ID再插入，返回 来源ID -> PostgreSQL ID 的对应关系供视觉故事关联（重复和已导入过的记录对应到同一个ID）
+HISTORY_MERGE = '''
+    WITH source AS (
+        SELECT s.source_id, s.user_id, n.id AS note_id, s.original_title, s.original_content,
+               s.new_title, s.new_content, s.created_at IS NULL AS undated,
+               COALESCE(s.created_at, CURRENT_TIMESTAMP) AS created_at,
+               row_number() OVER () AS row_no
+        FROM bulk_recreate_history s
+        JOIN notes n ON n.user_id = s.user_id AND n.note_id = s.original_note_id
+    ), grouped AS (
+        SELECT source.*,
+               min(row_no) OVER (PARTITION BY user_id, note_id, undated, created_at, new_title, new_content)
+                   AS first_row_no
+        FROM source
+    ), assigned AS (
+        SELECT checked.*, COALESCE(existing_id, nextval(pg_get_serial_sequence('recreate_history', 'id'))) AS history_id
+        FROM (
+            SELECT staged.*,
+                   (SELECT h.id FROM recreate_history h
+                    WHERE h.user_id = staged.user_id AND h.note_id = staged.note_id
+                      AND h.recreated_title IS NOT DISTINCT FROM staged.new_title
+                      AND h.recreated_content IS NOT DISTINCT FROM staged.new_content
+                      AND (staged.undated OR h.created_at IS NOT DISTINCT FROM staged.created_at)
+                    ORDER BY h.id LIMIT 1) AS existing_id
+            FROM grouped staged
+            WHERE staged.row_no = staged.first_row_no
+        ) checked
+    ), inserted AS (
+        INSERT INTO recreate_history (id, user_id, note_id, original_title, original_content,
+                                      recreated_title, recreated_content, created_at)
+        SELECT history_id, user_id, note_id, original_title, original_content, new_title, new_content, created_at
+        FROM assigned
+        WHERE existing_id IS NULL
+    )
+    SELECT grouped.source_id, assigned.history_id, assigned.existing_id IS NULL AND grouped.row_no = assigned.row_no
+    FROM grouped
+    JOIN assigned ON assigned.row_no = grouped.first_row_no
+'''
+
+# 去重规则与 HISTORY_MERGE 相同：(用户, 二创历史, 创建时间, 标题, 正文) 都相同才算重复，
+# 没有 created_at 时按 (用户, 二创历史, 标题, 正文) 匹配已有记录
+STORIES_MERGE = '''
+    INSERT INTO visual_story_history (user_id, history_id, title, content, cover_card_data, content_cards_data,
+                                      html_content, model_used, created_at)
+    SELECT user_id, history_id, title, content, cover_card_data, content_cards_data, html_content, model_used,
+           created_at
+    FROM (
+        SELECT DISTINCT ON (user_id, history_id, undated, created_at, title, content) *
+        FROM (
+            SELECT user_id, history_id, COALESCE(title, '') AS title, COALESCE(content, '') AS content,
+                   cover_card_data, content_cards_data, html_content,
+                   COALESCE(model_used, 'gemini-2.5-flash-image-preview') AS model_used,
+                   created_at IS NULL AS undated, COALESCE(created_at, CURRENT_TIMESTAMP) AS created_at,
+                   row_number() OVER () AS row_no
+            FROM bulk_visual_stories
+        ) source
+        ORDER BY user_id, history_id, undated, created_at, title, content, row_no
+    ) s
+    WHERE NOT EXISTS (
+        SELECT 1 FROM visual_story_history v
+        WHERE v.user_id = s.user_id AND v.history_id = s.history_id
+          AND v.title IS NOT DISTINCT FROM s.title AND v.content IS NOT DISTINCT FROM s.content
+          AND (s.undated OR v.created_at IS NOT DISTINCT FROM s.created_at)
+    )
+'''
+
+
+def copy_text(value) -> str:
+    """转换为COPY文本格式的字段：NULL 为 \\N，反斜杠、制表符和换行转义（PostgreSQL文本不能包含NUL，直接去掉）"""
+    if value is None:
+        return '\\N'
+    return (str(value).replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n')
+            .replace('\r', '\\r').replace('\x00', ''))
+
+
+class CopyStream:
+    """把逐行生成的COPY数据包装为 copy_expert 读取的文件对象，不在内存中拼出整批数据"""
+
+    def __init__(self, rows: Iterable[Tuple]):
+        self._lines = ('\t'.join(copy_text(value) for value in row) + '\n' for row in rows)
+        self._buffer = ''
+
+    def read(self, size: int = -1) -> str:
+        chunks = [self._buffer]
+        buffered = len(self._buffer)
+        while size < 0 or buffered < size:
+            line = next(self._lines, None)
+            if line is None:
+                break
+            chunks.append(line)
+            buffered += len(line)
+        data = ''.join(chunks)
+        if size < 0:
+            self._buffer = ''
+            return data
+        self._buffer = data[size:]
+        return data[:size]
+
+    readline = read
+
+
+def batched(items: Iterable, size: int) -> Iterator[List]:
+    iterator = iter(items)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def to_text(value) -> Optional[str]:
+    """NDJSON中的卡片数据可能是对象，按 json.dumps 存为文本"""
+    if value is None or isinstance(value, str):
+        return value
+    return json.dumps(value, ensure_ascii=False)
+
+
+def note_row(user_id: int, note: Dict) -> Tuple:
+    """笔记 -> bulk_notes 的一行，JSON列的编码与 DatabaseManager.save_note 相同"""
+    media = {'images': note.get('images', []), 'videos': note.get('videos', [])}
+    return (user_id, note.get('note_id'), note.get('title'), note.get('content'), note.get('type'),
+            note.get('publish_time'), note.get('location'), note.get('original_url'),
+            json.dumps(note.get('author', {}), ensure_ascii=False),
+            json.dumps(note.get('stats', {}), ensure_ascii=False),
+            json.dumps(media, ensure_ascii=False), note.get('created_at'))
+
+
+class PostgresBulkLoader:
+    """在一个PostgreSQL连接上分批导入，每批一个事务：COPY 到临时表，再合并到正式表"""
+
+    def __init__(self, conn, batch_size: int = 5000):
+        self.conn = conn
+        self.batch_size = batch_size
+        # 来源二创历史ID -> PostgreSQL中的ID，导入视觉故事时用来关联
+        self.history_ids = {}
+
+    def _copy(self, table: str, columns: Tuple, rows: List[Tuple]):
+        cursor = self.conn.cursor()
+        cursor.execute(STAGING_TABLES[table])
+        cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", CopyStream(rows))
+        return cursor
+
+    def _run(self, name: str, rows: Iterable, load_batch) -> Dict:
+        """分批执行 load_batch(batch) -> (新增条数, 有效条数)，统计吞吐、重复和无法导入的条数"""
+        stats = {'rows': 0, 'inserted': 0, 'duplicates': 0, 'rejected': 0, 'failed': 0}
+        started = time.perf_counter()
+        for batch in batched(rows, self.batch_size):
+            stats['rows'] += len(batch)
+            try:
+                inserted, valid = load_batch(batch)
+                self.conn.commit()
+            except Exception as e:
+                self.conn.rollback()
+                stats['failed'] += len(batch)
+                print(f"❌ {name}导入失败（本批 {len(batch)} 条）: {e}")
+                continue
+            stats['inserted'] += inserted
+            stats['duplicates'] += valid - inserted
+            stats['rejected'] += len(batch) - valid
+            elapsed = time.perf_counter() - started
+            print(f"   {name}: 已处理 {stats['rows']} 条，新增 {stats['inserted']} 条（{stats['rows'] / elapsed:.0f} 条/秒）")
+        stats['seconds'] = round(time.perf_counter() - started, 3)
+        stats['rows_per_sec'] = round(stats['rows'] / max(stats['seconds'], 1e-9), 1)
+        return stats
+
+    def sync_users(self, users: List[Dict]) -> Dict[int, int]:
+        """按用户名同步用户（已存在的不修改），返回 来源用户ID -> PostgreSQL用户ID"""
+        if not users:
+            return {}
+        cursor = self.conn.cursor()
+        cursor.executemany('''
+            INSERT INTO users (username, password_hash, email, nickname, created_at)
+            VALUES (LEFT(%s, 50), %s, LEFT(%s, 100), LEFT(%s, 100), COALESCE(%s::timestamp, CURRENT_TIMESTAMP))
+            ON CONFLICT (username) DO NOTHING
+        ''', [(u['username'], u['password_hash'], u.get('email'), u.get('nickname'), u.get('created_at'))
+              for u in users])
+        cursor.execute('SELECT id, username FROM users WHERE username = ANY(%s)',
+                       ([u['username'][:50] for u in users],))
+        ids = {username: user_id for user_id, username in cursor.fetchall()}
+        self.conn.commit()
+        return {u['id']: ids[u['username'][:50]] for u in users}
+
+    def load_notes(self, notes: Iterable[Tuple[int, Dict]]) -> Dict:
+        """导入 (用户ID, 笔记)，(user_id, note_id) 已存在的计为重复，用户ID为 None（孤立记录）的计为无法导入"""
+        def load_batch(batch):
+            rows = [note_row(user_id, note) for user_id, note in batch
+                    if user_id is not None and note.get('note_id')]
+            cursor = self._copy('bulk_notes', NOTE_COLUMNS, rows)
+            cursor.execute(NOTES_MERGE)
+            return cursor.rowcount, len(rows)
+        return self._run('笔记', notes, load_batch)
+
+    def load_recreate_history(self, records: Iterable[Tuple[int, Dict]]) -> Dict:
+        """导入 (用户ID, 二创历史)，按 original_note_id 关联该用户已导入的笔记，找不到笔记或用户ID为 None 的计为无法导入"""
+        def load_batch(batch):
+            rows = [(r.get('id'), user_id, r.get('original_note_id'), r.get('original_title'),
+                     r.get('original_content'), r.get('new_title'), r.get('new_content'), r.get('created_at'))
+                    for user_id, r in batch if user_id is not None]
+            cursor = self._copy('bulk_recreate_history', HISTORY_COLUMNS, rows)
+            cursor.execute(HISTORY_MERGE)
+            inserted = 0
+            mapped = cursor.fetchall()
+            for source_id, history_id, is_new in mapped:
+                if source_id is not None:
+                    self.history_ids[source_id] = history_id
+                inserted += 1 if is_new else 0
+            return inserted, len(mapped)
+        return self._run('二创历史', records, load_batch)
+
+    def load_visual_stories(self, stories: Iterable[Tuple[int, Dict]]) -> Dict:
+        """导入 (用户ID, 视觉故事)，history_id 必须是本次导入过的二创历史，否则（或用户ID为 None 时）计为无法导入"""
+        def load_batch(batch):
+            rows = [(user_id, self.history_ids[s['history_id']], s.get('title'), s.get('content'),
+                     to_text(s.get('cover_card_data')), to_text(s.get('content_cards_data')),
+                     s.get('html_content'), s.get('model_used'), s.get('created_at'))
+                    for user_id, s in batch if user_id is not None and s.get('history_id') in self.history_ids]
+            cursor = self._copy('bulk_visual_stories', STORY_COLUMNS, rows)
+            cursor.execute(STORIES_MERGE)
+            return cursor.rowcount, len(rows)
+        return self._run('视觉故事', stories, load_batch)
+
+    def analyze(self) -> None:
+        """大批量写入后更新统计信息，避免查询计划按导入前的表大小估算"""
+        cursor = self.conn.cursor()
+        for table in ('notes', 'recreate_history', 'visual_story_history'):
+            cursor.execute(f'ANALYZE {table}')
+        self.conn.commit()
+
+
+def iter_ndjson(path: str) -> Iterator[Dict]:
+    """逐行读取NDJSON，- 表示标准输入，跳过空行和无法解析的行"""
+    stream = sys.stdin if path == '-' else open(path, 'r', encoding='utf-8')
+    try:
+        for line_number, line in enumerate(stream, 1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                print(f"⚠️  跳过 {path} 第 {line_number} 行: {e}")
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def iter_sqlite_notes(database, batch_size: int = 1000) -> Iterator[Tuple[int, Dict]]:
+    """按ID顺序读取 database.py 的全部笔记，返回 (来源用户ID, 笔记)，结构与 get_xiaohongshu_note 的 data 一致"""
+    import sqlite3
+
+    last_id = 0
+    with database.pool.connection() as conn:
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        while True:
+            cursor.execute('''
+                SELECT n.id, n.user_id, n.note_id, n.title, n.content, n.type, n.publish_time, n.location,
+                       n.original_url, n.created_at,
+                       a.nickname AS author_nickname, a.user_id AS author_user_id, a.avatar AS author_avatar,
+                       ns.likes, ns.collects, ns.comments, ns.shares
+                FROM notes n
+                LEFT JOIN note_authors na ON n.note_id = na.note_id
+                LEFT JOIN authors a ON na.author_id = a.id
+                LEFT JOIN note_stats ns ON n.note_id = ns.note_id
+                WHERE n.id > ?
+                ORDER BY n.id
+                LIMIT ?
+            ''', (last_id, batch_size))
+            rows = cursor.fetchall()
+            if not rows:
+                return
+            # 多个用户保存同一笔记时关联表会有多行，每条笔记只取第一行
+            unique_rows = []
+            for row in rows:
+                if not unique_rows or unique_rows[-1]['id'] != row['id']:
+                    unique_rows.append(row)
+            last_id = rows[-1]['id']
+            relations = database._load_note_relations_batched(cursor, [row['note_id'] for row in unique_rows])
+
+            for row in unique_rows:
+                note_relations = relations[row['note_id']]
+                yield row['user_id'], {
+                    'note_id': row['note_id'],
+                    'title': row['title'],
+                    'content': row['content'],
+                    'type': row['type'],
+                    'author': {
+                        'nickname': row['author_nickname'],
+                        'user_id': row['author_user_id'],
+                        'avatar': row['author_avatar']
+                    },
+                    'stats': {
+                        'likes': row['likes'] or 0,
+                        'collects': row['collects'] or 0,
+                        'comments': row['comments'] or 0,
+                        'shares': row['shares'] or 0
+                    },
+                    'publish_time': row['publish_time'],
+                    'location': row['location'],
+                    'original_url': row['original_url'],
+                    'tags': note_relations['tags'],
+                    'images': note_relations['images'],
+                    'videos': note_relations['videos'],
+                    'created_at': row['created_at']
+                }
+
+
+def iter_sqlite_rows(database, query: str, batch_size: int = 1000) -> Iterator[Dict]:
+    """逐批读取查询结果，返回字典"""
+    import sqlite3
+
+    with database.pool.connection() as conn:
+        conn.row_factory = sqlite3.Row
+        cursor = conn.execute(query)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            for row in rows:
+                yield dict(row)
+
+
+def with_user(records: Iterable, user_id: int = None,
+              user_ids: Dict[int, int] = None) -> Iterator[Tuple[Optional[int], Dict]]:
+    """为记录确定目标用户：指定 user_id 时全部导入该用户，否则按来源用户ID映射
+    
+    来源用户不在映射中的记录（孤立记录）目标用户为 None，由导入方法计为无法关联。
+    """
+    missing = set()
+    for record in records:
+        if isinstance(record, tuple):
+            source_user, record = record
+        else:
+            source_user = record.get('user_id')
+        if user_id is not None:
+            yield user_id, record
+            continue
+        target = user_ids.get(source_user)
+        if target is None and source_user not in missing:
+            missing.add(source_user)
+            print(f"⚠️  来源用户 {source_user} 不存在，跳过其记录")
+        yield target, record
+
+
+def print_summary(name: str, stats: Dict) -> None:
+    print(f"📊 {name}: 读取 {stats['rows']} 条，新增 {stats['inserted']} 条，跳过重复 {stats['duplicates']} 条，"
+          f"无法关联 {stats['rejected']} 条，失败 {stats['failed']} 条，"
+          f"用时 {stats['seconds']:.1f}s（{stats['rows_per_sec']:.0f} 条/秒）")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='用 COPY 批量导入笔记和历史记录到PostgreSQL')
+    parser.add_argument('--sqlite', metavar='DB_PATH', help='database.py 生成的SQLite数据库')
+    parser.add_argument('--notes-ndjson', metavar='PATH', help='笔记NDJSON，- 表示标准输入')
+    parser.add_argument('--history-ndjson', metavar='PATH', help='二创历史NDJSON')
+    parser.add_argument('--stories-ndjson', metavar='PATH', help='视觉故事NDJSON')
+    parser.add_argument('--user-id', type=int, default=None, help='目标用户ID（PostgreSQL），导入NDJSON时必填')
+    parser.add_argument('--batch-size', type=int, default=5000, help='每批（每个事务）的行数')
+    parser.add_argument('--skip-analyze', action='store_true', help='导入后不执行 ANALYZE')
+    args = parser.parse_args()
+
+    ndjson = args.notes_ndjson or args.history_ndjson or args.stories_ndjson
+    if not (args.sqlite or ndjson):
+        parser.error('至少指定 --sqlite 或 NDJSON 文件之一')
+    if args.sqlite and ndjson:
+        parser.error('--sqlite 和 NDJSON 不能同时使用')
+    if ndjson and args.user_id is None:
+        parser.error('导入NDJSON时必须指定 --user-id')
+
+    sys.path.insert(1, os.path.join(ROOT_DIR, 'api'))
+    from _database import DatabaseManager
+
+    manager = DatabaseManager()
+    if not manager.use_postgres:
+        print("❌ 未配置PostgreSQL（DATABASE_URL），批量导入只支持PostgreSQL")
+        sys.exit(1)
+    if not manager.init_database():
+        sys.exit(1)
+
+    connection = manager.get_connection()
+    loader = PostgresBulkLoader(connection, args.batch_size)
+    started = time.perf_counter()
+    results = {}
+    try:
+        if args.sqlite:
+            from database import XiaohongshuDatabase
+
+            source = XiaohongshuDatabase(args.sqlite)
+            user_ids = None
+            if args.user_id is None:
+                users = list(iter_sqlite_rows(
+                    source, 'SELECT id, username, password_hash, email, nickname, created_at FROM users'))
+                user_ids = loader.sync_users(users)
+                print(f"👤 已同步 {len(user_ids)} 个用户")
+            results['笔记'] = loader.load_notes(with_user(iter_sqlite_notes(source), args.user_id, user_ids))
+            results['二创历史'] = loader.load_recreate_history(with_user(iter_sqlite_rows(source, '''
+                SELECT id, user_id, original_note_id, original_title, original_content, new_title, new_content,
+                       created_at
+                FROM recreate_history ORDER BY id
+            '''), args.user_id, user_ids))
+            results['视觉故事'] = loader.load_visual_stories(with_user(iter_sqlite_rows(source, '''
+                SELECT user_id, history_id, title, content, cover_card_data, content_cards_data, html_content,
+                       model_used, created_at
+                FROM visual_story_history ORDER BY id
+            '''), args.user_id, user_ids))
+        else:
+            if args.notes_ndjson:
+                results['笔记'] = loader.load_notes(with_user(iter_ndjson(args.notes_ndjson), args.user_id))
+            if args.history_ndjson:
+                results['二创历史'] = loader.load_recreate_history(
+                    with_user(iter_ndjson(args.history_ndjson), args.user_id))
+            if args.stories_ndjson:
+                results['视觉故事'] = loader.load_visual_stories(
+                    with_user(iter_ndjson(args.stories_ndjson), args.user_id))
+        if not args.skip_analyze:
+            loader.analyze()
+    finally:
+        connection.close()
+
+    for name, stats in results.items():
+        print_summary(name, stats)
+    print(f"✅ 完成，用时 {time.perf_counter() - started:.1f}s")
@@ -1,13 +1,292 @@
 import sqlite3
+import base64
 import json
 import os
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
+from migrations import migrate as migrate_schema
+
+def encode_cursor(created_at, row_id: int) -> str:
+    """将 (created_at, id) 编码为不透明的分页游标"""
+    if isinstance(created_at, datetime):
+        created_at = created_at.isoformat(sep=' ')
+    payload = json.dumps([created_at, row_id], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    """解析分页游标，返回 (created_at, id)；游标无效时抛出 ValueError"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return str(created_at), int(row_id)
+    except Exception:
+        raise ValueError('无效的分页游标')
+
+def build_cursor_page(rows: List[Tuple[Tuple, Dict]], limit: int) -> Dict:
+    """根据 limit+1 条查询结果构建游标分页数据"""
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_cursor(*rows[-1][0]) if has_more and rows else None
+    return {
+        'items': [item for _, item in rows],
+        'has_more': has_more,
+        'next_cursor': next_cursor
+    }
+
+def build_offset_page(rows: List[Tuple[Tuple, Dict]], limit: int, offset: int, total: int = None) -> Dict:
+    """根据查询结果构建偏移分页数据
+    
+    total 为精确总数时直接计算 has_more；为 None（估算模式）时 rows 应为 limit+1 条，
+    用多出的一条判断 has_more，total 为已知的下限，total_exact=False。
+    """
+    items = [item for _, item in rows[:limit]]
+    if total is None:
+        has_more = len(rows) > limit
+        return {
+            'items': items,
+            # 偏移超出范围时无法得知前面的行数，下限为0
+            'total': offset + len(items) + (1 if has_more else 0) if items else 0,
+            'total_exact': False,
+            'has_more': has_more
+        }
+    return {
+        'items': items,
+        'total': total,
+        'total_exact': True,
+        'has_more': offset + limit < total
+    }
+
+# SQLite连接配置档案，在连接池新建连接时应用
+SQLITE_PROFILES = {
+    # 保持SQLite默认设置（回滚日志模式）
+    'default': {},
+    # 生产配置：WAL模式下读写互不阻塞，写入只在检查点时同步
+    'production': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,
+        'cache_size': -65536,  # 负数单位为KiB，即64MB
+        'mmap_size': 268435456,  # 256MB
+        'temp_store': 'MEMORY',
+    },
+}
+
+def safe_int(value) -> int:
+    """安全转换为整数"""
+    if value is None or value == '':
+        return 0
+    try:
+        return int(str(value).replace(',', '').replace(' ', ''))
+    except (ValueError, TypeError):
+        return 0
+
+def apply_sqlite_pragmas(conn: sqlite3.Connection, pragmas: Dict) -> None:
+    """在连接上应用PRAGMA设置"""
+    for name, value in pragmas.items():
+        conn.execute(f'PRAGMA {name} = {value}').fetchall()
+
+class SQLiteConnectionPool:
+    """线程感知的SQLite连接池
+
+    每个工作线程优先复用自己上次归还的长连接；空闲连接不足且未达到上限时新建连接，
+    达到上限后等待其他线程归还。空闲超过 health_check_interval 秒的连接在取出时会做一次健康检查。
+    """
+    
+    def __init__(self, db_path: str, max_connections: int = None, timeout: float = 30.0,
+                 health_check_interval: float = 60.0, pragmas: Dict = None):
+        self.db_path = db_path
+        self.pragmas = pragmas or {}
+        self.max_connections = max_connections or int(os.getenv('XHS_DB_POOL_SIZE', '8'))
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        
+        self._cond = threading.Condition()
+        self._local = threading.local()
+        self._idle = []  # [(conn, last_used)]
+        self._size = 0
+        self._closed = False
+        self._stats = {
+            'checkouts': 0,
+            'reused': 0,
+            'created': 0,
+            'waits': 0,
+            'wait_time_ms': 0.0,
+            'health_check_failures': 0,
+            'discarded': 0
+        }
+    
+    def _create_connection(self) -> sqlite3.Connection:
+        """新建一个可跨线程归还的连接"""
+        conn = sqlite3.connect(self.db_path, timeout=self.timeout, check_same_thread=False)
+        apply_sqlite_pragmas(conn, self.pragmas)
+        return conn
+    
+    def _is_healthy(self, conn: sqlite3.Connection) -> bool:
+        """健康检查"""
+        try:
+            conn.execute('SELECT 1').fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+    
+    def _take_idle(self):
+        """取出空闲连接，优先取当前线程上次使用的连接（调用方需持有锁）"""
+        preferred = getattr(self._local, 'last_conn', None)
+        for index, (conn, last_used) in enumerate(self._idle):
+            if conn is preferred:
+                return self._idle.pop(index)
+        return self._idle.pop()
+    
+    def checkout(self) -> sqlite3.Connection:
+        """从连接池取出一个连接"""
+        held = getattr(self._local, 'held', None)
+        if held is not None:
+            # 同一线程内嵌套使用，直接复用正在持有的连接
+            self._local.depth += 1
+            return held
+        
+        with self._cond:
+            if self._closed:
+                raise sqlite3.ProgrammingError('连接池已关闭')
+            
+            if not self._idle and self._size >= self.max_connections:
+                self._stats['waits'] += 1
+                wait_start = time.perf_counter()
+                deadline = wait_start + self.timeout
+                while not self._idle and self._size >= self.max_connections:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        raise sqlite3.OperationalError(f'等待数据库连接超时 ({self.timeout}s)')
+                    self._cond.wait(remaining)
+                self._stats['wait_time_ms'] += (time.perf_counter() - wait_start) * 1000
+            
+            self._stats['checkouts'] += 1
+            conn = None
+            if self._idle:
+                conn, last_used = self._take_idle()
+                if time.monotonic() - last_used > self.health_check_interval and not self._is_healthy(conn):
+                    self._stats['health_check_failures'] += 1
+                    self._discard(conn)
+                    conn = None
+                else:
+                    self._stats['reused'] += 1
+            
+            if conn is None:
+                # 先占用名额，在锁外打开文件和执行PRAGMA，避免阻塞其他线程的取用和归还
+                self._size += 1
+        
+        if conn is None:
+            try:
+                conn = self._create_connection()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self._stats['created'] += 1
+        
+        self._local.held = conn
+        self._local.depth = 1
+        return conn
+    
+    def checkin(self, conn: sqlite3.Connection) -> None:
+        """归还连接到连接池"""
+        if getattr(self._local, 'held', None) is conn:
+            self._local.depth -= 1
+            if self._local.depth > 0:
+                return
+            self._local.held = None
+            self._local.last_conn = conn
+        
+        try:
+            conn.row_factory = None
+            if conn.in_transaction:
+                conn.rollback()
+            healthy = True
+        except sqlite3.Error:
+            healthy = False
+        
+        with self._cond:
+            if healthy and not self._closed:
+                self._idle.append((conn, time.monotonic()))
+            else:
+                self._discard(conn)
+            self._cond.notify()
+    
+    def _discard(self, conn: sqlite3.Connection) -> None:
+        """关闭并丢弃连接（调用方需持有锁）"""
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        self._size -= 1
+        self._stats['discarded'] += 1
+    
+    @contextmanager
+    def connection(self):
+        """以上下文管理器方式使用连接，语义与 sqlite3.connect 的 with 块一致（正常退出提交，异常回滚）
+
+        同一线程内嵌套使用时拿到的是外层连接，内层用 SAVEPOINT 包裹：异常只回滚内层的写入，
+        不会提交或回滚外层调用方尚未结束的事务
+        """
+        conn = self.checkout()
+        depth = self._local.depth
+        try:
+            if depth == 1:
+                with conn:
+                    yield conn
+            else:
+                savepoint = f'xhs_nested_{depth}'
+                conn.execute(f'SAVEPOINT {savepoint}')
+                try:
+                    yield conn
+                except BaseException:
+                    self._end_savepoint(conn, f'ROLLBACK TO SAVEPOINT {savepoint}', f'RELEASE SAVEPOINT {savepoint}')
+                    raise
+                else:
+                    self._end_savepoint(conn, f'RELEASE SAVEPOINT {savepoint}')
+        finally:
+            self.checkin(conn)
+    
+    @staticmethod
+    def _end_savepoint(conn: sqlite3.Connection, *statements: str) -> None:
+        """结束嵌套块的保存点；内层已显式 commit/rollback 时保存点随事务一起结束，忽略即可"""
+        try:
+            for statement in statements:
+                conn.execute(statement)
+        except sqlite3.OperationalError as e:
+            if 'no such savepoint' not in str(e):
+                raise
+    
+    def get_stats(self) -> Dict:
+        """获取连接池统计信息"""
+        with self._cond:
+            stats = dict(self._stats)
+            stats['wait_time_ms'] = round(stats['wait_time_ms'], 3)
+            stats['max_connections'] = self.max_connections
+            stats['open_connections'] = self._size
+            stats['idle_connections'] = len(self._idle)
+            stats['in_use_connections'] = self._size - len(self._idle)
+            stats['reuse_ratio'] = round(stats['reused'] / stats['checkouts'], 4) if stats['checkouts'] else 0.0
+        return stats
+    
+    def close_all(self) -> None:
+        """关闭所有空闲连接，正在使用的连接归还时关闭"""
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                conn, _ = self._idle.pop()
+                self._discard(conn)
+            self._cond.notify_all()
 
 class XiaohongshuDatabase:
     """小红书笔记数据库管理类 - Serverless兼容版本"""
     
-    def __init__(self, db_path: str = None):
+    def __init__(self, db_path: str = None, pool_size: int = None, profile: str = None):
         # 在Serverless环境中，使用临时目录
         if db_path is None:
             import tempfile
@@ -15,11 +294,77 @@ class XiaohongshuDatabase:
             self.db_path = os.path.join(temp_dir, "xiaohongshu_notes.db")
         else:
             self.db_path = db_path
+        
+        self.profile = profile or os.getenv('XHS_SQLITE_PROFILE', 'production')
+        if self.profile not in SQLITE_PROFILES:
+            raise ValueError(f"未知的SQLite配置档案: {self.profile}，可选: {', '.join(SQLITE_PROFILES)}")
+        
+        self.pool = SQLiteConnectionPool(self.db_path, max_connections=pool_size,
+                                         pragmas=SQLITE_PROFILES[self.profile])
+        self._maintenance_thread = None
+        self._maintenance_stop = threading.Event()
+        self.last_maintenance = None
         self.init_database()
     
+    def get_pool_stats(self) -> Dict:
+        """获取连接池统计信息"""
+        return self.pool.get_stats()
+    
+    def get_active_pragmas(self) -> Dict:
+        """获取连接上实际生效的PRAGMA设置"""
+        pragma_names = ['journal_mode', 'synchronous', 'busy_timeout', 'cache_size',
+                        'mmap_size', 'temp_store', 'foreign_keys']
+        try:
+            with self.pool.connection() as conn:
+                active = {name: conn.execute(f'PRAGMA {name}').fetchone()[0] for name in pragma_names}
+            active['profile'] = self.profile
+            active['last_maintenance'] = self.last_maintenance
+            return active
+        except Exception as e:
+            print(f"❌ 获取PRAGMA设置失败: {str(e)}")
+            return {'profile': self.profile}
+    
+    def run_maintenance(self) -> Dict:
+        """执行WAL检查点和查询优化器统计更新"""
+        try:
+            with self.pool.connection() as conn:
+                checkpoint = conn.execute('PRAGMA wal_checkpoint(PASSIVE)').fetchone()
+                conn.execute('PRAGMA optimize')
+            purged = self.purge_expired_short_links()
+            self.last_maintenance = datetime.now().isoformat()
+            # wal_checkpoint 返回 (是否被阻塞, WAL页数, 已写回页数)
+            return {
+                'success': True,
+                'busy': bool(checkpoint[0]),
+                'wal_pages': checkpoint[1],
+                'checkpointed_pages': checkpoint[2],
+                'purged_short_links': purged
+            }
+        except Exception as e:
+            print(f"❌ 数据库维护失败: {str(e)}")
+            return {'success': False, 'error': str(e)}
+    
+    def start_maintenance(self, interval: float = None) -> None:
+        """启动后台线程定期执行 run_maintenance，间隔默认取 XHS_SQLITE_MAINTENANCE_INTERVAL（秒）"""
+        if self._maintenance_thread and self._maintenance_thread.is_alive():
+            return
+        interval = interval or float(os.getenv('XHS_SQLITE_MAINTENANCE_INTERVAL', '300'))
+        
+        def loop():
+            while not self._maintenance_stop.wait(interval):
+                self.run_maintenance()
+        
+        self._maintenance_stop.clear()
+        self._maintenance_thread = threading.Thread(target=loop, name='sqlite-maintenance', daemon=True)
+        self._maintenance_thread.start()
+    
+    def stop_maintenance(self) -> None:
+        """停止后台维护线程"""
+        self._maintenance_stop.set()
+    
     def init_database(self):
         """初始化数据库和表结构"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self.pool.connection() as conn:
             cursor = conn.cursor()
             
             # 创建用户表
@@ -203,12 +548,15 @@ class XiaohongshuDatabase:
             ''')
             
             conn.commit()
+            
+            # 执行版本迁移（索引等）
+            migrate_schema(conn, 'sqlite')
             print("数据库表初始化完成")
     
     def create_user(self, username: str, password_hash: str, email: str = None, nickname: str = None) -> Optional[int]:
         """创建新用户"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.pool.connection() as conn:
                 cursor = conn.cursor()
                 
                 cursor.execute('''
@@ -244,7 +592,7 @@ class XiaohongshuDatabase:
     def get_user_by_username(self, username: str) -> Optional[Dict]:
         """根据用户名获取用户信息"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.pool.connection() as conn:
                 conn.row_factory = sqlite3.Row
                 cursor = conn.cursor()
                 
@@ -268,7 +616,7 @@ class XiaohongshuDatabase:
     def get_user_by_id(self, user_id: int) -> Optional[Dict]:
         """根据用户ID获取用户信息"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.pool.connection() as conn:
                 conn.row_factory = sqlite3.Row
                 cursor = conn.cursor()
                 
@@ -287,7 +635,7 @@ class XiaohongshuDatabase:
     def update_user(self, user_id: int, **kwargs) -> bool:
         """更新用户信息"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.pool.connection() as conn:
                 cursor = conn.cursor()
                 
                 # 构建更新字段
@@ -319,7 +667,7 @@ class XiaohongshuDatabase:
     def get_user_config(self, user_id: int, config_key: str = None) -> Dict:
         """获取用户配置"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.pool.connection() as conn:
                 conn.row_factory = sqlite3.Row
                 cursor = conn.cursor()
                 
@@ -345,7 +693,7 @@ class XiaohongshuDatabase:
     def set_user_config(self, user_id: int, config_key: str, config_value: str) -> bool:
         """设置用户配置"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.pool.connection() as conn:
                 cursor = conn.cursor()
                 
                 cursor.execute('''
@@ -372,7 +720,7 @@ class XiaohongshuDatabase:
             return False
         
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.pool.connection() as conn:
                 conn.execute('PRAGMA foreign_keys = OFF')  # Disable FK constraints to avoid migration issues
                 cursor = conn.cursor()
                 
@@ -451,15 +799,6 @@ class XiaohongshuDatabase:
                 try:
                     stats = note_data.get('stats', {})
                     
-                    def safe_int(value):
-                        """安全转换为整数"""
-                        if value is None or value == '':
-                            return 0
-                        try:
-                            return int(str(value).replace(',', '').replace(' ', ''))
-                        except (ValueError, TypeError):
-                            return 0
-                    
                     cursor.execute('''
                         INSERT OR REPLACE INTO note_stats (note_id, likes, collects, comments, shares)
                         VALUES (?, ?, ?, ?, ?)
@@ -546,106 +885,407 @@ class XiaohongshuDatabase:
             traceback.print_exc()
             return False
     
-    def get_notes_list(self, user_id: int, limit: int = 50, offset: int = 0) -> List[Dict]:
-        """获取用户的笔记列表"""
+    # IN (...) 批量查询时每批的参数个数，低于SQLite默认的999个变量上限
+    RELATION_BATCH_SIZE = 500
+    
+    def save_notes_bulk(self, user_id: int, notes: List[Dict]) -> Dict:
+        """批量保存笔记，所有写入在同一事务中通过 executemany 完成
+        
+        返回汇总数量以及按输入顺序排列的每条笔记结果，status 为 inserted / duplicate / failed。
+        """
+        results = [{'note_id': (note or {}).get('note_id') if isinstance(note, dict) else None, 'status': None}
+                   for note in notes]
+        summary = {'inserted': 0, 'duplicate': 0, 'failed': 0, 'results': results}
+        
+        def finish():
+            for result in results:
+                summary[result['status']] += 1
+            print(f"批量保存笔记完成 (用户: {user_id}): 新增 {summary['inserted']}, "
+                  f"重复 {summary['duplicate']}, 失败 {summary['failed']}")
+            return summary
+        
+        def fail(index, error):
+            results[index]['status'] = 'failed'
+            results[index]['error'] = error
+        
+        if not user_id or not isinstance(user_id, int):
+            for index in range(len(notes)):
+                fail(index, f'Invalid user_id: {user_id}')
+            return finish()
+        
+        # 1. 校验数据并去除批次内重复
+        candidates = {}
+        for index, note_data in enumerate(notes):
+            if not isinstance(note_data, dict) or not note_data.get('note_id'):
+                fail(index, 'missing note_id')
+            elif note_data['note_id'] in candidates:
+                results[index]['status'] = 'duplicate'
+            else:
+                candidates[note_data['note_id']] = index
+        
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
+            with self.pool.connection() as conn:
                 cursor = conn.cursor()
                 
-                query = '''
-                    SELECT 
-                        n.note_id,
-                        n.title,
-                        n.content,
-                        n.type,
-                        n.publish_time,
-                        n.location,
-                        n.created_at,
-                        a.nickname as author_nickname,
-                        a.user_id as author_user_id,
-                        a.avatar as author_avatar,
-                        ns.likes,
-                        ns.collects,
-                        ns.comments,
-                        ns.shares
-                    FROM notes n
-                    LEFT JOIN note_authors na ON n.note_id = na.note_id
-                    LEFT JOIN authors a ON na.author_id = a.id
-                    LEFT JOIN note_stats ns ON n.note_id = ns.note_id
-                    WHERE n.user_id = ?
-                    ORDER BY n.created_at DESC
-                    LIMIT ? OFFSET ?
-                '''
-                
-                cursor.execute(query, (user_id, limit, offset))
-                notes = cursor.fetchall()
-                
-                result = []
-                for note in notes:
-                    note_dict = dict(note)
-                    note_id = note_dict['note_id']
-                    
-                    # 获取标签
-                    cursor.execute('''
-                        SELECT t.name FROM tags t
-                        JOIN note_tags nt ON t.id = nt.tag_id
-                        WHERE nt.note_id = ?
-                    ''', (note_id,))
-                    tags = [row[0] for row in cursor.fetchall()]
-                    
-                    # 获取图片
-                    cursor.execute('''
-                        SELECT image_url FROM note_images
-                        WHERE note_id = ?
-                        ORDER BY image_order
-                    ''', (note_id,))
-                    images = [row[0] for row in cursor.fetchall()]
-                    
-                    # 获取视频
-                    cursor.execute('''
-                        SELECT video_url FROM note_videos
-                        WHERE note_id = ?
-                        ORDER BY video_order
-                    ''', (note_id,))
-                    videos = [row[0] for row in cursor.fetchall()]
-                    
-                    # 组装数据
-                    formatted_note = {
-                        'note_id': note_dict['note_id'],
-                        'title': note_dict['title'],
-                        'content': note_dict['content'],
-                        'type': note_dict['type'],
-                        'author': {
-                            'nickname': note_dict['author_nickname'],
-                            'user_id': note_dict['author_user_id'],
-                            'avatar': note_dict['author_avatar']
-                        },
-                        'stats': {
-                            'likes': note_dict['likes'] or 0,
-                            'collects': note_dict['collects'] or 0,
-                            'comments': note_dict['comments'] or 0,
-                            'shares': note_dict['shares'] or 0
-                        },
-                        'publish_time': note_dict['publish_time'],
-                        'location': note_dict['location'],
-                        'tags': tags,
-                        'images': images,
-                        'videos': videos,
-                        'created_at': note_dict['created_at']
-                    }
-                    result.append(formatted_note)
-                
-                return result
-                
+                # 2. 验证用户存在
+                cursor.execute("SELECT id FROM users WHERE id = ? AND is_active = 1", (user_id,))
+                if not cursor.fetchone():
+                    for index in candidates.values():
+                        fail(index, f'User {user_id} not found or inactive')
+                    return finish()
+                
+                # 3. 一次性查出已存在的笔记
+                existing = set()
+                candidate_ids = list(candidates)
+                for start in range(0, len(candidate_ids), self.RELATION_BATCH_SIZE):
+                    batch = candidate_ids[start:start + self.RELATION_BATCH_SIZE]
+                    cursor.execute(f'''
+                        SELECT note_id FROM notes WHERE user_id = ? AND note_id IN ({','.join('?' * len(batch))})
+                    ''', [user_id] + batch)
+                    existing.update(row[0] for row in cursor.fetchall())
+                
+                new_notes = []
+                for note_id, index in candidates.items():
+                    if note_id in existing:
+                        results[index]['status'] = 'duplicate'
+                    else:
+                        new_notes.append(notes[index])
+                
+                if not new_notes:
+                    return finish()
+                
+                # 4. 笔记主信息，再写入作者、互动数据、标签、图片和视频
+                cursor.executemany('''
+                    INSERT INTO notes (user_id, note_id, title, content, type, publish_time, location, original_url)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ''', [(
+                    user_id,
+                    note_data['note_id'],
+                    note_data.get('title', ''),
+                    note_data.get('content', ''),
+                    note_data.get('type', ''),
+                    note_data.get('publish_time', ''),
+                    note_data.get('location', ''),
+                    note_data.get('original_url', '')
+                ) for note_data in new_notes])
+                self._write_note_relations(cursor, new_notes)
+                
+                for note_data in new_notes:
+                    results[candidates[note_data['note_id']]]['status'] = 'inserted'
+            
+        except Exception as e:
+            # 事务已回滚，本批次尚未确定结果的笔记全部标记为失败
+            print(f"❌ 批量保存笔记失败: {str(e)}")
+            for result in results:
+                if result['status'] in (None, 'inserted'):
+                    result['status'] = 'failed'
+                    result['error'] = str(e)
+        
+        return finish()
+    
+    def _write_note_relations(self, cursor, notes: List[Dict], replace: bool = False) -> None:
+        """批量写入笔记的作者（upsert）、作者关系、互动数据、标签、图片和视频
+        
+        save_notes_bulk 和 refresh_notes_content 共用；replace=True 时先删除这些笔记已有的关联数据。
+        """
+        # 作者：upsert 保留已有作者ID，再批量查出ID。authors.user_id 是TEXT列，数字ID存入后按字符串返回，
+        # 写入和查找都统一用 str 作为键
+        authors = {}
+        for note_data in notes:
+            author_data = note_data.get('author') or {}
+            author_user_id = str(author_data.get('user_id') or f"unknown_{note_data['note_id']}")
+            authors[author_user_id] = (author_user_id, author_data.get('nickname') or '未知用户',
+                                       author_data.get('avatar') or '')
+        cursor.executemany('''
+            INSERT INTO authors (user_id, nickname, avatar) VALUES (?, ?, ?)
+            ON CONFLICT(user_id) DO UPDATE SET
+                nickname = excluded.nickname,
+                avatar = excluded.avatar,
+                updated_at = CURRENT_TIMESTAMP
+        ''', list(authors.values()))
+        
+        author_ids = {}
+        author_keys = list(authors)
+        for start in range(0, len(author_keys), self.RELATION_BATCH_SIZE):
+            batch = author_keys[start:start + self.RELATION_BATCH_SIZE]
+            cursor.execute(f"SELECT user_id, id FROM authors WHERE user_id IN ({','.join('?' * len(batch))})",
+                           batch)
+            author_ids.update(cursor.fetchall())
+        
+        if replace:
+            for table in ('note_authors', 'note_stats', 'note_tags', 'note_images', 'note_videos'):
+                cursor.executemany(f"DELETE FROM {table} WHERE note_id = ?",
+                                   [(note_data['note_id'],) for note_data in notes])
+        
+        # 作者关系和互动数据
+        note_author_rows, stats_rows = [], []
+        tag_rows, image_rows, video_rows = [], [], []
+        for note_data in notes:
+            note_id = note_data['note_id']
+            author_user_id = str((note_data.get('author') or {}).get('user_id') or f"unknown_{note_id}")
+            note_author_rows.append((note_id, author_ids[author_user_id]))
+            
+            stats = note_data.get('stats') or {}
+            stats_rows.append((
+                note_id,
+                safe_int(stats.get('likes', 0)),
+                safe_int(stats.get('collects', 0)),
+                safe_int(stats.get('comments', 0)),
+                safe_int(stats.get('shares', 0))
+            ))
+            
+            tags = note_data.get('tags') or []
+            if isinstance(tags, list):
+                tag_rows.extend((note_id, tag.strip()) for tag in tags
+                                if isinstance(tag, str) and tag.strip())
+            
+            images = note_data.get('images') or []
+            if isinstance(images, list):
+                image_rows.extend((note_id, url.strip(), i) for i, url in enumerate(images)
+                                  if isinstance(url, str) and url.strip())
+            
+            videos = note_data.get('videos') or []
+            if isinstance(videos, list):
+                video_rows.extend((note_id, url.strip(), i) for i, url in enumerate(videos)
+                                  if isinstance(url, str) and url.strip())
+        
+        cursor.executemany("INSERT OR IGNORE INTO note_authors (note_id, author_id) VALUES (?, ?)",
+                           note_author_rows)
+        cursor.executemany('''
+            INSERT INTO note_stats (note_id, likes, collects, comments, shares)
+            VALUES (?, ?, ?, ?, ?)
+        ''', stats_rows)
+        
+        # 标签：先批量插入标签名，再按名称集合一次查出ID
+        tag_names = list({name for _, name in tag_rows})
+        cursor.executemany("INSERT OR IGNORE INTO tags (name) VALUES (?)", [(name,) for name in tag_names])
+        tag_ids = {}
+        for start in range(0, len(tag_names), self.RELATION_BATCH_SIZE):
+            batch = tag_names[start:start + self.RELATION_BATCH_SIZE]
+            cursor.execute(f"SELECT name, id FROM tags WHERE name IN ({','.join('?' * len(batch))})", batch)
+            tag_ids.update(cursor.fetchall())
+        cursor.executemany("INSERT OR IGNORE INTO note_tags (note_id, tag_id) VALUES (?, ?)",
+                           [(note_id, tag_ids[name]) for note_id, name in tag_rows])
+        
+        # 图片和视频
+        cursor.executemany('''
+            INSERT OR IGNORE INTO note_images (note_id, image_url, image_order) VALUES (?, ?, ?)
+        ''', image_rows)
+        cursor.executemany('''
+            INSERT OR IGNORE INTO note_videos (note_id, video_url, video_order) VALUES (?, ?, ?)
+        ''', video_rows)
+    
+    def _load_note_relations_batched(self, cursor, note_ids: List[str]) -> Dict[str, Dict[str, List[str]]]:
+        """按批次一次性加载多条笔记的标签、图片和视频，查询次数与笔记数量无关"""
+        relations = {note_id: {'tags': [], 'images': [], 'videos': []} for note_id in note_ids}
+        unique_ids = list(relations.keys())
+        
+        for start in range(0, len(unique_ids), self.RELATION_BATCH_SIZE):
+            batch = unique_ids[start:start + self.RELATION_BATCH_SIZE]
+            placeholders = ','.join('?' * len(batch))
+            
+            # 获取标签
+            cursor.execute(f'''
+                SELECT nt.note_id, t.name FROM note_tags nt
+                JOIN tags t ON t.id = nt.tag_id
+                WHERE nt.note_id IN ({placeholders})
+                ORDER BY nt.note_id, nt.tag_id
+            ''', batch)
+            for note_id, name in cursor.fetchall():
+                relations[note_id]['tags'].append(name)
+            
+            # 获取图片
+            cursor.execute(f'''
+                SELECT note_id, image_url FROM note_images
+                WHERE note_id IN ({placeholders})
+                ORDER BY note_id, image_order, id
+            ''', batch)
+            for note_id, image_url in cursor.fetchall():
+                relations[note_id]['images'].append(image_url)
+            
+            # 获取视频
+            cursor.execute(f'''
+                SELECT note_id, video_url FROM note_videos
+                WHERE note_id IN ({placeholders})
+                ORDER BY note_id, video_order, id
+            ''', batch)
+            for note_id, video_url in cursor.fetchall():
+                relations[note_id]['videos'].append(video_url)
+        
+        return relations
+    
+    def _load_note_relations_per_note(self, cursor, note_ids: List[str]) -> Dict[str, Dict[str, List[str]]]:
+        """逐条笔记加载标签、图片和视频（每条笔记3次查询，保留用于对比测试）"""
+        relations = {}
+        for note_id in note_ids:
+            if note_id in relations:
+                continue
+            
+            # 获取标签
+            cursor.execute('''
+                SELECT t.name FROM tags t
+                JOIN note_tags nt ON t.id = nt.tag_id
+                WHERE nt.note_id = ?
+            ''', (note_id,))
+            tags = [row[0] for row in cursor.fetchall()]
+            
+            # 获取图片
+            cursor.execute('''
+                SELECT image_url FROM note_images
+                WHERE note_id = ?
+                ORDER BY image_order
+            ''', (note_id,))
+            images = [row[0] for row in cursor.fetchall()]
+            
+            # 获取视频
+            cursor.execute('''
+                SELECT video_url FROM note_videos
+                WHERE note_id = ?
+                ORDER BY video_order
+            ''', (note_id,))
+            videos = [row[0] for row in cursor.fetchall()]
+            
+            relations[note_id] = {'tags': tags, 'images': images, 'videos': videos}
+        return relations
+    
+    def _offset_page(self, fetch, count, user_id: int, limit: int, offset: int, exact_total: bool) -> Dict:
+        """列表和总数一次查询完成；页面为空（偏移超出范围）时才单独统计总数"""
+        if not exact_total:
+            return build_offset_page(fetch(user_id, limit + 1, offset), limit, offset)
+        rows, total = fetch(user_id, limit, offset, with_total=True)
+        if total is None:
+            total = count(user_id) if offset > 0 else 0
+        return build_offset_page(rows, limit, offset, total)
+    
+    def _fetch_notes(self, user_id: int, limit: int, offset: int = 0, after: Tuple = None,
+                     batched: bool = True, with_total: bool = False):
+        """查询一页笔记，返回 [((created_at, id), 笔记数据)]；after 为 (created_at, id) 时按游标向后翻页
+        
+        with_total=True 时在同一条SQL中用标量子查询统计总数，返回 (结果, 总数)，没有返回行时总数为 None。
+        """
+        with self.pool.connection() as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            
+            keyset_clause = ''
+            total_clause = ', (SELECT COUNT(*) FROM notes WHERE user_id = ?) AS total_count' if with_total else ''
+            params = [user_id] * (2 if with_total else 1)
+            if after is not None:
+                keyset_clause = 'AND (n.created_at < ? OR (n.created_at = ? AND n.id < ?))'
+                params.extend([after[0], after[0], after[1]])
+            params.extend([limit, offset])
+            
+            query = f'''
+                SELECT 
+                    n.id,
+                    n.note_id,
+                    n.title,
+                    n.content,
+                    n.type,
+                    n.publish_time,
+                    n.location,
+                    n.created_at,
+                    a.nickname as author_nickname,
+                    a.user_id as author_user_id,
+                    a.avatar as author_avatar,
+                    ns.likes,
+                    ns.collects,
+                    ns.comments,
+                    ns.shares
+                    {total_clause}
+                FROM notes n
+                LEFT JOIN note_authors na ON n.note_id = na.note_id
+                LEFT JOIN authors a ON na.author_id = a.id
+                LEFT JOIN note_stats ns ON n.note_id = ns.note_id
+                WHERE n.user_id = ? {keyset_clause}
+                ORDER BY n.created_at DESC, n.id DESC
+                LIMIT ? OFFSET ?
+            '''
+            
+            cursor.execute(query, params)
+            notes = cursor.fetchall()
+            
+            note_ids = [note['note_id'] for note in notes]
+            if batched:
+                relations = self._load_note_relations_batched(cursor, note_ids)
+            else:
+                relations = self._load_note_relations_per_note(cursor, note_ids)
+            
+            result = []
+            for note in notes:
+                note_dict = dict(note)
+                note_relations = relations[note_dict['note_id']]
+                
+                # 组装数据
+                formatted_note = {
+                    'note_id': note_dict['note_id'],
+                    'title': note_dict['title'],
+                    'content': note_dict['content'],
+                    'type': note_dict['type'],
+                    'author': {
+                        'nickname': note_dict['author_nickname'],
+                        'user_id': note_dict['author_user_id'],
+                        'avatar': note_dict['author_avatar']
+                    },
+                    'stats': {
+                        'likes': note_dict['likes'] or 0,
+                        'collects': note_dict['collects'] or 0,
+                        'comments': note_dict['comments'] or 0,
+                        'shares': note_dict['shares'] or 0
+                    },
+                    'publish_time': note_dict['publish_time'],
+                    'location': note_dict['location'],
+                    'tags': list(note_relations['tags']),
+                    'images': list(note_relations['images']),
+                    'videos': list(note_relations['videos']),
+                    'created_at': note_dict['created_at']
+                }
+                result.append(((note_dict['created_at'], note_dict['id']), formatted_note))
+            
+            if with_total:
+                return result, (notes[0]['total_count'] if notes else None)
+            return result
+    
+    def get_notes_list(self, user_id: int, limit: int = 50, offset: int = 0, batched: bool = True) -> List[Dict]:
+        """获取用户的笔记列表
+        
+        batched=True 时标签、图片、视频按整页批量加载（固定4次查询），
+        batched=False 时沿用逐条笔记查询的方式（1 + 3N 次查询）。
+        """
+        try:
+            return [note for _, note in self._fetch_notes(user_id, limit, offset, batched=batched)]
         except Exception as e:
             print(f"❌ 获取笔记列表失败: {str(e)}")
             return []
     
+    def get_notes_page(self, user_id: int, limit: int = 50, cursor: str = None) -> Dict:
+        """按游标获取用户的笔记列表，多取一条判断 has_more，不需要 COUNT(*)
+        
+        cursor 无效时抛出 ValueError，由调用方返回 400。
+        """
+        after = decode_cursor(cursor) if cursor else None
+        try:
+            rows = self._fetch_notes(user_id, limit + 1, after=after)
+        except Exception as e:
+            print(f"❌ 获取笔记列表失败: {str(e)}")
+            rows = []
+        return build_cursor_page(rows, limit)
+    
+    def get_notes_with_total(self, user_id: int, limit: int = 50, offset: int = 0, exact_total: bool = True) -> Dict:
+        """获取一页笔记和总数，一次查询完成
+        
+        exact_total=False 时不统计总数，只判断 has_more（见 build_offset_page）。
+        """
+        try:
+            return self._offset_page(self._fetch_notes, self.get_notes_count, user_id, limit, offset, exact_total)
+        except Exception as e:
+            print(f"❌ 获取笔记列表失败: {str(e)}")
+            return build_offset_page([], limit, offset, 0)
+    
     def get_notes_count(self, user_id: int = None) -> int:
         """获取笔记总数"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.pool.connection() as conn:
                 cursor = conn.cursor()
                 if user_id:
                     cursor.execute("SELECT COUNT(*) FROM notes WHERE user_id = ?", (user_id,))
@@ -659,7 +1299,7 @@ class XiaohongshuDatabase:
     def delete_note(self, user_id: int, note_id: str) -> bool:
         """删除用户的笔记"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.pool.connection() as conn:
                 cursor = conn.cursor()
                 
                 # 验证笔记属于该用户
@@ -687,7 +1327,7 @@ class XiaohongshuDatabase:
     def save_recreate_history(self, user_id: int, history_data: Dict) -> bool:
         """保存用户的二创历史记录"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.pool.connection() as conn:
                 cursor = conn.cursor()
                 
                 cursor.execute('''
@@ -711,61 +1351,96 @@ class XiaohongshuDatabase:
             print(f"❌ 保存二创历史失败: {str(e)}")
             return False
     
+    def _fetch_recreate_history(self, user_id: int, limit: int, offset: int = 0,
+                                after: Tuple = None, with_total: bool = False):
+        """查询一页二创历史，返回 [((created_at, id), 历史记录)]；with_total 同 _fetch_notes"""
+        with self.pool.connection() as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            
+            keyset_clause = ''
+            total_clause = ', (SELECT COUNT(*) FROM recreate_history WHERE user_id = ?) AS total_count' if with_total else ''
+            params = [user_id] * (2 if with_total else 1)
+            if after is not None:
+                keyset_clause = 'AND (rh.created_at < ? OR (rh.created_at = ? AND rh.id < ?))'
+                params.extend([after[0], after[0], after[1]])
+            params.extend([limit, offset])
+            
+            query = f'''
+                SELECT 
+                    rh.id,
+                    rh.original_note_id,
+                    rh.original_title,
+                    rh.original_content,
+                    rh.new_title,
+                    rh.new_content,
+                    rh.created_at,
+                    n.title as note_title,
+                    a.nickname as author_nickname
+                    {total_clause}
+                FROM recreate_history rh
+                LEFT JOIN notes n ON rh.original_note_id = n.note_id AND n.user_id = rh.user_id
+                LEFT JOIN note_authors na ON n.note_id = na.note_id
+                LEFT JOIN authors a ON na.author_id = a.id
+                WHERE rh.user_id = ? {keyset_clause}
+                ORDER BY rh.created_at DESC, rh.id DESC
+                LIMIT ? OFFSET ?
+            '''
+            
+            cursor.execute(query, params)
+            history_records = cursor.fetchall()
+            
+            result = []
+            for record in history_records:
+                history_dict = {
+                    'id': record['id'],
+                    'original_note_id': record['original_note_id'],
+                    'original_title': record['original_title'],
+                    'original_content': record['original_content'],
+                    'new_title': record['new_title'],
+                    'new_content': record['new_content'],
+                    'created_at': record['created_at'],
+                    'note_title': record['note_title'],
+                    'author_nickname': record['author_nickname']
+                }
+                result.append(((record['created_at'], record['id']), history_dict))
+            
+            if with_total:
+                return result, (history_records[0]['total_count'] if history_records else None)
+            return result
+    
     def get_recreate_history(self, user_id: int, limit: int = 50, offset: int = 0) -> List[Dict]:
         """获取用户的二创历史列表"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
-                cursor = conn.cursor()
-                
-                query = '''
-                    SELECT 
-                        rh.id,
-                        rh.original_note_id,
-                        rh.original_title,
-                        rh.original_content,
-                        rh.new_title,
-                        rh.new_content,
-                        rh.created_at,
-                        n.title as note_title,
-                        a.nickname as author_nickname
-                    FROM recreate_history rh
-                    LEFT JOIN notes n ON rh.original_note_id = n.note_id AND n.user_id = rh.user_id
-                    LEFT JOIN note_authors na ON n.note_id = na.note_id
-                    LEFT JOIN authors a ON na.author_id = a.id
-                    WHERE rh.user_id = ?
-                    ORDER BY rh.created_at DESC
-                    LIMIT ? OFFSET ?
-                '''
-                
-                cursor.execute(query, (user_id, limit, offset))
-                history_records = cursor.fetchall()
-                
-                result = []
-                for record in history_records:
-                    history_dict = {
-                        'id': record['id'],
-                        'original_note_id': record['original_note_id'],
-                        'original_title': record['original_title'],
-                        'original_content': record['original_content'],
-                        'new_title': record['new_title'],
-                        'new_content': record['new_content'],
-                        'created_at': record['created_at'],
-                        'note_title': record['note_title'],
-                        'author_nickname': record['author_nickname']
-                    }
-                    result.append(history_dict)
-                
-                return result
-                
+            return [record for _, record in self._fetch_recreate_history(user_id, limit, offset)]
         except Exception as e:
             print(f"❌ 获取二创历史失败: {str(e)}")
             return []
     
+    def get_recreate_history_page(self, user_id: int, limit: int = 50, cursor: str = None) -> Dict:
+        """按游标获取用户的二创历史列表，cursor 无效时抛出 ValueError"""
+        after = decode_cursor(cursor) if cursor else None
+        try:
+            rows = self._fetch_recreate_history(user_id, limit + 1, after=after)
+        except Exception as e:
+            print(f"❌ 获取二创历史失败: {str(e)}")
+            rows = []
+        return build_cursor_page(rows, limit)
+    
+    def get_recreate_history_with_total(self, user_id: int, limit: int = 50, offset: int = 0,
+                                        exact_total: bool = True) -> Dict:
+        """获取一页二创历史和总数，一次查询完成，exact_total 同 get_notes_with_total"""
+        try:
+            return self._offset_page(self._fetch_recreate_history, self.get_recreate_history_count,
+                                     user_id, limit, offset, exact_total)
+        except Exception as e:
+            print(f"❌ 获取二创历史失败: {str(e)}")
+            return build_offset_page([], limit, offset, 0)
+    
     def get_recreate_history_count(self, user_id: int) -> int:
         """获取用户的二创历史总数"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.pool.connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute("SELECT COUNT(*) FROM recreate_history WHERE user_id = ?", (user_id,))
                 return cursor.fetchone()[0]
@@ -776,7 +1451,7 @@ class XiaohongshuDatabase:
     def delete_recreate_history(self, user_id: int, history_id: int) -> bool:
         """删除用户的二创历史记录"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.pool.connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute("DELETE FROM recreate_history WHERE user_id = ? AND id = ?", (user_id, history_id))
                 if cursor.rowcount > 0:
@@ -794,7 +1469,7 @@ class XiaohongshuDatabase:
     def save_visual_story_history(self, user_id: int, history_data: Dict) -> bool:
         """保存用户的视觉故事历史记录"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.pool.connection() as conn:
                 cursor = conn.cursor()
                 
                 cursor.execute('''
@@ -822,55 +1497,90 @@ class XiaohongshuDatabase:
             print(f"❌ 保存视觉故事历史失败: {str(e)}")
             return False
     
+    def _fetch_visual_story_history(self, user_id: int, limit: int, offset: int = 0,
+                                    after: Tuple = None, with_total: bool = False):
+        """查询一页视觉故事历史，返回 [((created_at, id), 历史记录)]；with_total 同 _fetch_notes"""
+        with self.pool.connection() as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            
+            keyset_clause = ''
+            total_clause = ', (SELECT COUNT(*) FROM visual_story_history WHERE user_id = ?) AS total_count' if with_total else ''
+            params = [user_id] * (2 if with_total else 1)
+            if after is not None:
+                keyset_clause = 'AND (vs.created_at < ? OR (vs.created_at = ? AND vs.id < ?))'
+                params.extend([after[0], after[0], after[1]])
+            params.extend([limit, offset])
+            
+            query = f'''
+                SELECT 
+                    vs.id,
+                    vs.history_id,
+                    vs.title,
+                    vs.content,
+                    vs.model_used,
+                    vs.created_at,
+                    rh.new_title as source_title
+                    {total_clause}
+                FROM visual_story_history vs
+                LEFT JOIN recreate_history rh ON vs.history_id = rh.id AND rh.user_id = vs.user_id
+                WHERE vs.user_id = ? {keyset_clause}
+                ORDER BY vs.created_at DESC, vs.id DESC
+                LIMIT ? OFFSET ?
+            '''
+            
+            cursor.execute(query, params)
+            history_records = cursor.fetchall()
+            
+            result = []
+            for record in history_records:
+                history_dict = {
+                    'id': record['id'],
+                    'history_id': record['history_id'],
+                    'title': record['title'],
+                    'content': record['content'][:200] + '...' if len(record['content']) > 200 else record['content'],
+                    'model_used': record['model_used'],
+                    'created_at': record['created_at'],
+                    'source_title': record['source_title']
+                }
+                result.append(((record['created_at'], record['id']), history_dict))
+            
+            if with_total:
+                return result, (history_records[0]['total_count'] if history_records else None)
+            return result
+    
     def get_visual_story_history(self, user_id: int, limit: int = 50, offset: int = 0) -> List[Dict]:
         """获取用户的视觉故事历史列表"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
-                cursor = conn.cursor()
-                
-                query = '''
-                    SELECT 
-                        vs.id,
-                        vs.history_id,
-                        vs.title,
-                        vs.content,
-                        vs.model_used,
-                        vs.created_at,
-                        rh.new_title as source_title
-                    FROM visual_story_history vs
-                    LEFT JOIN recreate_history rh ON vs.history_id = rh.id AND rh.user_id = vs.user_id
-                    WHERE vs.user_id = ?
-                    ORDER BY vs.created_at DESC
-                    LIMIT ? OFFSET ?
-                '''
-                
-                cursor.execute(query, (user_id, limit, offset))
-                history_records = cursor.fetchall()
-                
-                result = []
-                for record in history_records:
-                    history_dict = {
-                        'id': record['id'],
-                        'history_id': record['history_id'],
-                        'title': record['title'],
-                        'content': record['content'][:200] + '...' if len(record['content']) > 200 else record['content'],
-                        'model_used': record['model_used'],
-                        'created_at': record['created_at'],
-                        'source_title': record['source_title']
-                    }
-                    result.append(history_dict)
-                
-                return result
-                
+            return [record for _, record in self._fetch_visual_story_history(user_id, limit, offset)]
         except Exception as e:
             print(f"❌ 获取视觉故事历史失败: {str(e)}")
             return []
     
+    def get_visual_story_history_page(self, user_id: int, limit: int = 50, cursor: str = None) -> Dict:
+        """按游标获取用户的视觉故事历史列表，cursor 无效时抛出 ValueError"""
+        after = decode_cursor(cursor) if cursor else None
+        try:
+            rows = self._fetch_visual_story_history(user_id, limit + 1, after=after)
+        except Exception as e:
+            print(f"❌ 获取视觉故事历史失败: {str(e)}")
+            rows = []
+        return build_cursor_page(rows, limit)
+    
+    def get_visual_story_history_with_total(self, user_id: int, limit: int = 50, offset: int = 0,
+                                            exact_total: bool = True) -> Dict:
+        """获取一页视觉故事历史和总数，一次查询完成，exact_total 同 get_notes_with_total"""
+        try:
+            return self._offset_page(self._fetch_visual_story_history, self.get_visual_story_history_count,
+                                     user_id, limit, offset, exact_total)
+        except Exception as e:
+            print(f"❌ 获取视觉故事历史失败: {str(e)}")
+            return build_offset_page([], limit, offset, 0)
+    
     def get_visual_story_history_count(self, user_id: int) -> int:
         """获取用户的视觉故事历史总数"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.pool.connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute("SELECT COUNT(*) FROM visual_story_history WHERE user_id = ?", (user_id,))
                 return cursor.fetchone()[0]
@@ -881,7 +1591,7 @@ class XiaohongshuDatabase:
     def delete_visual_story_history(self, user_id: int, story_id: int) -> bool:
         """删除用户的视觉故事历史记录"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.pool.connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute("DELETE FROM visual_story_history WHERE user_id = ? AND id = ?", (user_id, story_id))
                 if cursor.rowcount > 0:
@@ -899,7 +1609,7 @@ class XiaohongshuDatabase:
     def get_user_usage_count(self, user_id: int, usage_type: str) -> int:
         """获取用户使用次数"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.pool.connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute("SELECT usage_count FROM user_usage WHERE user_id = ? AND usage_type = ?", (user_id, usage_type))
                 result = cursor.fetchone()
@@ -911,7 +1621,7 @@ class XiaohongshuDatabase:
     def verify_database_state(self) -> Dict:
         """验证数据库状态和统计信息"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.pool.connection() as conn:
                 cursor = conn.cursor()
                 
                 # 获取用户统计
@@ -956,7 +1666,7 @@ class XiaohongshuDatabase:
     def increment_user_usage(self, user_id: int, usage_type: str) -> bool:
         """增加用户使用次数"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.pool.connection() as conn:
                 cursor = conn.cursor()
                 
                 # 使用INSERT OR REPLACE来处理计数器递增
@@ -971,6 +1681,169 @@ class XiaohongshuDatabase:
         except Exception as e:
             print(f"❌ 增加用户使用次数失败: {str(e)}")
             return False
+    
+    def get_short_link(self, short_url: str) -> Optional[Dict]:
+        """获取未过期的短链接解析结果"""
+        try:
+            with self.pool.connection() as conn:
+                conn.row_factory = sqlite3.Row
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT short_url, resolved_url, note_id, xsec_token, expires_at
+                    FROM short_links WHERE short_url = ? AND expires_at > ?
+                ''', (short_url, int(time.time())))
+                row = cursor.fetchone()
+                return dict(row) if row else None
+        except Exception as e:
+            print(f"❌ 获取短链接缓存失败: {str(e)}")
+            return None
+    
+    def save_short_link(self, short_url: str, resolved_url: str, note_id: str, xsec_token: str, expires_at: int) -> bool:
+        """保存短链接解析结果，已存在时覆盖"""
+        try:
+            with self.pool.connection() as conn:
+                conn.execute('''
+                    INSERT INTO short_links (short_url, resolved_url, note_id, xsec_token, expires_at)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT (short_url) DO UPDATE SET
+                        resolved_url = excluded.resolved_url,
+                        note_id = excluded.note_id,
+                        xsec_token = excluded.xsec_token,
+                        expires_at = excluded.expires_at
+                ''', (short_url, resolved_url, note_id, xsec_token, int(expires_at)))
+                return True
+        except Exception as e:
+            print(f"❌ 保存短链接缓存失败: {str(e)}")
+            return False
+    
+    def get_cached_note(self, note_id: str) -> Optional[Dict]:
+        """获取笔记缓存，返回 {'data': 笔记数据, 'fetched_at': 采集时间戳}"""
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('SELECT data, fetched_at FROM note_cache WHERE note_id = ?', (note_id,))
+                row = cursor.fetchone()
+                if not row:
+                    return None
+                return {'data': json.loads(row[0]), 'fetched_at': row[1]}
+        except Exception as e:
+            print(f"❌ 获取笔记缓存失败: {str(e)}")
+            return None
+    
+    def save_cached_note(self, note_id: str, data: Dict, fetched_at: int) -> bool:
+        """保存笔记缓存，已存在时覆盖"""
+        try:
+            with self.pool.connection() as conn:
+                conn.execute('''
+                    INSERT INTO note_cache (note_id, data, fetched_at) VALUES (?, ?, ?)
+                    ON CONFLICT (note_id) DO UPDATE SET data = excluded.data, fetched_at = excluded.fetched_at
+                ''', (note_id, json.dumps(data, ensure_ascii=False), int(fetched_at)))
+                return True
+        except Exception as e:
+            print(f"❌ 保存笔记缓存失败: {str(e)}")
+            return False
+    
+    def save_raw_state(self, note_id: str, payload: bytes, extractor_version: int) -> bool:
+        """保存笔记原始状态归档（压缩后的 noteDetailMap[note_id] 子树），已存在时覆盖"""
+        try:
+            with self.pool.connection() as conn:
+                conn.execute('''
+                    INSERT INTO raw_note_states (note_id, payload, extractor_version) VALUES (?, ?, ?)
+                    ON CONFLICT (note_id) DO UPDATE SET
+                        payload = excluded.payload,
+                        extractor_version = excluded.extractor_version,
+                        fetched_at = CURRENT_TIMESTAMP
+                ''', (note_id, sqlite3.Binary(payload), extractor_version))
+                return True
+        except Exception as e:
+            print(f"❌ 保存原始状态归档失败: {str(e)}")
+            return False
+    
+    def iter_raw_states(self, below_version: int = None, batch_size: int = 200):
+        """按 note_id 顺序分批读取归档，每批为 [(note_id, payload)]；below_version 只读取提取版本低于它的归档"""
+        last_note_id = ''
+        while True:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                if below_version is None:
+                    cursor.execute('''
+                        SELECT note_id, payload FROM raw_note_states
+                        WHERE note_id > ? ORDER BY note_id LIMIT ?
+                    ''', (last_note_id, batch_size))
+                else:
+                    cursor.execute('''
+                        SELECT note_id, payload FROM raw_note_states
+                        WHERE extractor_version < ? AND note_id > ? ORDER BY note_id LIMIT ?
+                    ''', (below_version, last_note_id, batch_size))
+                rows = [(row[0], bytes(row[1])) for row in cursor.fetchall()]
+            if not rows:
+                return
+            yield rows
+            last_note_id = rows[-1][0]
+    
+    def mark_raw_states_extracted(self, note_ids: List[str], extractor_version: int) -> None:
+        """记录归档已用指定版本的提取逻辑处理过"""
+        with self.pool.connection() as conn:
+            conn.executemany("UPDATE raw_note_states SET extractor_version = ? WHERE note_id = ?",
+                             [(extractor_version, note_id) for note_id in note_ids])
+    
+    def refresh_notes_content(self, notes: List[Dict]) -> Optional[int]:
+        """
+        用重新提取的数据更新笔记内容（所有保存了该笔记的用户），以及作者、互动数据、标签、图片和视频
+        单个事务内批量执行，返回更新的笔记数，失败时返回 None
+        """
+        # 同一笔记只保留最后一份数据
+        notes = list({note_data['note_id']: note_data for note_data in notes
+                      if note_data and note_data.get('note_id')}.values())
+        if not notes:
+            return 0
+        
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                
+                # 只处理仍有用户保存的笔记
+                existing = set()
+                candidates = [note_data['note_id'] for note_data in notes]
+                for start in range(0, len(candidates), self.RELATION_BATCH_SIZE):
+                    batch = candidates[start:start + self.RELATION_BATCH_SIZE]
+                    cursor.execute(f"SELECT DISTINCT note_id FROM notes WHERE note_id IN ({','.join('?' * len(batch))})",
+                                   batch)
+                    existing.update(row[0] for row in cursor.fetchall())
+                notes = [note_data for note_data in notes if note_data['note_id'] in existing]
+                if not notes:
+                    return 0
+                
+                cursor.executemany('''
+                    UPDATE notes SET title = ?, content = ?, type = ?, publish_time = ?, location = ?,
+                        updated_at = CURRENT_TIMESTAMP
+                    WHERE note_id = ?
+                ''', [(
+                    note_data.get('title', ''),
+                    note_data.get('content', ''),
+                    note_data.get('type', ''),
+                    note_data.get('publish_time', ''),
+                    note_data.get('location', ''),
+                    note_data['note_id']
+                ) for note_data in notes])
+                
+                # 关联数据整体替换
+                self._write_note_relations(cursor, notes, replace=True)
+                return len(notes)
+                
+        except Exception as e:
+            print(f"❌ 更新笔记内容失败: {str(e)}")
+            return None
+    
+    def purge_expired_short_links(self) -> int:
+        """清理已过期的短链接缓存，返回删除的行数"""
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.execute('DELETE FROM short_links WHERE expires_at <= ?', (int(time.time()),))
+                return cursor.rowcount
+        except Exception as e:
+            print(f"❌ 清理短链接缓存失败: {str(e)}")
+            return 0
 
 # 全局数据库实例 - 使用项目目录中的数据库文件
 db = XiaohongshuDatabase("xiaohongshu_notes.db")
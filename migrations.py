@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+数据库结构版本迁移
+按版本号顺序执行迁移步骤，已执行的版本记录在 schema_version 表中
+
+用法:
+    python migrations.py --db xiaohongshu_notes.db --dry-run   # 只列出待执行的迁移
+    python migrations.py --db xiaohongshu_notes.db             # 执行迁移
+    python migrations.py --check-plans                         # 用 EXPLAIN QUERY PLAN 检查列表查询是否走索引
+"""
+import argparse
+import os
+import sys
+import tempfile
+from typing import Dict, List, Sequence
+
+
+class Migration:
+    """单个迁移步骤，分别提供SQLite和PostgreSQL的语句"""
+
+    def __init__(self, version: int, name: str, sqlite: Sequence[str] = (), postgres: Sequence[str] = None):
+        self.version = version
+        self.name = name
+        self.sqlite = list(sqlite)
+        self.postgres = list(postgres) if postgres is not None else list(sqlite)
+
+    def statements(self, dialect: str) -> List[str]:
+        return self.postgres if dialect == 'postgres' else self.sqlite
+
+
+# XiaohongshuDatabase (database.py) 的迁移列表，版本号必须递增
+MIGRATIONS = [
+    Migration(1, 'list_and_count_indexes', [
+        # 笔记列表 / 游标分页 / 计数: WHERE user_id = ? ORDER BY created_at DESC, id DESC
+        'CREATE INDEX IF NOT EXISTS idx_notes_user_created ON notes (user_id, created_at DESC, id DESC)',
+        # 列表查询中按 note_id 关联互动数据
+        'CREATE INDEX IF NOT EXISTS idx_note_stats_note_id ON note_stats (note_id)',
+        # 批量加载图片和视频（note_tags 已由 UNIQUE(note_id, tag_id) 的自动索引覆盖）
+        'CREATE INDEX IF NOT EXISTS idx_note_images_note_order ON note_images (note_id, image_order)',
+        'CREATE INDEX IF NOT EXISTS idx_note_videos_note_order ON note_videos (note_id, video_order)',
+        # 二创历史与视觉故事历史列表
+        'CREATE INDEX IF NOT EXISTS idx_recreate_history_user_created ON recreate_history (user_id, created_at DESC, id DESC)',
+        'CREATE INDEX IF NOT EXISTS idx_visual_story_user_created ON visual_story_history (user_id, created_at DESC, id DESC)',
+    ]),
+    Migration(2, 'short_link_cache', [
+        # 短链接解析缓存：xhslink.com 短链接 -> 标准链接 / 笔记ID / xsec_token，expires_at 为Unix时间戳（秒）
+        '''CREATE TABLE IF NOT EXISTS short_links (
+            short_url TEXT PRIMARY KEY,
+            resolved_url TEXT NOT NULL,
+            note_id TEXT,
+            xsec_token TEXT,
+            expires_at BIGINT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )''',
+        'CREATE INDEX IF NOT EXISTS idx_short_links_expires_at ON short_links (expires_at)',
+    ]),
+    Migration(3, 'note_fetch_cache', [
+        # 笔记采集结果缓存（所有用户共享），data 为格式化后的笔记JSON，fetched_at 为Unix时间戳（秒）
+        '''CREATE TABLE IF NOT EXISTS note_cache (
+            note_id TEXT PRIMARY KEY,
+            data TEXT NOT NULL,
+            fetched_at BIGINT NOT NULL
+        )''',
+    ]),
+    Migration(4, 'raw_note_state_archive', [
+        # 原始状态归档：noteDetailMap[note_id] 子树的 zlib 压缩JSON，extractor_version 为最近一次从中提取数据的提取逻辑版本
+        '''CREATE TABLE IF NOT EXISTS raw_note_states (
+            note_id TEXT PRIMARY KEY,
+            payload BLOB NOT NULL,
+            extractor_version INTEGER NOT NULL,
+            fetched_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )''',
+        'CREATE INDEX IF NOT EXISTS idx_raw_note_states_version ON raw_note_states (extractor_version, note_id)',
+    ]),
+]
+
+
+# PostgreSQL 事务级咨询锁的ID：多个进程（如同时冷启动的Serverless实例）同时迁移时排队执行
+MIGRATION_LOCK_ID = 7402113001
+
+
+class MigrationRunner:
+    """迁移执行器，兼容 sqlite3 和 psycopg2 连接"""
+
+    def __init__(self, conn, dialect: str = 'sqlite', migrations: Sequence[Migration] = None):
+        self.conn = conn
+        self.dialect = dialect
+        self.migrations = sorted(migrations if migrations is not None else MIGRATIONS, key=lambda m: m.version)
+        self.placeholder = '%s' if dialect == 'postgres' else '?'
+
+    def lock(self, cursor) -> None:
+        """开启事务并获取迁移锁，提交或回滚时释放：PostgreSQL用咨询锁，SQLite用 BEGIN IMMEDIATE 获取写锁"""
+        if self.dialect == 'postgres':
+            cursor.execute('SELECT pg_advisory_xact_lock(%s)', (MIGRATION_LOCK_ID,))
+        elif not self.conn.in_transaction:
+            # sqlite3 不会为DDL自动开启事务，显式开启以保证迁移原子性
+            cursor.execute('BEGIN IMMEDIATE')
+
+    def ensure_version_table(self) -> None:
+        """创建 schema_version 表"""
+        cursor = self.conn.cursor()
+        self.lock(cursor)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        self.conn.commit()
+
+    def current_version(self) -> int:
+        """获取当前已执行到的版本号"""
+        cursor = self.conn.cursor()
+        cursor.execute('SELECT COALESCE(MAX(version), 0) FROM schema_version')
+        return cursor.fetchone()[0]
+
+    def pending(self) -> List[Migration]:
+        """获取待执行的迁移"""
+        current = self.current_version()
+        return [m for m in self.migrations if m.version > current]
+
+    def is_applied(self, version: int) -> bool:
+        """该版本是否已记录在 schema_version 中"""
+        cursor = self.conn.cursor()
+        cursor.execute(f'SELECT 1 FROM schema_version WHERE version = {self.placeholder}', (version,))
+        return cursor.fetchone() is not None
+
+    def migrate(self, dry_run: bool = False) -> List[Dict]:
+        """执行所有待执行的迁移，dry_run=True 时只返回计划不执行"""
+        self.ensure_version_table()
+        plan = []
+
+        for migration in self.pending():
+            statements = migration.statements(self.dialect)
+            plan.append({
+                'version': migration.version,
+                'name': migration.name,
+                'statements': statements
+            })
+            if dry_run:
+                continue
+
+            cursor = self.conn.cursor()
+            try:
+                self.lock(cursor)
+                # 等锁期间其他进程可能已执行完这个迁移，在锁内重新确认
+                if self.is_applied(migration.version):
+                    self.conn.commit()
+                    plan.pop()
+                    continue
+                for statement in statements:
+                    cursor.execute(statement)
+
+                p = self.placeholder
+                conflict = 'ON CONFLICT (version) DO NOTHING'
+                cursor.execute(
+                    f'INSERT INTO schema_version (version, name) VALUES ({p}, {p}) {conflict}',
+                    (migration.version, migration.name)
+                )
+                self.conn.commit()
+                print(f"✅ 数据库迁移 {migration.version} ({migration.name}) 执行完成")
+            except Exception as e:
+                self.conn.rollback()
+                print(f"❌ 数据库迁移 {migration.version} ({migration.name}) 失败: {str(e)}")
+                raise
+
+        return plan
+
+
+def migrate(conn, dialect: str = 'sqlite', dry_run: bool = False) -> List[Dict]:
+    """对给定连接执行迁移"""
+    return MigrationRunner(conn, dialect).migrate(dry_run=dry_run)
+
+
+def capture_queries(database, user_id: int) -> Dict[str, List[str]]:
+    """执行 XiaohongshuDatabase 的列表/计数方法，按调用分组返回实际执行的SQL（参数已代入）"""
+    after = ('2099-01-01 00:00:00', 1)
+    calls = [
+        ('notes_list', lambda conn: database.get_notes_list(user_id, limit=20)),
+        ('notes_page', lambda conn: database.get_notes_page(user_id, limit=20)),
+        ('notes_after', lambda conn: database._fetch_notes(user_id, 20, after=after)),
+        ('notes_count', lambda conn: database.get_notes_count(user_id)),
+        ('notes_with_total', lambda conn: database.get_notes_with_total(user_id, limit=20)),
+        ('note_relations', lambda conn: database._load_note_relations_batched(conn.cursor(), ['a', 'b', 'c'])),
+        ('recreate_history_list', lambda conn: database.get_recreate_history(user_id, limit=20)),
+        ('recreate_history_page', lambda conn: database.get_recreate_history_page(user_id, limit=20)),
+        ('recreate_history_after', lambda conn: database._fetch_recreate_history(user_id, 20, after=after)),
+        ('recreate_history_count', lambda conn: database.get_recreate_history_count(user_id)),
+        ('recreate_history_with_total', lambda conn: database.get_recreate_history_with_total(user_id, limit=20)),
+        ('visual_story_list', lambda conn: database.get_visual_story_history(user_id, limit=20)),
+        ('visual_story_page', lambda conn: database.get_visual_story_history_page(user_id, limit=20)),
+        ('visual_story_after', lambda conn: database._fetch_visual_story_history(user_id, 20, after=after)),
+        ('visual_story_count', lambda conn: database.get_visual_story_history_count(user_id)),
+        ('visual_story_with_total', lambda conn: database.get_visual_story_history_with_total(user_id, limit=20)),
+    ]
+
+    groups = {}
+    captured = []
+    # 同一线程内嵌套使用连接池会拿到同一个连接，方法内部执行的SQL都经过这里的 trace 回调
+    with database.pool.connection() as conn:
+        conn.set_trace_callback(captured.append)
+        try:
+            for label, call in calls:
+                del captured[:]
+                call(conn)
+                groups[label] = [statement for statement in captured
+                                 if statement.lstrip().upper().startswith(('SELECT', 'WITH'))]
+        finally:
+            conn.set_trace_callback(None)
+    return groups
+
+
+def explain_query_plan(conn, statement: str) -> List[str]:
+    """EXPLAIN QUERY PLAN 的节点描述"""
+    return [row[3] for row in conn.execute(f'EXPLAIN QUERY PLAN {statement}').fetchall()]
+
+
+def full_scans(plan: List[str]) -> List[str]:
+    """执行计划中不走索引的全表扫描节点"""
+    return [detail for detail in plan if detail.startswith('SCAN ') and 'INDEX' not in detail]
+
+
+def check_query_plans() -> List[str]:
+    """在临时数据库上捕获列表/计数查询的实际SQL，用 EXPLAIN QUERY PLAN 检查是否存在全表扫描
+
+    返回发现的问题列表，为空表示所有查询都走了索引。
+    """
+    from database import XiaohongshuDatabase
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix='xhs_plan_'), 'plan.db')
+    database = XiaohongshuDatabase(db_path)
+    user_id = database.create_user('plan_user', 'x')
+    database.save_recreate_history(user_id, {
+        'original_note_id': 'plan_note', 'original_title': '', 'original_content': '',
+        'new_title': '', 'new_content': ''
+    })
+
+    problems = []
+    groups = capture_queries(database, user_id)
+    with database.pool.connection() as conn:
+        for label, statements in groups.items():
+            for statement in statements:
+                plan = explain_query_plan(conn, statement)
+                print(f"[{label}] {' '.join(statement.split())[:120]}")
+                for detail in plan:
+                    print(f'    {detail}')
+                for detail in full_scans(plan):
+                    problems.append(f'全表扫描: {detail} <- [{label}] {" ".join(statement.split())[:80]}')
+
+    database.pool.close_all()
+    os.remove(db_path)
+    return problems
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='数据库结构版本迁移')
+    parser.add_argument('--db', default='xiaohongshu_notes.db', help='SQLite数据库路径')
+    parser.add_argument('--dry-run', action='store_true', help='只列出待执行的迁移，不执行')
+    parser.add_argument('--check-plans', action='store_true', help='检查列表查询的执行计划是否走索引')
+    args = parser.parse_args()
+
+    if args.check_plans:
+        issues = check_query_plans()
+        if issues:
+            print("❌ 执行计划检查未通过:")
+            for issue in issues:
+                print(f"   {issue}")
+            sys.exit(1)
+        print("✅ 所有列表和计数查询均使用索引")
+        sys.exit(0)
+
+    import sqlite3
+    with sqlite3.connect(args.db) as connection:
+        steps = migrate(connection, 'sqlite', dry_run=args.dry_run)
+
+    if not steps:
+        print("✅ 数据库结构已是最新版本")
+    for step in steps:
+        print(f"{'[dry-run] ' if args.dry_run else ''}版本 {step['version']}: {step['name']}")
+        for statement in step['statements']:
+            print(f"    {statement}")
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+从原始状态归档重新提取笔记数据
+用当前的 extract_note_details 在进程池中重新处理归档，并更新数据库中已保存的笔记，无需重新采集
+
+用法:
+    python reextract_notes.py --db xiaohongshu_notes.db              # 只处理提取版本低于当前版本的归档
+    python reextract_notes.py --db xiaohongshu_notes.db --all        # 处理全部归档
+    python reextract_notes.py --workers 8 --batch-size 500
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from database import XiaohongshuDatabase
+from xhs_v2 import EXTRACTOR_VERSION, reextract_raw_state
+
+
+def reextract(database: XiaohongshuDatabase, workers: int = None, batch_size: int = 200, reprocess_all: bool = False):
+    """逐批解码并重新提取归档，返回统计信息"""
+    summary = {'archived': 0, 'extracted': 0, 'failed': 0, 'updated_notes': 0}
+    below_version = None if reprocess_all else EXTRACTOR_VERSION
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for rows in database.iter_raw_states(below_version=below_version, batch_size=batch_size):
+            chunksize = max(1, len(rows) // ((workers or os.cpu_count() or 1) * 4))
+            results = list(pool.map(reextract_raw_state, rows, chunksize=chunksize))
+
+            notes = [data for _, data in results if data]
+            summary['archived'] += len(rows)
+            updated = database.refresh_notes_content(notes)
+            if updated is None:
+                # 写库失败时不标记版本，下次运行会重新处理这一批
+                summary['failed'] += len(rows)
+            else:
+                summary['extracted'] += len(notes)
+                summary['failed'] += len(rows) - len(notes)
+                summary['updated_notes'] += updated
+                database.mark_raw_states_extracted([note_id for note_id, data in results if data], EXTRACTOR_VERSION)
+            print(f"   已处理 {summary['archived']} 条归档")
+
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='从原始状态归档重新提取笔记数据')
+    parser.add_argument('--db', default='xiaohongshu_notes.db', help='SQLite数据库路径')
+    parser.add_argument('--workers', type=int, default=None, help='进程数，默认为CPU核数')
+    parser.add_argument('--batch-size', type=int, default=200, help='每批读取的归档数')
+    parser.add_argument('--all', action='store_true', help='处理全部归档，而不只是提取版本落后的归档')
+    args = parser.parse_args()
+
+    print(f"🔁 使用提取逻辑版本 {EXTRACTOR_VERSION} 重新提取: {args.db}")
+    started = time.perf_counter()
+    result = reextract(XiaohongshuDatabase(args.db), args.workers, args.batch_size, args.all)
+    print(f"✅ 完成，用时 {time.perf_counter() - started:.1f}s: "
+          f"归档 {result['archived']} 条，提取成功 {result['extracted']} 条，"
+          f"失败 {result['failed']} 条，更新笔记 {result['updated_notes']} 条")
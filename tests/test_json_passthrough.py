@@ -0,0 +1,189 @@
+"""
+笔记列表JSON直出测试
+比较列表接口的两条路径：raw_json=True 查出JSON片段后由 dumps_json 拼接，与解析为Python对象后再 json.dumps 的输出
+
+用法:
+    python -m unittest discover tests
+    python tests/test_json_passthrough.py
+    XHS_TEST_DATABASE_URL=postgresql://... python -m unittest tests.test_json_passthrough   # 同时检查PostgreSQL（会写入测试数据，请使用专用数据库）
+"""
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(1, os.path.join(ROOT_DIR, 'api'))
+
+from _utils import RawJSON, dumps_json
+
+# json.dumps(ensure_ascii=False) 输出的值（即 save_note 写入的格式）
+CANONICAL_VALUES = [
+    {},
+    [],
+    {'nickname': '小红薯 "引号" \\ / \n\t\x01 😀', 'user_id': '5f1a2b3c000000000100a1b2'},
+    {'likes': 12, 'collects': '1.2万', 'ratio': 0.5, 'big': 12345678901234567890, 'neg': -3, 'none': None},
+    [{'url': 'https://example.com/a.jpg?x=1&y=2', 'width': 1080}, True, False, 1.0],
+    '\x00' + os.urandom(6).hex() + '\x00',
+]
+
+# JSONB 的文本输出（文本 -> ::jsonb::text 的结果）：键按长度、字节序重排，数值保留原始精度
+JSONB_TEXTS = {
+    '{"ccc":1,"b":"中文 \\"q\\" \\\\ / \\n\\u0001 😀","aa":[1,{"x":null}]}':
+        '{"b": "中文 \\"q\\" \\\\ / \\n\\u0001 😀", "aa": [1, {"x": null}], "ccc": 1}',
+    '[1.0, true, 12345678901234567890, 0.1]': '[1.0, true, 12345678901234567890, 0.1]',
+    '1e2': '100',
+}
+# 与 json.dumps 只在语义上相等的JSONB输出：numeric 保留末尾的0、不使用科学计数法，Python的float不会
+JSONB_NUMERIC_TEXTS = {
+    '[2.50]': '[2.50]',
+    '1e-7': '0.0000001',
+}
+
+NOTES = [
+    {
+        'note_id': 'json_note_1', 'title': '标题 "1"', 'content': '正文\n第二行 😀', 'type': 'normal',
+        'author': CANONICAL_VALUES[2], 'stats': CANONICAL_VALUES[3],
+        'images': [{'url': 'https://example.com/a.jpg', 'order': 1}, 'https://example.com/b.jpg'],
+        'videos': [{'url': 'https://example.com/v.mp4', 'cover': None}],
+    },
+    {'note_id': 'json_note_2', 'title': '', 'author': {}, 'stats': {}, 'images': [], 'videos': []},
+    {'note_id': 'json_note_3', 'title': '3', 'images': ['{"images": [1], "videos": [2]}', '], "videos": ['], 'videos': []},
+]
+
+# 直接写入的历史数据：作者、统计、媒体三列的文本（旧版数组格式、带其他键的对象、JSON null）
+LEGACY_ROWS = [
+    ('{"nickname": "旧数据"}', '{"likes": 1}', '["https://example.com/old.jpg"]'),
+    ('null', 'null', 'null'),
+    ('{"nickname": "x"}', '{}', '{"images": [], "videos": [], "extra": {"k": 1}}'),
+    ('{"nickname": "x"}', '{}', '{"videos": ["v"], "images": ["i"]}'),
+]
+# 只有SQLite的TEXT列能存下的数据：空值和无效JSON
+SQLITE_LEGACY_ROWS = [
+    (None, None, None),
+    ('', '', ''),
+    ('{invalid', 'not json', '[1, 2'),
+]
+
+
+class DumpsJsonTest(unittest.TestCase):
+
+    def assert_same_bytes(self, fragment, value):
+        raw = {'a': RawJSON(fragment), 'b': [RawJSON(fragment), 'x', {'c': RawJSON(fragment)}]}
+        decoded = {'a': value, 'b': [value, 'x', {'c': value}]}
+        self.assertEqual(dumps_json(raw), json.dumps(decoded, ensure_ascii=False))
+
+    def test_canonical_fragments_are_byte_identical(self):
+        for value in CANONICAL_VALUES:
+            with self.subTest(value=value):
+                self.assert_same_bytes(json.dumps(value, ensure_ascii=False), value)
+
+    def test_jsonb_fragments_are_byte_identical(self):
+        for jsonb_text in JSONB_TEXTS.values():
+            with self.subTest(fragment=jsonb_text):
+                self.assert_same_bytes(jsonb_text, json.loads(jsonb_text))
+
+    def test_jsonb_numeric_fragments_are_semantically_equal(self):
+        for jsonb_text in JSONB_NUMERIC_TEXTS.values():
+            with self.subTest(fragment=jsonb_text):
+                value = json.loads(jsonb_text)
+                output = dumps_json({'a': RawJSON(jsonb_text)})
+                self.assertEqual(json.loads(output), {'a': value})
+                self.assertNotEqual(output, json.dumps({'a': value}, ensure_ascii=False))
+
+
+class NoteListJsonTest:
+    """api/_database.py 的两条列表路径，子类提供 make_manager 和 legacy_rows"""
+
+    legacy_rows = LEGACY_ROWS
+
+    def make_manager(self):
+        raise NotImplementedError
+
+    def setUp(self):
+        self.manager = self.make_manager()
+        self.assertTrue(self.manager.init_database())
+        self.user_id = self.manager.create_user(f'json_user_{os.getpid()}_{id(self)}', 'x')
+        for note in NOTES:
+            self.assertTrue(self.manager.save_note(note, self.user_id))
+        p = '%s' if self.manager.use_postgres else '?'
+        conn = self.manager.get_connection()
+        try:
+            cursor = conn.cursor()
+            for index, (author, stats, images) in enumerate(self.legacy_rows):
+                cursor.execute(f'''
+                    INSERT INTO notes (user_id, note_id, title, author_data, stats_data, images_data)
+                    VALUES ({p}, {p}, '', {p}, {p}, {p})
+                ''', (self.user_id, f'legacy_note_{index}', author, stats, images))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def test_raw_json_path_matches_json_dumps(self):
+        from xiaohongshu_notes_list import format_notes
+
+        per_page = len(NOTES) + len(self.legacy_rows)
+        raw_notes = self.manager.get_notes(self.user_id, per_page=per_page, raw_json=True)
+        decoded_notes = self.manager.get_notes(self.user_id, per_page=per_page)
+        self.assertEqual(len(raw_notes), per_page)
+        self.assertEqual([note['id'] for note in raw_notes], [note['id'] for note in decoded_notes])
+        for raw_note, decoded_note in zip(raw_notes, decoded_notes):
+            with self.subTest(note_id=decoded_note['note_id']):
+                self.assertEqual(dumps_json(format_notes([raw_note])),
+                                 json.dumps(format_notes([decoded_note]), ensure_ascii=False))
+
+
+class SQLiteNoteListJsonTest(NoteListJsonTest, unittest.TestCase):
+
+    legacy_rows = LEGACY_ROWS + SQLITE_LEGACY_ROWS
+
+    def make_manager(self):
+        from _database import DatabaseManager
+
+        self.temp_dir = tempfile.mkdtemp(prefix='xhs_json_test_')
+        self.addCleanup(shutil.rmtree, self.temp_dir, True)
+        database_url = os.environ.pop('DATABASE_URL', None)
+        try:
+            manager = DatabaseManager()
+        finally:
+            if database_url is not None:
+                os.environ['DATABASE_URL'] = database_url
+        manager.db_path = os.path.join(self.temp_dir, 'json.db')
+        return manager
+
+
+@unittest.skipUnless(os.getenv('XHS_TEST_DATABASE_URL'), '未设置 XHS_TEST_DATABASE_URL')
+class PostgresNoteListJsonTest(NoteListJsonTest, unittest.TestCase):
+
+    def make_manager(self):
+        from _database import DatabaseManager
+
+        previous = os.environ.get('DATABASE_URL')
+        os.environ['DATABASE_URL'] = os.environ['XHS_TEST_DATABASE_URL']
+        try:
+            manager = DatabaseManager()
+        finally:
+            if previous is None:
+                os.environ.pop('DATABASE_URL')
+            else:
+                os.environ['DATABASE_URL'] = previous
+        return manager
+
+    def test_jsonb_texts_match_server_output(self):
+        """DumpsJsonTest 中的JSONB样例与服务器实际输出一致"""
+        conn = self.manager.get_connection()
+        try:
+            cursor = conn.cursor()
+            for source, jsonb_text in {**JSONB_TEXTS, **JSONB_NUMERIC_TEXTS}.items():
+                with self.subTest(source=source):
+                    cursor.execute('SELECT %s::jsonb::text', (source,))
+                    self.assertEqual(cursor.fetchone()[0], jsonb_text)
+        finally:
+            conn.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
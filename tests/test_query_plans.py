@@ -0,0 +1,158 @@
+"""
+列表和历史查询的执行计划测试
+捕获数据访问方法（和历史列表接口）实际执行的SQL，断言 EXPLAIN 结果中没有全表扫描，并且用到了迁移创建的索引
+
+用法:
+    python -m unittest discover tests
+    python tests/test_query_plans.py
+    XHS_TEST_DATABASE_URL=postgresql://... python -m unittest tests.test_query_plans   # 同时检查PostgreSQL（会写入测试数据，请使用专用数据库）
+"""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(1, os.path.join(ROOT_DIR, 'api'))
+
+import migrations
+import _migrations
+
+# 调用分组 -> 执行计划中必须出现的索引；None 表示只要求没有全表扫描（由优化器在多个可用索引中选择）
+LOCAL_EXPECTED_INDEXES = {
+    'notes_list': ['idx_notes_user_created'],
+    'notes_page': ['idx_notes_user_created'],
+    'notes_after': ['idx_notes_user_created'],
+    'notes_count': ['idx_notes_user_created'],
+    'notes_with_total': ['idx_notes_user_created'],
+    'note_relations': ['idx_note_images_note_order', 'idx_note_videos_note_order'],
+    'recreate_history_list': ['idx_recreate_history_user_created'],
+    'recreate_history_page': ['idx_recreate_history_user_created'],
+    'recreate_history_after': ['idx_recreate_history_user_created'],
+    'recreate_history_count': ['idx_recreate_history_user_created'],
+    'recreate_history_with_total': ['idx_recreate_history_user_created'],
+    'visual_story_list': ['idx_visual_story_user_created'],
+    'visual_story_page': ['idx_visual_story_user_created'],
+    'visual_story_after': ['idx_visual_story_user_created'],
+    'visual_story_count': ['idx_visual_story_user_created'],
+    'visual_story_with_total': ['idx_visual_story_user_created'],
+}
+
+API_EXPECTED_INDEXES = {
+    'notes_list': ['idx_notes_user_created'],
+    'notes_page': ['idx_notes_user_created'],
+    'notes_after': ['idx_notes_user_created'],
+    'notes_count': None,
+    'notes_with_total': ['idx_notes_user_created'],
+    'notes_by_likes': ['idx_notes_user_likes'],
+    'notes_by_author': ['idx_notes_user_author_created'],
+    'notes_count_by_author': ['idx_notes_user_author_created'],
+    'notes_min_likes': None,
+    'recreate_history_list': ['idx_recreate_history_user_created'],
+    'visual_story_list': ['idx_visual_story_user_created'],
+    'delete_note': ['idx_recreate_history_note_id'],
+}
+
+
+class QueryPlanAssertions:
+    def assert_plans(self, groups, plans, expected_indexes):
+        """groups/plans 为 分组 -> SQL列表 / 执行计划列表"""
+        self.assertEqual(set(groups), set(expected_indexes))
+        for label, statements in groups.items():
+            with self.subTest(label=label):
+                self.assertTrue(statements, f'{label} 没有捕获到SQL')
+                details = [detail for plan in plans[label] for detail in plan]
+                for statement, plan in zip(statements, plans[label]):
+                    scans = _migrations.full_scans(plan)
+                    self.assertFalse(scans, f'{label} 存在全表扫描 {scans}: {" ".join(statement.split())[:160]}')
+                for index in expected_indexes[label] or []:
+                    self.assertTrue(any(index in detail for detail in details),
+                                    f'{label} 没有使用 {index}: {details}')
+
+
+class LocalDatabaseQueryPlanTest(QueryPlanAssertions, unittest.TestCase):
+    """database.py（本地SQLite）"""
+
+    def setUp(self):
+        from database import XiaohongshuDatabase
+
+        self.temp_dir = tempfile.mkdtemp(prefix='xhs_plan_test_')
+        self.database = XiaohongshuDatabase(os.path.join(self.temp_dir, 'plan.db'))
+        self.user_id = self.database.create_user('plan_user', 'x')
+        self.database.save_recreate_history(self.user_id, {
+            'original_note_id': 'plan_note', 'original_title': '', 'original_content': '',
+            'new_title': '', 'new_content': ''
+        })
+
+    def tearDown(self):
+        self.database.pool.close_all()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_list_and_history_queries_use_indexes(self):
+        groups = migrations.capture_queries(self.database, self.user_id)
+        with self.database.pool.connection() as conn:
+            plans = {label: [migrations.explain_query_plan(conn, statement) for statement in statements]
+                     for label, statements in groups.items()}
+        self.assert_plans(groups, plans, LOCAL_EXPECTED_INDEXES)
+
+    def test_check_query_plans_reports_no_problems(self):
+        self.assertEqual(migrations.check_query_plans(), [])
+
+
+class ServerlessQueryPlanTest(QueryPlanAssertions):
+    """api/_database.py，子类提供 make_manager"""
+
+    def make_manager(self):
+        raise NotImplementedError
+
+    def test_list_and_history_queries_use_indexes(self):
+        manager = self.make_manager()
+        self.assertTrue(manager.init_database())
+        groups = _migrations.capture_api_queries(manager, _migrations.seed_plan_data(manager))
+        plans = {label: _migrations.explain_queries(manager, statements) for label, statements in groups.items()}
+        self.assert_plans(groups, plans, API_EXPECTED_INDEXES)
+
+
+class ServerlessSQLiteQueryPlanTest(ServerlessQueryPlanTest, unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp(prefix='xhs_plan_test_')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def make_manager(self):
+        from _database import DatabaseManager
+
+        database_url = os.environ.pop('DATABASE_URL', None)
+        try:
+            manager = DatabaseManager()
+        finally:
+            if database_url is not None:
+                os.environ['DATABASE_URL'] = database_url
+        manager.db_path = os.path.join(self.temp_dir, 'plan.db')
+        return manager
+
+
+@unittest.skipUnless(os.getenv('XHS_TEST_DATABASE_URL'), '未设置 XHS_TEST_DATABASE_URL')
+class ServerlessPostgresQueryPlanTest(ServerlessQueryPlanTest, unittest.TestCase):
+
+    def make_manager(self):
+        from _database import DatabaseManager
+
+        previous = os.environ.get('DATABASE_URL')
+        os.environ['DATABASE_URL'] = os.environ['XHS_TEST_DATABASE_URL']
+        try:
+            manager = DatabaseManager()
+        finally:
+            if previous is None:
+                os.environ.pop('DATABASE_URL')
+            else:
+                os.environ['DATABASE_URL'] = previous
+        return manager
+
+
+if __name__ == '__main__':
+    unittest.main()